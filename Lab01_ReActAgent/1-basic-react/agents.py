@@ -1,75 +1,84 @@
 import asyncio
-import requests
 import json
 import os
-from openai import AzureOpenAI
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from prompts import react_prompt_template
-from collections.abc import Iterable
+from llm import get_async_client, aclose_async_client
+from llm_cache import ResponseCache, get_response_cache, is_complete_step
+from prompts import react_prompt_template, next_step_prompt
 from typing import Dict, Any, List, Optional
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Azure OpenAI Configuration
-AZURE_AI_ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
-AZURE_AI_API_VERSION = os.getenv("AZURE_AI_API_VERSION", "2024-12-01-preview")
-CREDENTIAL = DefaultAzureCredential()
-TOKEN_PROVIDER = get_bearer_token_provider(CREDENTIAL, "https://cognitiveservices.azure.com/.default")
 
+# Reasoning steps per query before the agent stops, overridable from the environment
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "10"))
 
 class ReActAgent:
-    def __init__(self):
-        self.client = AzureOpenAI(
-            azure_endpoint=AZURE_AI_ENDPOINT,
-            api_version=AZURE_AI_API_VERSION,
-            azure_ad_token_provider=TOKEN_PROVIDER,
-        )
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        response_cache: Optional[ResponseCache] = None,
+        max_steps: int = AGENT_MAX_STEPS,
+    ):
+        # the async client is shared by every agent in the process
+        self.client = client or get_async_client()
+        # sampling parameters of every completion request
+        self.completion_params = {"model": "gpt-4o", "temperature": 0.1, "max_tokens": 1000}
+        # opt-in exact-match response cache (bypassed for high temperatures)
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
         self.react_prompt = react_prompt_template
+        # static system prefix, identical for every request so the provider's
+        # prompt-prefix cache can reuse it
+        self.system_message = {"role": "system", "content": self.react_prompt}
+        # a confused model must not loop forever
+        self.max_steps = max_steps
     
      # formats the thought process history as a string for prompt context
     def _format_thought_history(self, thought_process: List[Dict[str, Any]]) -> str:
         """
         Formats the thought process history as a string for prompt context.
         """
-        history = ""
-        for step in thought_process:
-            history += json.dumps(step, ensure_ascii=False) + "\n"
-        return history
+        return "".join(
+            json.dumps(step, ensure_ascii=False) + "\n" for step in thought_process
+        )
     
+    def _cache_key(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Key of this request in the response cache, or None when it must not be cached."""
+        if self.response_cache is None or not self.response_cache.cacheable(self.completion_params):
+            return None
+        return self.response_cache.key(messages, self.completion_params)
+
     # send a request to OpenAI and get the response
-    async def _get_openai_response(self, prompt: str, query: str) -> str:   
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": query}
-        ]
+    async def _get_openai_response(self, messages: List[Dict[str, str]]) -> str:
+        # identical low-temperature requests are served from the response cache
+        cache_key = self._cache_key(messages)
+        if cache_key:
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                return cached
 
         try:
-            response = self.client.chat.completions.create(
-                        model = "gpt-4o",
+            response = await self.client.chat.completions.create(
                         messages = messages,
-                        temperature=0.1,
-                        max_tokens=1000
+                        **self.completion_params
             )
-            print(f"\nAgent response: {response.choices[0].message.content}")
-            return  response.choices[0].message.content
+            content = response.choices[0].message.content
+            print(f"\nAgent response: {content}")
+            if cache_key and is_complete_step(content):
+                await self.response_cache.aset(cache_key, content)
+            return content
         except Exception as e:
             return f"Error generating response: {e}"
 
      # executes the ReAct loop   
     async def run(self, query: str) -> str:
         thought_process: List[Dict[str, Any]] = []
+        # append-only conversation: each step only adds messages at the end,
+        # so nothing already sent is re-rendered
+        messages: List[Dict[str, str]] = [
+            self.system_message,
+            {"role": "user", "content": query},
+        ]
 
-        while True:
-            # Prepare prompt and appends thought history if available
-            prompt = (
-                self.react_prompt + "\n"
-            )
-            if thought_process:
-                prompt += self._format_thought_history(thought_process)
-
+        for _ in range(self.max_steps):
             # Get next step from LLM 
-            step_text = await self._get_openai_response(prompt, query)
+            step_text = await self._get_openai_response(messages)
 
             try:
                 step = json.loads(step_text)
@@ -83,6 +92,11 @@ class ReActAgent:
                 return step["final_answer"]
            
             thought_process.append(step)
+            messages.append({"role": "assistant", "content": step_text})
+            messages.append({"role": "user", "content": next_step_prompt})
+
+        print(self._format_thought_history(thought_process))
+        return f"No final answer after {self.max_steps} steps."
             
 async def main():
     try:
@@ -95,6 +109,8 @@ async def main():
          
     except Exception as e:
         print(f"Error running agent: {e}")
+    finally:
+        await aclose_async_client()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
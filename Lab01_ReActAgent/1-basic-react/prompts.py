@@ -29,3 +29,5 @@ Important guidelines
         - If you encounter an error, explain what went wrong and try a different approach
 """.strip()
 
+# Sent after each intermediate step to ask the model for the next one
+next_step_prompt = "Continue with the next step."
@@ -1,179 +1,733 @@
+import argparse
 import asyncio
-import requests
 import json
-import os
-from openai import AzureOpenAI
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from prompts import react_prompt_template
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from batch import run_batch, positive_int, DEFAULT_CONCURRENCY
+from deadline import (
+    AGENT_DEADLINE, AGENT_LLM_TIMEOUT, AGENT_MAX_STEPS, AGENT_TOOL_TIMEOUT,
+    ANSWERED, DEADLINE, ERROR, MAX_STEPS,
+    AgentResult, Deadline, DeadlineExceeded, current_deadline, reset_deadline, set_deadline, with_timeout,
+)
+from history import HistoryManager
+from streaming import StepStreamParser
+from llm import get_async_client, aclose_async_client, get_token_manager
+from llm_cache import ResponseCache, get_response_cache, is_complete_step
+from memo import ToolMemo, end_run_scope, get_tool_memo, start_run_scope
+from observations import READ_TOOL_NAME, ObservationStore, get_observation_store
+from sandbox import ProcessSandbox, SandboxError, aclose_sandbox, get_sandbox
+from prompts import react_prompt_template, function_calling_prompt, final_answer_prompt, native_final_answer_prompt
+from telemetry import Telemetry, configure_logging, get_telemetry, logger
 from tools import Tools
-from toolbox import ToolBox
-from collections.abc import Iterable
-from typing import Dict, Any, List, Optional
-from dotenv import load_dotenv
+from toolbox import ToolBox, ToolEntry
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
-load_dotenv()
-# Azure OpenAI Configuration
-AZURE_AI_ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
-AZURE_AI_API_VERSION = os.getenv("AZURE_AI_API_VERSION", "2024-12-01-preview")
-CREDENTIAL = DefaultAzureCredential()
-TOKEN_PROVIDER = get_bearer_token_provider(CREDENTIAL, "https://cognitiveservices.azure.com/.default")
+# Tool execution limits: the sync tools run on a bounded thread pool, and each
+# tool may only have this many calls in flight at once (per agent)
+TOOL_MAX_WORKERS = 8
+DEFAULT_TOOL_CONCURRENCY = 4
+
+_default_toolbox: Optional[ToolBox] = None
+
+
+def get_default_toolbox() -> ToolBox:
+    """
+    Returns the registry of the Tools class, compiled once per process and
+    shared by every agent that does not bring its own.
+    """
+    global _default_toolbox
+    if _default_toolbox is None:
+        toolbox = ToolBox()
+        toolbox.store([Tools])
+        _default_toolbox = toolbox
+    return _default_toolbox
 
 
 class ReActAgent:
-    def __init__(self):
-        self.client = AzureOpenAI(
-            azure_endpoint=AZURE_AI_ENDPOINT,
-            api_version=AZURE_AI_API_VERSION,
-            azure_ad_token_provider=TOKEN_PROVIDER,
-        )
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        tool_concurrency: Optional[Dict[str, int]] = None,
+        max_workers: int = TOOL_MAX_WORKERS,
+        history_options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        on_answer_delta: Optional[Callable[[str], None]] = None,
+        native_tools: bool = False,
+        toolbox: Optional[ToolBox] = None,
+        response_cache: Optional[ResponseCache] = None,
+        tool_memo: Optional[ToolMemo] = None,
+        sandbox: Optional[ProcessSandbox] = None,
+        observation_store: Optional[ObservationStore] = None,
+        telemetry: Optional[Telemetry] = None,
+        max_steps: int = AGENT_MAX_STEPS,
+        deadline: Optional[float] = AGENT_DEADLINE,
+        llm_timeout: Optional[float] = AGENT_LLM_TIMEOUT,
+        tool_timeout: Optional[float] = AGENT_TOOL_TIMEOUT,
+    ):
+        # the async client is shared by every agent in the process
+        self.client = client or get_async_client()
+        # sampling parameters of every completion request
+        self.completion_params = {"model": "gpt-4o", "temperature": 0.1, "max_tokens": 1000}
+        # opt-in exact-match response cache (bypassed for high temperatures)
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        # results of tools declared pure or TTL-cacheable, shared across agents
+        self.tool_memo = tool_memo if tool_memo is not None else get_tool_memo()
         self.react_prompt = react_prompt_template
-        self.tools = Tools()
-        self.tools_description = self._prepare_tools()  
+        # the compiled tool registry (shared across agents by default)
+        self.toolbox = toolbox or get_default_toolbox()
+        self.tools_description = self.toolbox.describe_tools()
+        # static system prefix rendered once per registry (not once per step), so
+        # the provider's prompt-prefix cache stays effective
+        self.system_message = {
+            "role": "system",
+            "content": self.toolbox.render_prompt(self.react_prompt),
+        }
+        # native mode passes the ToolBox schemas through the API's `tools`
+        # parameter instead of pasting the docstrings into the prompt
+        self.native_tools = native_tools
+        self.native_system_message = {"role": "system", "content": function_calling_prompt}
+        self.tool_schemas = self.toolbox.tool_schemas()
+        self.tool_concurrency = tool_concurrency or {}
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        # tools declared @sandboxed run in worker processes with CPU/memory limits
+        self.sandbox = sandbox if sandbox is not None else get_sandbox()
+        # large observations are kept out of the history, behind a preview and a handle
+        self.observation_store = observation_store if observation_store is not None else get_observation_store()
+        # streaming mode dispatches actions before the step is fully generated
+        self.stream = stream
+        self.on_answer_delta = on_answer_delta
+        # HistoryManager settings (token_budget, keep_recent_steps, ...) and totals
+        self.history_options = history_options or {}
+        self.history_stats = {"runs": 0, "compactions": 0, "tokens_saved": 0}
+        # latency/token events for every LLM call, tool call, parse and render
+        self.telemetry = telemetry or get_telemetry()
+        # per-query step cap and latency budget (0/None = unlimited), and the
+        # caps on single calls within that budget
+        self.max_steps = max_steps
+        self.deadline = deadline
+        self.llm_timeout = llm_timeout
+        self.tool_timeout = tool_timeout
     
-    @staticmethod
-    def _flatten(items: Iterable) -> Iterable:
-        """Recursively flatten nested iterables (helper for _prepare_tools)."""
-        for obj in items:
-            if isinstance(obj, (list, tuple, set)):
-                yield from ReActAgent._flatten(obj)
-            else:
-                yield obj
+    def _tool_semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """Return the semaphore enforcing the per-tool concurrency limit."""
+        semaphore = self._tool_semaphores.get(tool_name)
+        if semaphore is None:
+            limit = self.tool_concurrency.get(tool_name, DEFAULT_TOOL_CONCURRENCY)
+            semaphore = self._tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+        return semaphore
 
-    def _prepare_tools(self) -> str:
+    async def _call_tool(self, entry: ToolEntry, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
         """
-        Collect all public callables from Tools.user_functions (or the class itself)
-        and return a nicely formatted description for the prompt.
+        Run a sync tool on the thread pool without blocking the event loop, for
+        at most `tool_timeout` seconds and never past the query's deadline. A
+        timed-out tool is abandoned (its thread cannot be interrupted).
+
+        Tools that declared a memo policy are answered from the tool memo when
+        the same input was seen before; failed calls are never memoized.
         """
-        toolbox = ToolBox()
+        try:
+            if entry.memo is None or self.tool_memo is None:
+                return await self._timed_tool(entry, args, kwargs)
+            return await self.tool_memo.call(
+                entry.name, entry.arguments(args, kwargs), entry.memo,
+                partial(self._timed_tool, entry, args, kwargs),
+            )
+        except DeadlineExceeded:
+            raise
+        except TimeoutError as ex:
+            return f"Tool runtime error: {entry.name} {ex}"
+        except SandboxError as ex:
+            # a JSON error ({"error": "cpu_limit", ...}) the model can read
+            return str(ex)
+        except Exception as ex:
+            return f"Tool runtime error: {ex}"
 
-        # If the Tools class exposes an explicit set, prefer that
-        candidates = (
-            self.tools.user_functions
-            if hasattr(self.tools, "user_functions")
-            else [
-                v
-                for k, v in self.tools.__dict__.items()
-                if callable(v) and not k.startswith("_")
-            ]
-        )
+    async def _timed_tool(self, entry: ToolEntry, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        return await with_timeout(self._run_tool(entry, args, kwargs), self.tool_timeout)
+
+    async def _run_tool(self, entry: ToolEntry, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        async with self._tool_semaphore(entry.name):
+            loop = asyncio.get_running_loop()
+            sandboxed = entry.sandboxed and self.sandbox is not None
+            with self.telemetry.span("tool_call", tool=entry.name, sandboxed=sandboxed) as span:
+                try:
+                    if sandboxed:
+                        return await self.sandbox.run(entry.func, *args, **kwargs)
+                    return await loop.run_in_executor(
+                        self._executor, partial(entry.func, *args, **kwargs)
+                    )
+                except Exception as ex:
+                    span.set(error=getattr(ex, "kind", None) or type(ex).__name__)
+                    raise
+
+    async def _execute_tool(self, tool_name: str, tool_input: Any) -> Any:
+        """Execute a tool with the `tool_input` of a ReAct JSON action."""
+        entry = self.toolbox.get(tool_name)
+        if entry is None:
+            return f"Unknown tool '{tool_name}'"
+        try:
+            args, kwargs = entry.bind(tool_input)
+        except ValueError as ex:
+            return f"Invalid input for tool '{tool_name}': {ex}"
+        return self._spill(entry.name, await self._call_tool(entry, args, kwargs))
+
+    async def _execute_tool_call(self, tool_call: Any) -> Any:
+        """Execute a native tool call with its JSON-encoded keyword arguments."""
+        try:
+            arguments = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError as ex:
+            return f"Invalid tool arguments: {ex}"
+        if not isinstance(arguments, dict):
+            return "Invalid tool arguments: expected a JSON object"
+        entry = self.toolbox.get(tool_call.function.name)
+        if entry is None:
+            return f"Unknown tool '{tool_call.function.name}'"
+        try:
+            args, kwargs = entry.validate((), arguments)
+        except ValueError as ex:
+            return f"Invalid tool arguments: {ex}"
+        return self._spill(entry.name, await self._call_tool(entry, args, kwargs))
+
+    def _spill(self, tool_name: str, observation: Any) -> Any:
+        """Moves a large observation to the observation store, leaving a preview with its handle."""
+        if self.observation_store is None or tool_name == READ_TOOL_NAME:
+            return observation
+        return self.observation_store.spill(observation)
 
-        toolbox.store(self._flatten(candidates))
-        return toolbox.describe_tools()
+    async def _execute_action(self, act: Dict[str, Any]) -> Any:
+        """Execute a single action dict from the model's step."""
+        tool_name  = act.get("tool_choice")
+        tool_input = act.get("tool_input")
+
+        if not tool_name or tool_input is None:
+            return "Missing tool_choice/tool_input"
+        return await self._execute_tool(tool_name, tool_input)
 
     # formats the thought process history as a string for prompt context        
     def _format_thought_history(self, thought_process: List[Dict[str, Any]]) -> str:
         """
         Formats the thought process history as a string for prompt context.
         """
-        history = ""
+        lines: List[str] = []
         for step in thought_process:
-            history += f"Thought: {step['thought']}\n"
+            lines.append(f"Thought: {step['thought']}\n")
             if step.get("action"):
-                history += f"Action: {json.dumps(step['action'])}\n"
+                lines.append(f"Action: {json.dumps(step['action'])}\n")
             if step.get("observation"):
-                history += f"Observation: {step['observation']}\n"
+                lines.append(f"Observation: {step['observation']}\n")
             if step.get("pause_reflection"):
-                history += f"PAUSE: {step['pause_reflection']}\n"
-        return history
+                lines.append(f"PAUSE: {step['pause_reflection']}\n")
+        return "".join(lines)
+
+    # formats the observations of one step as the message appended after it
+    def _format_observations(self, step_records: List[Dict[str, Any]]) -> str:
+        """
+        Formats the actions and observations of a single step.
+        """
+        if not step_records:
+            return "No tool was called. Continue with the next step."
+        return "".join(
+            f"Action: {json.dumps(record['action'])}\nObservation: {record['observation']}\n"
+            for record in step_records
+        )
+
+    def _record_history(self, history: HistoryManager) -> None:
+        """Adds a finished run's compaction metrics to the agent totals."""
+        stats = history.stats()
+        self.history_stats["runs"] += 1
+        self.history_stats["compactions"] += stats["compactions"]
+        self.history_stats["tokens_saved"] += stats["tokens_saved"]
+        if stats["compactions"]:
+            logger.info("\nHistory compacted %sx, saved %s tokens", stats["compactions"], stats["tokens_saved"])
     
+    def _cache_key(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Key of this request in the response cache, or None when it must not be cached."""
+        if self.response_cache is None or not self.response_cache.cacheable(self.completion_params):
+            return None
+        return self.response_cache.key(messages, self.completion_params)
+
+    @staticmethod
+    def _usage_fields(usage: Any) -> Dict[str, Any]:
+        """Token counts of a completion for the llm_call event."""
+        if usage is None:
+            return {}
+        return {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+        }
+
     # send a request to OpenAI and get the response
-    async def _get_openai_response(self, prompt: str, query: str) -> str:
-    
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": query}
+    async def _get_openai_response(self, messages: List[Dict[str, str]], final: bool = False) -> str:
+        # `final`: the forced last answer, which may use the deadline's reserve
+        with self.telemetry.span("llm_call", streamed=False, cache_hit=False) as span:
+            # identical low-temperature requests are served from the response cache
+            cache_key = self._cache_key(messages)
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    span.set(cache_hit=True)
+                    return cached
+
+            try:
+                response = await with_timeout(
+                    self.client.chat.completions.create(
+                            messages = messages,
+                            **self.completion_params
+                    ),
+                    self.llm_timeout,
+                    keep_reserve=not final,
+                )
+                content = response.choices[0].message.content
+                span.set(**self._usage_fields(getattr(response, "usage", None)))
+                logger.info("\nAgent response: %s", content)
+                if cache_key and is_complete_step(content):
+                    await self.response_cache.aset(cache_key, content)
+                return content
+            except DeadlineExceeded:
+                span.set(error="DeadlineExceeded")
+                raise
+            except Exception as e:
+                span.set(error=type(e).__name__)
+                return f"Error generating response: {e}"
+
+    # stream a request to OpenAI, dispatching each action as soon as it is complete
+    async def _stream_openai_response(
+        self,
+        messages: List[Dict[str, str]],
+        dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]],
+    ) -> str:
+        """
+        Streams the next step and starts each tool call while the model is still
+        generating the rest of the step. Started calls are appended to
+        `dispatched` as (action, task) pairs.
+        """
+        parser = StepStreamParser()
+        with self.telemetry.span("llm_call", streamed=True, cache_hit=False) as span:
+            cache_key = self._cache_key(messages)
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    span.set(cache_hit=True)
+                    # replay the cached step through the parser to dispatch its actions
+                    for act in parser.feed(cached):
+                        dispatched.append((act, asyncio.create_task(self._execute_action(act))))
+                    return cached
+
+            async def consume() -> None:
+                stream = await self.client.chat.completions.create(
+                            messages = messages,
+                            stream=True,
+                            # the last chunk then carries the token counts
+                            stream_options={"include_usage": True},
+                            **self.completion_params
+                )
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        span.set(**self._usage_fields(chunk.usage))
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    for act in parser.feed(chunk.choices[0].delta.content):
+                        dispatched.append((act, asyncio.create_task(self._execute_action(act))))
+                    if self.on_answer_delta:
+                        answer = parser.answer_delta()
+                        if answer:
+                            self.on_answer_delta(answer)
+
+            try:
+                # the whole stream, not just its first chunk, is under the timeout
+                await with_timeout(consume(), self.llm_timeout)
+                span.set(early_actions=len(dispatched))
+                logger.info("\nAgent response: %s", parser.text)
+                if cache_key and is_complete_step(parser.text):
+                    await self.response_cache.aset(cache_key, parser.text)
+                return parser.text
+            except DeadlineExceeded:
+                span.set(error="DeadlineExceeded")
+                raise
+            except Exception as e:
+                span.set(error=type(e).__name__)
+                return f"Error generating response: {e}"
+
+    @staticmethod
+    def _cancel_dispatched(dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]]) -> None:
+        for _, task in dispatched:
+            task.cancel()
+
+    async def _gather_actions(
+        self,
+        actions: List[Dict[str, Any]],
+        dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]],
+    ) -> List[Any]:
+        """
+        Runs the step's actions concurrently, reusing the calls already started
+        while streaming. gather keeps the results in action order.
+        """
+        early = [act for act, _ in dispatched]
+        if early != actions[:len(early)]:
+            # the streamed entries do not line up with the parsed step; start over
+            self._cancel_dispatched(dispatched)
+            dispatched = []
+        tasks = [task for _, task in dispatched] + [
+            asyncio.ensure_future(self._execute_action(act)) for act in actions[len(dispatched):]
         ]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # deadline or cancellation: stop the step's other calls too
+            for task in tasks:
+                task.cancel()
+            raise
+
+    # send a request with native tools and get the assistant message back
+    async def _get_native_response(self, messages: List[Dict[str, Any]], final: bool = False) -> Any:
+        # `final`: the forced last answer (no tool calls, may use the deadline's reserve)
+        with self.telemetry.span("llm_call", streamed=False, native=True) as span:
+            try:
+                response = await with_timeout(
+                    self.client.chat.completions.create(
+                            messages = messages,
+                            tools=self.tool_schemas,
+                            tool_choice="none" if final else "auto",
+                            parallel_tool_calls=True,
+                            **self.completion_params
+                    ),
+                    self.llm_timeout,
+                    keep_reserve=not final,
+                )
+                message = response.choices[0].message
+                span.set(**self._usage_fields(getattr(response, "usage", None)))
+                logger.info("\nAgent response: %s %s", message.content or "", message.tool_calls or "")
+                return message
+            except DeadlineExceeded:
+                span.set(error="DeadlineExceeded")
+                raise
+            except Exception as e:
+                span.set(error=type(e).__name__)
+                return f"Error generating response: {e}"
+
+    def _log_thought_history(self, thought_process: List[Dict[str, Any]]) -> None:
+        """Logs the full chain of thought (skipped entirely when INFO is off)."""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        with self.telemetry.span("history_render", kind="thought_history", records=len(thought_process)):
+            text = self._format_thought_history(thought_process)
+        logger.info(text)
+
+    def _add_step(
+        self,
+        history: HistoryManager,
+        step_text: str,
+        step_records: List[Dict[str, Any]],
+        step_messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """Appends a step to the history, timing the render of its messages."""
+        with self.telemetry.span("history_render", kind="step", records=len(step_records)) as span:
+            history.add_step(step_text, step_records, step_messages)
+            span.set(history_tokens=history.total_tokens)
+
+    def _fallback_answer(self, limit: str, thought_process: List[Dict[str, Any]]) -> str:
+        """The partial result when even the forced final answer fails."""
+        answer = f"No final answer within the {limit} limit."
+        if thought_process:
+            answer += "\nLatest observations:\n" + self._format_observations(thought_process[-3:])
+        return answer
 
+    async def _force_final_answer(
+        self,
+        history: HistoryManager,
+        status: str,
+        steps: int,
+        thought_process: List[Dict[str, Any]],
+    ) -> Tuple[str, str, int]:
+        """
+        Asks the model for a final answer from what it has gathered so far (no
+        more tool calls), using the time held back by the deadline. Falls back
+        to the latest observations when that fails too.
+        """
+        limit = "steps" if status == MAX_STEPS else "time"
+        logger.warning("Run stopped after %s steps (%s limit); forcing a final answer", steps, limit)
+        if current_deadline().expired():
+            return self._fallback_answer(limit, thought_process), status, steps
         try:
-            response = self.client.chat.completions.create(
-                        model = "gpt-4o",
-                        messages = messages,
-                        temperature=0.1,
-                        max_tokens=1000
-            )
-            print(f"\nAgent response: {response.choices[0].message.content}")
-            return  response.choices[0].message.content
-        except Exception as e:
-            return f"Error generating response: {e}"
-        
-    async def run(self, query: str) -> str:
-        # executes the ReAct loop 
+            if self.native_tools:
+                prompt = native_final_answer_prompt.format(limit=limit)
+                message = await self._get_native_response(
+                    history.messages + [{"role": "user", "content": prompt}], final=True
+                )
+                if not isinstance(message, str) and message.content:
+                    return message.content, status, steps + 1
+            else:
+                prompt = final_answer_prompt.format(limit=limit)
+                step_text = await self._get_openai_response(
+                    history.messages + [{"role": "user", "content": prompt}], final=True
+                )
+                step = json.loads(step_text)
+                if isinstance(step, dict) and "final_answer" in step:
+                    return step["final_answer"], status, steps + 1
+        except (DeadlineExceeded, json.JSONDecodeError):
+            pass
+        return self._fallback_answer(limit, thought_process), status, steps + 1
+
+    def _out_of_budget(self, step_index: int, max_steps: int) -> Optional[str]:
+        """MAX_STEPS or DEADLINE when the run must stop before the next step."""
+        if max_steps and step_index >= max_steps:
+            return MAX_STEPS
+        # the reserve is kept for the forced final answer
+        if current_deadline().expired(keep_reserve=True):
+            return DEADLINE
+        return None
+
+    async def _run_native(self, query: str, max_steps: int) -> Tuple[str, str, int]:
+        """
+        Executes the ReAct loop with native function calling: the model returns
+        structured tool_calls (possibly several in parallel) instead of JSON text,
+        and answers in plain text once it stops calling tools.
+
+        Returns:
+        Tuple[str, str, int]: The answer, the run status and the steps taken.
+        """
         thought_process: List[Dict[str, Any]] = []
+        history = HistoryManager(
+            self.native_system_message, query, self._format_observations, **self.history_options
+        )
 
-        while True:
-            # Prepare prompt and appends thought history if available
-            prompt = (
-                self.react_prompt.format(tool_descriptions=self.tools_description)
-            )
-            if thought_process:
-                prompt += self.format_thought_history(thought_process)
+        step_index = 0
+        try:
+            while True:
+                status = self._out_of_budget(step_index, max_steps)
+                if status:
+                    return await self._force_final_answer(history, status, step_index, thought_process)
+                self.telemetry.set_step(step_index)
+                message = await self._get_native_response(history.messages)
+                if isinstance(message, str):
+                    return message, ERROR, step_index + 1
 
-            # Get next step from LLM 
-            step_text = await self._get_openai_response(prompt, query)
+                # No tool calls means the model has answered
+                if not message.tool_calls:
+                    self._log_thought_history(thought_process)
+                    return message.content or "", ANSWERED, step_index + 1
 
-            try:
-                step = json.loads(step_text)
-            except json.JSONDecodeError as e:
-                return f"Could not parse LLM JSON: {e}\nRaw: {step_text}"
-
-            # When final answer is present, return it
-            if "final_answer" in step:
-                # (Optional) print the full chain of thought
-                print(self._format_thought_history(thought_process))
-                return step["final_answer"]
-
-            # Continues reasoning 
-            thought = step.get("thought", "")
-            actions = step.get("action", [])  
-            pause   = step.get("pause", None)
-
-            if not isinstance(actions, list):
-                actions = [actions]  # allow single-dict fall-back
-
-            # Execute each tool call
-            for act in actions:
-                tool_name  = act.get("tool_choice")
-                tool_input = act.get("tool_input")
-
-                if not tool_name or tool_input is None:
-                    thought_process.append(
-                        {
-                            "thought": thought,
-                            "action": act,
-                            "observation": "Missing tool_choice/tool_input",
-                            "pause": pause,
-                        }
-                    )
-                    continue
-
-                tool_func = getattr(self.tools, tool_name, None)
-                if callable(tool_func):
-                    try:
-                        result = tool_func(tool_input)
-                    except Exception as ex:
-                        result = f"Tool runtime error: {ex}"
+                calls = message.tool_calls
+                results = await self._gather_calls(calls)
+                step_records = [
+                    {
+                        "thought": message.content or "",
+                        "action": {"tool_choice": call.function.name, "tool_input": call.function.arguments},
+                        "observation": result,
+                        "tool_call_id": call.id,
+                    }
+                    for call, result in zip(calls, results)
+                ]
+                step_messages = [
+                    {
+                        "role": "assistant",
+                        "content": message.content,
+                        "tool_calls": [
+                            {
+                                "id": call.id,
+                                "type": "function",
+                                "function": {"name": call.function.name, "arguments": call.function.arguments},
+                            }
+                            for call in calls
+                        ],
+                    }
+                ] + [
+                    {"role": "tool", "tool_call_id": record["tool_call_id"], "content": str(record["observation"])}
+                    for record in step_records
+                ]
+                thought_process.extend(step_records)
+                self._add_step(history, message.content or "", step_records, step_messages)
+                step_index += 1
+        except DeadlineExceeded:
+            return await self._force_final_answer(history, DEADLINE, step_index, thought_process)
+        finally:
+            self._record_history(history)
+
+    async def _gather_calls(self, calls: List[Any]) -> List[Any]:
+        """Runs a step's native tool calls concurrently, cancelling them all on failure."""
+        tasks = [asyncio.ensure_future(self._execute_tool_call(call)) for call in calls]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def execute(
+        self, query: str, deadline: Optional[float] = None, max_steps: Optional[int] = None
+    ) -> AgentResult:
+        """
+        Answers a query within a step cap and a latency budget.
+
+        Every LLM and tool call gets a timeout cut from the budget. When the
+        steps or the time run out, in-flight calls are cancelled and the model
+        is asked once more for a final answer (falling back to the latest
+        observations), which the result reports as partial.
+
+        Parameters:
+        query (str): The user query.
+        deadline (Optional[float]): Seconds for the whole query (default: the agent's).
+        max_steps (Optional[int]): Step cap (default: the agent's).
+
+        Returns:
+        AgentResult: The answer, its status ("answered", "max_steps",
+            "deadline" or "error"), the steps taken and the elapsed time.
+        """
+        budget = Deadline(self.deadline if deadline is None else deadline)
+        token = set_deadline(budget)
+        memo_token = start_run_scope()
+        self.telemetry.start_run()
+        try:
+            with self.telemetry.span("run", native=self.native_tools, stream=self.stream) as span:
+                steps_cap = self.max_steps if max_steps is None else max_steps
+                if self.native_tools:
+                    answer, status, steps = await self._run_native(query, steps_cap)
+                else:
+                    answer, status, steps = await self._run_react(query, steps_cap)
+                span.set(status=status, steps=steps)
+        finally:
+            end_run_scope(memo_token)
+            reset_deadline(token)
+        return AgentResult(answer, status, steps, budget.elapsed())
+
+    async def run(self, query: str) -> str:
+        return (await self.execute(query)).answer
+
+    # executes the ReAct loop 
+    async def _run_react(self, query: str, max_steps: int) -> Tuple[str, str, int]:
+        thought_process: List[Dict[str, Any]] = []
+        # append-only conversation: the system prefix is rendered once and each
+        # step only appends its assistant/observation messages at the end (older
+        # steps are compacted once the token budget is exceeded)
+        history = HistoryManager(
+            self.system_message, query, self._format_observations, **self.history_options
+        )
+
+        step_index = 0
+        dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]] = []
+        try:
+            while True:
+                status = self._out_of_budget(step_index, max_steps)
+                if status:
+                    return await self._force_final_answer(history, status, step_index, thought_process)
+
+                # Get next step from LLM 
+                self.telemetry.set_step(step_index)
+                dispatched = []
+                if self.stream:
+                    step_text = await self._stream_openai_response(history.messages, dispatched)
                 else:
-                    result = f"Unknown tool '{tool_name}'"
+                    step_text = await self._get_openai_response(history.messages)
+
+                try:
+                    with self.telemetry.span("parse", chars=len(step_text)):
+                        step = json.loads(step_text)
+                except json.JSONDecodeError as e:
+                    return f"Could not parse LLM JSON: {e}\nRaw: {step_text}", ERROR, step_index + 1
+
+                # When final answer is present, return it
+                if "final_answer" in step:
+                    # (Optional) log the full chain of thought
+                    self._log_thought_history(thought_process)
+                    return step["final_answer"], ANSWERED, step_index + 1
+
+                # Continues reasoning 
+                thought = step.get("thought", "")
+                actions = step.get("action", [])  
+                pause   = step.get("pause", None)
+
+                if not isinstance(actions, list):
+                    actions = [actions]  # allow single-dict fall-back
 
-                thought_process.append(
+                # Execute the step's tool calls concurrently; gather keeps the
+                # results in action order so the history stays deterministic
+                results = await self._gather_actions(actions, dispatched)
+                step_records = [
                     {
                         "thought": thought,
                         "action": act,
                         "observation": result,
                         "pause": pause,
                     }
-                )
-            
+                    for act, result in zip(actions, results)
+                ]
+                thought_process.extend(step_records)
+                self._add_step(history, step_text, step_records)
+                step_index += 1
+        except DeadlineExceeded:
+            self._cancel_dispatched(dispatched)
+            return await self._force_final_answer(history, DEADLINE, step_index, thought_process)
+        finally:
+            # tool calls started while streaming must not outlive the run
+            self._cancel_dispatched(dispatched)
+            self._record_history(history)
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=False)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ReAct agent with function calling")
+    parser.add_argument("--batch", metavar="INPUT", help="JSONL file of queries to run in batch mode")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file for batch results")
+    parser.add_argument("--native-tools", action="store_true",
+                        help="use the API's native function calling instead of JSON steps")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream model output and start tool calls as soon as they are generated")
+    parser.add_argument("--concurrency", type=positive_int, default=DEFAULT_CONCURRENCY,
+                        help="maximum number of queries in flight in batch mode")
+    parser.add_argument("--max-steps", type=int, default=AGENT_MAX_STEPS,
+                        help="reasoning steps per query before a final answer is forced (0 = unlimited)")
+    parser.add_argument("--deadline", type=float, default=AGENT_DEADLINE,
+                        help="seconds per query before a final answer is forced (0 = unlimited)")
+    parser.add_argument("--log-level", default=None,
+                        help="agent log level (default: AGENT_LOG_LEVEL or INFO; WARNING silences per-step output)")
+    return parser.parse_args()
+
 async def main():
+    args = parse_args()
+    configure_logging(args.log_level)
+    agent = None
     try:
-        agent = ReActAgent()
-        
-        query = input("Enter your Query : ")
-        response = await agent.run(query)
-        print("\nFinal Answer:", response)
+        agent = ReActAgent(
+            stream=args.stream,
+            native_tools=args.native_tools,
+            max_steps=args.max_steps,
+            deadline=args.deadline,
+            # show the answer as it streams (interactive mode only)
+            on_answer_delta=None if args.batch else lambda delta: print(delta, end="", flush=True),
+        )
+        if agent.sandbox is not None:
+            # start the sandbox workers before the first query needs one
+            await agent.sandbox.start()
+
+        if args.batch:
+            # one warm agent serves every query in the file
+            summary = await run_batch(agent, args.batch, args.output, args.concurrency)
+            summary["token"] = get_token_manager().stats()
+            if agent.tool_memo is not None:
+                summary["tool_memo"] = agent.tool_memo.stats()
+            if agent.sandbox is not None:
+                summary["sandbox"] = agent.sandbox.stats()
+            if agent.observation_store is not None:
+                summary["observations"] = agent.observation_store.stats()
+            print("\nBatch summary:", json.dumps(summary, indent=2))
+        else:
+            query = input("Enter your Query : ")
+            result = await agent.execute(query)
+            print("\nFinal Answer:", result.answer)
+            if result.status != ANSWERED:
+                print(f"({result.status} after {result.steps} steps, {result.elapsed_s:.1f}s)")
     
     except Exception as e:
-        print(f"Error running agent: {e}")
+        logger.error("Error running agent: %s", e)
+    finally:
+        if agent:
+            await agent.aclose()
+            agent.telemetry.close()
+        await aclose_sandbox()
+        await aclose_async_client()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
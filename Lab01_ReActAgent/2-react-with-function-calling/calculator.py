@@ -0,0 +1,304 @@
+import ast
+import json
+import math
+import numbers
+import operator
+import os
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Calculator limits, overridable from the environment
+# largest exponent allowed in a power (unless the base is 0, 1 or -1)
+CALCULATOR_MAX_EXPONENT = int(os.getenv("CALCULATOR_MAX_EXPONENT", "10000"))
+# largest integer result, in bits (about 3000 decimal digits)
+CALCULATOR_MAX_RESULT_BITS = int(os.getenv("CALCULATOR_MAX_RESULT_BITS", "10000"))
+CALCULATOR_MAX_OPERATIONS = int(os.getenv("CALCULATOR_MAX_OPERATIONS", "100"))
+CALCULATOR_MAX_EXPRESSION_LENGTH = int(os.getenv("CALCULATOR_MAX_EXPRESSION_LENGTH", "1000"))
+CALCULATOR_MAX_ARRAY_SIZE = int(os.getenv("CALCULATOR_MAX_ARRAY_SIZE", "100000"))
+
+Number = Union[int, float, bool]
+
+
+class CalculatorError(ValueError):
+    """An operation the calculator refuses or cannot evaluate."""
+
+
+def _check_result(value: Any) -> Any:
+    if isinstance(value, int) and value.bit_length() > CALCULATOR_MAX_RESULT_BITS:
+        raise CalculatorError(f"result exceeds {CALCULATOR_MAX_RESULT_BITS} bits")
+    # sequences and NumPy arrays are bounded like the element-wise inputs
+    size = getattr(value, "size", None) if not isinstance(value, numbers.Number) else None
+    if size is None and isinstance(value, (list, tuple)):
+        size = len(value)
+    if size is not None and size > CALCULATOR_MAX_ARRAY_SIZE:
+        raise CalculatorError(f"result longer than {CALCULATOR_MAX_ARRAY_SIZE} elements")
+    return value
+
+
+def _number(value: Any) -> Any:
+    """Refuses operands that are not real numbers (int, float, bool or a NumPy scalar)."""
+    # a list operand would make * repeat the list instead of multiplying
+    if not isinstance(value, numbers.Real):
+        raise CalculatorError(
+            f"expected a number, got {type(value).__name__} (use num1/num2 for element-wise operations)"
+        )
+    return value
+
+
+def _power(base: Number, exponent: Number) -> Number:
+    """`base ** exponent`, refusing exponents that would take long to compute."""
+    if abs(base) not in (0, 1):
+        if abs(exponent) > CALCULATOR_MAX_EXPONENT:
+            raise CalculatorError(f"exponent {exponent} exceeds {CALCULATOR_MAX_EXPONENT}")
+        # estimate the size of an integer result before computing it
+        if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+            if exponent * abs(base).bit_length() > CALCULATOR_MAX_RESULT_BITS + exponent:
+                raise CalculatorError(f"result of {base} ** {exponent} is too large")
+    return operator.pow(base, exponent)
+
+
+# Binary operations by name (the batch form) ...
+OPERATIONS: Dict[str, Callable[[Any, Any], Any]] = {
+    'add': operator.add,
+    'subtract': operator.sub,
+    'multiply': operator.mul,
+    'divide': operator.truediv,
+    'floor_divide': operator.floordiv,
+    'modulus': operator.mod,
+    'power': _power,
+    'lt': operator.lt,
+    'le': operator.le,
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'ge': operator.ge,
+    'gt': operator.gt,
+}
+# ... and the same operations as expression syntax
+_BINARY_OPS = {
+    ast.Add: OPERATIONS['add'],
+    ast.Sub: OPERATIONS['subtract'],
+    ast.Mult: OPERATIONS['multiply'],
+    ast.Div: OPERATIONS['divide'],
+    ast.FloorDiv: OPERATIONS['floor_divide'],
+    ast.Mod: OPERATIONS['modulus'],
+    ast.Pow: OPERATIONS['power'],
+}
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.GtE: operator.ge,
+    ast.Gt: operator.gt,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    'abs': abs,
+    'round': round,
+    'min': min,
+    'max': max,
+    'sqrt': math.sqrt,
+    'log': math.log,
+    'log10': math.log10,
+    'exp': math.exp,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+}
+_CONSTANTS = {'pi': math.pi, 'e': math.e}
+
+
+def evaluate_expression(expression: str, names: Optional[Dict[str, Number]] = None) -> Number:
+    """
+    Evaluates an arithmetic expression without `eval`: the expression is parsed
+    and only numbers, + - * / // % **, comparisons, a few math functions
+    (abs, round, min, max, sqrt, log, log10, exp, sin, cos, tan), pi, e and
+    the given `names` are accepted.
+
+    Parameters:
+    expression (str): E.g. "(67869 / 9030393) * 100".
+    names (Dict[str, Number]): Extra variables (earlier batch results).
+
+    Returns:
+    Number: The value of the expression.
+
+    Raises:
+    CalculatorError: If the expression uses anything else or is too costly.
+    """
+    if len(expression) > CALCULATOR_MAX_EXPRESSION_LENGTH:
+        raise CalculatorError(f"expression longer than {CALCULATOR_MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except (SyntaxError, RecursionError, MemoryError) as ex:
+        raise CalculatorError(f"invalid expression: {getattr(ex, 'msg', 'nested too deeply')}") from None
+    variables = dict(_CONSTANTS, **(names or {}))
+
+    def visit(node: ast.AST) -> Any:
+        if isinstance(node, ast.Expression):
+            return visit(node.body)
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in variables:
+            return variables[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left, right = _number(visit(node.left)), _number(visit(node.right))
+            return _check_result(_BINARY_OPS[type(node.op)](left, right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _UNARY_OPS[type(node.op)](_number(visit(node.operand)))
+        if isinstance(node, ast.Compare):
+            left = visit(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                if type(op) not in _COMPARE_OPS:
+                    break
+                right = visit(comparator)
+                if not _COMPARE_OPS[type(op)](left, right):
+                    return False
+                left = right
+            else:
+                return True
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in _FUNCTIONS
+            and not node.keywords
+        ):
+            return _FUNCTIONS[node.func.id](*(visit(arg) for arg in node.args))
+        raise CalculatorError(f"unsupported syntax: {ast.dump(node)[:60]}")
+
+    try:
+        return visit(tree)
+    except RecursionError:
+        raise CalculatorError("expression nested too deeply") from None
+
+
+def _apply_arrays(operation: str, num1: Any, num2: Any) -> List[Number]:
+    """
+    Applies a binary operation element-wise (a scalar is broadcast), with
+    NumPy when it is installed.
+    """
+    sizes = [len(v) for v in (num1, num2) if isinstance(v, list)]
+    if len(set(sizes)) > 1:
+        raise CalculatorError(f"array lengths differ: {sizes}")
+    if sizes[0] > CALCULATOR_MAX_ARRAY_SIZE:
+        raise CalculatorError(f"arrays longer than {CALCULATOR_MAX_ARRAY_SIZE} elements")
+    # flat lists of numbers only: nested lists would be repeated, not computed
+    for operand in (num1, num2):
+        for value in operand if isinstance(operand, list) else [operand]:
+            _number(value)
+    if operation == 'power':
+        exponents = num2 if isinstance(num2, list) else [num2]
+        if exponents and max(abs(x) for x in exponents) > CALCULATOR_MAX_EXPONENT:
+            raise CalculatorError(f"exponent exceeds {CALCULATOR_MAX_EXPONENT}")
+    try:
+        import numpy as np
+    except ImportError:  # optional: fall back to a Python loop
+        np = None
+    if np is None:
+        left = num1 if isinstance(num1, list) else [num1] * sizes[0]
+        right = num2 if isinstance(num2, list) else [num2] * sizes[0]
+        func = OPERATIONS[operation]
+        return [_check_result(func(a, b)) for a, b in zip(left, right)]
+
+    ufuncs = {
+        'add': np.add, 'subtract': np.subtract, 'multiply': np.multiply, 'divide': np.true_divide,
+        'floor_divide': np.floor_divide, 'modulus': np.mod, 'power': np.power,
+        'lt': np.less, 'le': np.less_equal, 'eq': np.equal, 'ne': np.not_equal,
+        'ge': np.greater_equal, 'gt': np.greater,
+    }
+    # float64 throughout: integer arrays would silently wrap around on overflow
+    with np.errstate(all="raise"):
+        try:
+            result = ufuncs[operation](np.asarray(num1, dtype=np.float64), np.asarray(num2, dtype=np.float64))
+        except FloatingPointError as ex:
+            raise CalculatorError(f"{operation} failed: {ex}") from None
+    return [_plain(x) for x in result.tolist()]
+
+
+def _plain(value: Any) -> Any:
+    # 6.0 -> 6, so integer results read like the scalar path's
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53:
+        return int(value)
+    return value
+
+
+def apply_operation(spec: Dict[str, Any], names: Optional[Dict[str, Number]] = None) -> Any:
+    """
+    Evaluates one `{"num1": ..., "num2": ..., "operation": ...}` item. The
+    operands are numbers, lists of numbers or names of earlier results.
+    """
+    try:
+        num1, num2, operation = spec['num1'], spec['num2'], spec['operation']
+    except KeyError as ex:
+        raise CalculatorError(f"missing key {ex}") from None
+    if operation not in OPERATIONS:
+        raise CalculatorError(f"unsupported operation '{operation}'")
+    num1, num2 = (
+        evaluate_expression(v, names) if isinstance(v, str) else v for v in (num1, num2)
+    )
+    if isinstance(num1, list) or isinstance(num2, list):
+        return _apply_arrays(operation, num1, num2)
+    return _check_result(OPERATIONS[operation](_number(num1), _number(num2)))
+
+
+def parse_input(tool_input: Any) -> Any:
+    """
+    Turns the tool input into an operation dict, a list of items or an
+    expression string. JSON strings (also with single quotes) are decoded;
+    any other string is an expression.
+    """
+    if not isinstance(tool_input, str):
+        return tool_input
+    text = tool_input.strip().strip("\"")
+    for candidate in (text, text.replace("'", "\"")):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return text
+
+
+def calculate(tool_input: Any) -> str:
+    """
+    Evaluates a single operation, an expression or a batch of them in one call
+    (see `Tools.basic_calculator` for the accepted forms).
+
+    Returns:
+    str: The formatted result(s), or an error message.
+    """
+    parsed = parse_input(tool_input)
+    if isinstance(parsed, dict) and 'operations' in parsed:
+        parsed = parsed['operations']
+    if isinstance(parsed, dict) and 'expression' in parsed:
+        parsed = parsed['expression']
+
+    if not isinstance(parsed, list):
+        try:
+            if isinstance(parsed, dict):
+                result = apply_operation(parsed)
+            elif isinstance(parsed, str):
+                result = evaluate_expression(parsed)
+            elif isinstance(parsed, (int, float)):
+                result = parsed
+            else:
+                raise CalculatorError("expected an operation, an expression or a list of them")
+        except (ArithmeticError, ValueError, TypeError) as ex:
+            return f"\n\nError: {ex}. Calculated with basic_calculator."
+        return f"\n\nThe answer is: {result}.\nCalculated with basic_calculator."
+
+    if len(parsed) > CALCULATOR_MAX_OPERATIONS:
+        return f"\n\nError: more than {CALCULATOR_MAX_OPERATIONS} operations in one call."
+    # each item can use the earlier results as r0, r1, ...
+    names: Dict[str, Any] = {}
+    lines = []
+    for index, item in enumerate(parsed):
+        try:
+            if isinstance(item, dict):
+                result = apply_operation(item, names)
+            elif isinstance(item, str):
+                result = evaluate_expression(item, names)
+            else:
+                raise CalculatorError("expected an operation or an expression")
+            names[f"r{index}"] = result
+            lines.append(f"r{index} = {result}")
+        except (ArithmeticError, ValueError, TypeError) as ex:
+            lines.append(f"r{index}: error: {ex}")
+    return "\n\nThe answers are:\n" + "\n".join(lines) + "\nCalculated with basic_calculator."
@@ -0,0 +1,234 @@
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+# History budget settings, overridable from the environment
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_RECENT_STEPS = int(os.getenv("HISTORY_KEEP_RECENT_STEPS", "2"))
+HISTORY_PREVIEW_CHARS = int(os.getenv("HISTORY_PREVIEW_CHARS", "200"))
+# compact down to this fraction of the budget so compactions stay infrequent
+HISTORY_TARGET_RATIO = 0.75
+# per-message overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# tiktoken encoding, loaded on the first count; False when tiktoken is missing
+_encoding: Any = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a string with tiktoken when available
+    (roughly 4 characters per token otherwise).
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:  # optional: fall back to a character-based estimate
+            _encoding = False
+    if _encoding is False:
+        return (len(text) + 3) // 4
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _preview(text: Any, limit: int) -> str:
+    text = text if isinstance(text, str) else str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [elided {len(text) - limit} chars]"
+
+
+class HistoryManager:
+    """
+    Token-budgeted conversation history for one ReAct run.
+
+    Messages are appended as steps complete. Once the conversation exceeds
+    `token_budget`, older steps are compacted until it fits in
+    `target_ratio * token_budget` again, while the `keep_recent_steps` latest
+    steps always stay verbatim:
+
+    1. observations of older steps are elided to a short preview;
+    2. if that is not enough, the oldest steps are folded into a single
+       summary message, whose oldest lines are dropped once it would not
+       fit either.
+
+    Between compactions the message list is append-only, so the provider's
+    prompt-prefix cache keeps working.
+    """
+
+    def __init__(
+        self,
+        system_message: Dict[str, str],
+        query: str,
+        formatter: Callable[[List[Dict[str, Any]]], str],
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent_steps: int = HISTORY_KEEP_RECENT_STEPS,
+        preview_chars: int = HISTORY_PREVIEW_CHARS,
+        target_ratio: float = HISTORY_TARGET_RATIO,
+        counter: Callable[[str], int] = count_tokens,
+    ) -> None:
+        self.formatter = formatter
+        self.token_budget = token_budget
+        self.keep_recent_steps = keep_recent_steps
+        self.preview_chars = preview_chars
+        self.target_ratio = target_ratio
+        self.counter = counter
+
+        self._prefix = [system_message, {"role": "user", "content": query}]
+        self._prefix_tokens = sum(self._message_tokens(m) for m in self._prefix)
+        self._steps: List[Dict[str, Any]] = []
+        self._summary_lines: List[str] = []
+        # folded steps whose summary lines were dropped to stay under the target
+        self._omitted_steps = 0
+        self._summary: Optional[Dict[str, str]] = None
+        self._summary_tokens = 0
+        self._messages: List[Dict[str, str]] = list(self._prefix)
+        self.total_tokens = self._prefix_tokens
+        self.compactions: List[Dict[str, int]] = []
+
+    def _message_tokens(self, message: Dict[str, Any]) -> int:
+        tokens = self.counter(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        if message.get("tool_calls"):
+            tokens += self.counter(json.dumps(message["tool_calls"]))
+        return tokens
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """The messages to send for the next LLM call."""
+        return self._messages
+
+    def add_step(
+        self,
+        assistant_text: str,
+        step_records: List[Dict[str, Any]],
+        step_messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Appends one step (the model's output and its observations).
+
+        Parameters:
+        assistant_text (str): The raw step returned by the model.
+        step_records (List[Dict[str, Any]]): The step's action/observation records.
+        step_messages (List[Dict[str, Any]], optional): Pre-built messages for
+            native tool calls (the assistant tool_calls message followed by one
+            tool message per record). Built from the records when omitted.
+        """
+        native = step_messages is not None
+        if not native:
+            step_messages = [
+                {"role": "assistant", "content": assistant_text},
+                {"role": "user", "content": self.formatter(step_records)},
+            ]
+        tokens = sum(self._message_tokens(m) for m in step_messages)
+        self._steps.append({
+            "messages": step_messages,
+            "records": step_records,
+            "tokens": tokens,
+            "elided": False,
+            "native": native,
+        })
+        self._messages.extend(step_messages)
+        self.total_tokens += tokens
+
+        if self.total_tokens > self.token_budget:
+            self._compact()
+
+    def _compact(self) -> None:
+        tokens_before = self.total_tokens
+        target = int(self.token_budget * self.target_ratio)
+        compactable = max(0, len(self._steps) - self.keep_recent_steps)
+        if tokens_before <= target or not compactable:
+            # nothing to do, or only the recent steps (always kept) are left
+            return
+
+        # 1. elide the observations of older steps, oldest first
+        for step in self._steps[:compactable]:
+            if self.total_tokens <= target:
+                break
+            if not step["elided"]:
+                self._elide(step)
+
+        # 2. fold the oldest steps into a single summary message
+        folded = 0
+        while self.total_tokens > target and folded < compactable:
+            step = self._steps[folded]
+            self.total_tokens -= step["tokens"]
+            self._summary_lines.append(self._summarize(step))
+            folded += 1
+        if folded:
+            del self._steps[:folded]
+            self._rebuild_summary(target)
+
+        self._messages = list(self._prefix)
+        if self._summary:
+            self._messages.append(self._summary)
+        for step in self._steps:
+            self._messages.extend(step["messages"])
+
+        self.compactions.append({
+            "tokens_before": tokens_before,
+            "tokens_after": self.total_tokens,
+            "tokens_saved": tokens_before - self.total_tokens,
+            "steps_elided": sum(1 for s in self._steps if s["elided"]),
+            "steps_folded": folded,
+        })
+
+    def _elide(self, step: Dict[str, Any]) -> None:
+        elided_records = [
+            dict(record, observation=_preview(record["observation"], self.preview_chars))
+            for record in step["records"]
+        ]
+        if step["native"]:
+            # keep one tool message per call, as the API requires
+            step["messages"] = [step["messages"][0]] + [
+                dict(message, content=record["observation"])
+                for message, record in zip(step["messages"][1:], elided_records)
+            ]
+        else:
+            step["messages"][1] = {"role": "user", "content": self.formatter(elided_records)}
+        tokens = sum(self._message_tokens(m) for m in step["messages"])
+        self.total_tokens += tokens - step["tokens"]
+        step["tokens"] = tokens
+        step["elided"] = True
+
+    def _summarize(self, step: Dict[str, Any]) -> str:
+        records = step["records"]
+        if not records:
+            return f"- {_preview(step['messages'][0].get('content') or '', self.preview_chars)}"
+        actions = "; ".join(
+            f"{json.dumps(r['action'])} -> {_preview(r['observation'], self.preview_chars // 2)}"
+            for r in records
+        )
+        thought = records[0].get("thought")
+        if not thought:
+            return f"- {actions}"
+        return f"- Thought: {_preview(thought, self.preview_chars)} | {actions}"
+
+    def _rebuild_summary(self, target: int) -> None:
+        """
+        Renders the summary message, dropping its oldest lines while it would
+        keep the history over `target` (so the summary cannot grow without bound).
+        """
+        self.total_tokens -= self._summary_tokens
+        while True:
+            lines = self._summary_lines
+            if self._omitted_steps:
+                lines = [f"- ({self._omitted_steps} earlier steps omitted)"] + lines
+            self._summary = {"role": "user", "content": "Summary of earlier steps:\n" + "\n".join(lines)}
+            self._summary_tokens = self._message_tokens(self._summary)
+            if self.total_tokens + self._summary_tokens <= target or not self._summary_lines:
+                break
+            self._summary_lines.pop(0)
+            self._omitted_steps += 1
+        self.total_tokens += self._summary_tokens
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the current size and the savings of all compactions so far.
+        """
+        return {
+            "total_tokens": self.total_tokens,
+            "compactions": len(self.compactions),
+            "tokens_saved": sum(c["tokens_saved"] for c in self.compactions),
+        }
@@ -0,0 +1,266 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Tool memoization settings, overridable from the environment
+TOOL_MEMO_ENABLED = os.getenv("TOOL_MEMO_ENABLED", "1").lower() in ("1", "true", "yes")
+TOOL_MEMO_MAX_ENTRIES = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "1024"))
+
+# scopes a memoized result can be reused in
+RUN_SCOPE = "run"
+GLOBAL_SCOPE = "global"
+
+# attribute a declaration is stored under on the tool function
+_POLICY_ATTR = "__tool_memo__"
+
+
+class MemoPolicy:
+    """
+    How the results of one tool may be reused.
+
+    A `pure` tool's result depends only on its input and never expires; with
+    `ttl` a result is reused for that many seconds. With scope "run" results
+    are only reused within the same query, with "global" across queries.
+    """
+
+    def __init__(self, pure: bool = False, ttl: Optional[float] = None, scope: str = GLOBAL_SCOPE) -> None:
+        if scope not in (RUN_SCOPE, GLOBAL_SCOPE):
+            raise ValueError(f"unknown memo scope '{scope}'")
+        if not pure and not ttl:
+            raise ValueError("a memoized tool must be pure or have a ttl")
+        self.pure = pure
+        self.ttl = None if pure else ttl
+        self.scope = scope
+
+    def to_annotations(self) -> Dict[str, Any]:
+        """
+        The policy as MCP tool annotations: the standard read-only/idempotent
+        hints plus the fields `from_annotations` reads back on the client.
+        """
+        annotations: Dict[str, Any] = {"readOnlyHint": True, "idempotentHint": True, "memoScope": self.scope}
+        if self.pure:
+            annotations["pure"] = True
+        else:
+            annotations["cacheTtlSeconds"] = self.ttl
+        return annotations
+
+    @classmethod
+    def from_annotations(cls, annotations: Any) -> Optional["MemoPolicy"]:
+        """Reads a policy from MCP tool annotations (a model or a dict), or None."""
+        if annotations is None:
+            return None
+        if not isinstance(annotations, dict):
+            annotations = annotations.model_dump()
+        pure = bool(annotations.get("pure"))
+        ttl = annotations.get("cacheTtlSeconds")
+        if not pure and not ttl:
+            return None
+        return cls(pure=pure, ttl=ttl, scope=annotations.get("memoScope") or GLOBAL_SCOPE)
+
+    def __repr__(self) -> str:
+        return f"MemoPolicy(pure={self.pure}, ttl={self.ttl}, scope={self.scope!r})"
+
+
+def memoize(pure: bool = False, ttl: Optional[float] = None, scope: str = GLOBAL_SCOPE) -> Callable:
+    """
+    Declares a tool function memoizable. The function is returned unchanged
+    (the declaration is read when the tool is registered):
+
+        @memoize(pure=True)
+        def basic_calculator(input_str): ...
+
+        @memoize(ttl=300)
+        def get_weather(location: str) -> str: ...
+    """
+    policy = MemoPolicy(pure=pure, ttl=ttl, scope=scope)
+
+    def declare(func: Callable) -> Callable:
+        setattr(func, _POLICY_ATTR, policy)
+        return func
+    return declare
+
+
+def policy_of(func: Callable) -> Optional[MemoPolicy]:
+    """The memo policy declared on `func`, or None."""
+    return getattr(func, _POLICY_ATTR, None)
+
+
+def _canonical(value: Any) -> Any:
+    # JSON passed as a string ('{"num2": 3, "num1": 5}') keys like the decoded value
+    if isinstance(value, str):
+        text = value.strip()
+        if text[:1] in ("{", "["):
+            try:
+                return _canonical(json.loads(text))
+            except ValueError:
+                pass
+        return text
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def memo_key(tool_name: str, tool_input: Any) -> str:
+    """
+    Key of a tool call: the tool name and its input canonicalized (JSON strings
+    decoded, keys sorted, whitespace dropped), so equivalent inputs share a key.
+    """
+    payload = json.dumps(
+        [tool_name, _canonical(tool_input)], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# results memoized with scope "run" for the current query
+_run_entries: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "run_memo", default=None
+)
+
+
+def start_run_scope() -> contextvars.Token:
+    """Opens an empty run-scoped memo for the current query."""
+    return _run_entries.set({})
+
+
+def end_run_scope(token: contextvars.Token) -> None:
+    """Drops the current query's run-scoped results."""
+    _run_entries.reset(token)
+
+
+class ToolMemo:
+    """
+    Memoized tool results, shared by the agents of a process.
+
+    Results of "global" tools live in a bounded LRU (expired entries are
+    dropped on lookup); results of "run" tools live in the current query's
+    scope and go away with it. Concurrent identical calls share one
+    execution, and only calls that return (rather than raise) are stored.
+    """
+
+    def __init__(self, max_entries: int = TOOL_MEMO_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0}
+        self._per_tool: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool_name: str, counter: str) -> None:
+        self._counters[counter] += 1
+        tool = self._per_tool.setdefault(tool_name, {"hits": 0, "misses": 0, "coalesced": 0})
+        tool[counter] += 1
+
+    def _lookup(self, key: str, policy: MemoPolicy) -> Tuple[bool, Any]:
+        if policy.scope == RUN_SCOPE:
+            entries = _run_entries.get()
+            if entries is None or key not in entries:
+                return False, None
+            return True, entries[key]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._counters["expired"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def _store(self, key: str, policy: MemoPolicy, value: Any) -> None:
+        if policy.scope == RUN_SCOPE:
+            entries = _run_entries.get()
+            if entries is not None:
+                entries[key] = value
+            return
+        expires_at = time.monotonic() + policy.ttl if policy.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    async def call(
+        self,
+        tool_name: str,
+        tool_input: Any,
+        policy: MemoPolicy,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Returns the memoized result of `tool_name(tool_input)`, or awaits
+        `compute()` and memoizes what it returns. Exceptions are not memoized.
+
+        Parameters:
+        tool_name (str): The tool.
+        tool_input (Any): Its input (canonicalized into the key).
+        policy (MemoPolicy): The tool's declaration.
+        compute (Callable[[], Awaitable[Any]]): Runs the tool.
+
+        Returns:
+        Any: The tool's result.
+        """
+        key = memo_key(tool_name, tool_input)
+        if policy.scope == RUN_SCOPE:
+            # keep concurrent run-scoped calls of different queries apart
+            key = f"{id(_run_entries.get())}:{key}"
+        hit, value = self._lookup(key, policy)
+        if hit:
+            self._count(tool_name, "hits")
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(tool_name, "coalesced")
+        else:
+            self._count(tool_name, "misses")
+            # the call runs in its own task, so no single caller owns it
+            task = self._inflight[key] = asyncio.ensure_future(self._compute(key, policy, compute))
+            # mark a failure as retrieved even when nobody was waiting for it
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        # shielded: a caller being cancelled (the first one too) must not cancel the others
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, policy: MemoPolicy, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            self._store(key, policy, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits, misses, coalesced = (self._counters[k] for k in ("hits", "misses", "coalesced"))
+        lookups = hits + misses + coalesced
+        return dict(
+            self._counters,
+            entries=len(self._entries),
+            hit_rate=round((hits + coalesced) / lookups, 3) if lookups else 0.0,
+            tools={name: dict(counts) for name, counts in self._per_tool.items()},
+        )
+
+
+_tool_memo: Optional[ToolMemo] = None
+
+
+def get_tool_memo() -> Optional[ToolMemo]:
+    """
+    Returns the process-wide tool memo, or None when TOOL_MEMO_ENABLED is off.
+    """
+    global _tool_memo
+    if _tool_memo is None and TOOL_MEMO_ENABLED:
+        _tool_memo = ToolMemo()
+    return _tool_memo
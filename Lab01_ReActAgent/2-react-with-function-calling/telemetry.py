@@ -0,0 +1,215 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Instrumentation settings, overridable from the environment
+AGENT_LOG_LEVEL = os.getenv("AGENT_LOG_LEVEL", "INFO")
+AGENT_TELEMETRY_JSONL = os.getenv("AGENT_TELEMETRY_JSONL", "")
+
+# the agents log through this logger instead of printing
+logger = logging.getLogger("react_agent")
+
+# the run and step the current task is working on; asyncio tasks inherit
+# both, so tool calls started by a step are attributed to that step
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("run_id", default=None)
+_step: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("step", default=None)
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """
+    Sends the agent log to stdout as plain messages.
+
+    Parameters:
+    level (str, optional): Logging level name; AGENT_LOG_LEVEL when omitted.
+        WARNING silences the per-step output on hot paths.
+    """
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel((level or AGENT_LOG_LEVEL).upper())
+
+
+class InMemorySink:
+    """Keeps events in a list (tests, benchmarks, ad-hoc analysis)."""
+
+    def __init__(self) -> None:
+        self.events: List[Dict[str, Any]] = []
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink:
+    """Appends one JSON object per event to a file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetrySink:
+    """
+    Re-emits events as OpenTelemetry spans (requires `opentelemetry-api`; the
+    application configures the tracer provider and exporter).
+    """
+
+    def __init__(self, tracer: Optional[Any] = None) -> None:
+        if tracer is None:
+            # imported here to keep opentelemetry (optional) out of agent startup
+            try:
+                from opentelemetry import trace as otel_trace
+            except ImportError:
+                raise RuntimeError("OpenTelemetrySink requires the opentelemetry-api package") from None
+            tracer = otel_trace.get_tracer("react_agent")
+        self.tracer = tracer
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        end_ns = int(event["time"] * 1e9)
+        start_ns = end_ns - int(event.get("duration_ms", 0.0) * 1e6)
+        # span attributes must be primitives
+        attributes = {
+            f"react.{key}": value
+            for key, value in event.items()
+            if key not in ("event", "time") and isinstance(value, (str, bool, int, float))
+        }
+        span = self.tracer.start_span(event["event"], start_time=start_ns, attributes=attributes)
+        span.end(end_time=end_ns)
+
+    def close(self) -> None:
+        pass
+
+
+class Span:
+    """
+    Times one operation and emits it as an event on exit.
+
+    Extra fields (token counts, cache hits, ...) can be added with `set` while
+    the span is open; an exception leaving the span is recorded as `error`.
+    """
+
+    __slots__ = ("telemetry", "fields", "_started")
+
+    def __init__(self, telemetry: "Telemetry", fields: Dict[str, Any]) -> None:
+        self.telemetry = telemetry
+        self.fields = fields
+        self._started = 0.0
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def __enter__(self) -> "Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.fields["duration_ms"] = round((time.perf_counter() - self._started) * 1000, 3)
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.telemetry.emit(**self.fields)
+
+
+class _NullSpan:
+    """Shared no-op span used when no sink is attached."""
+
+    __slots__ = ()
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Telemetry:
+    """
+    Fans instrumentation events out to pluggable sinks.
+
+    Every event carries its name, a wall-clock timestamp and the current run
+    id and step index. Without sinks, spans are a shared no-op so the hot
+    path only pays for an attribute check.
+    """
+
+    def __init__(self, sinks: Optional[List[Any]] = None) -> None:
+        self.sinks: List[Any] = list(sinks or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add_sink(self, sink: Any) -> None:
+        self.sinks.append(sink)
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if not self.sinks:
+            return
+        record = {"event": event, "time": time.time(), "run_id": _run_id.get(), "step": _step.get()}
+        record.update(fields)
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception as ex:
+                logger.warning("Telemetry sink %s failed: %s", type(sink).__name__, ex)
+
+    def span(self, event: str, **fields: Any) -> Any:
+        """Returns a context manager timing `event` (a no-op without sinks)."""
+        if not self.sinks:
+            return _NULL_SPAN
+        return Span(self, dict(fields, event=event))
+
+    @staticmethod
+    def start_run() -> str:
+        """Starts attributing events of the current task to a new run."""
+        run_id = uuid.uuid4().hex[:12]
+        _run_id.set(run_id)
+        _step.set(0)
+        return run_id
+
+    @staticmethod
+    def set_step(step: int) -> None:
+        _step.set(step)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+_telemetry: Optional[Telemetry] = None
+
+
+def get_telemetry() -> Telemetry:
+    """
+    Returns the process-wide telemetry; it writes to AGENT_TELEMETRY_JSONL when
+    that is set and has no sinks otherwise.
+    """
+    global _telemetry
+    if _telemetry is None:
+        sinks = [JsonlSink(AGENT_TELEMETRY_JSONL)] if AGENT_TELEMETRY_JSONL else []
+        _telemetry = Telemetry(sinks)
+    return _telemetry
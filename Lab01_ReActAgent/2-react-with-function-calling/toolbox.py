@@ -1,26 +1,228 @@
 import inspect
-from typing import Iterable, Dict, Callable, Union, Type
+import re
+import typing
+from functools import lru_cache
+from memo import policy_of
+from sandbox import is_sandboxed
+from typing import Any, Iterable, Dict, Callable, List, Optional, Tuple, Union, Type
+
+# JSON Schema types for plain Python annotations
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    tuple: "array",
+    set: "array",
+    dict: "object",
+}
+# Python types accepted for each JSON Schema type during input validation
+_PYTHON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+}
+# "name (type): description" lines of the Parameters section
+_PARAM_DOC = re.compile(r"^\s*(\w+)\s*\([^)]*\)\s*:\s*(.+)$")
+
+
+def _annotation_schema(annotation: Any) -> Dict[str, Any]:
+    """
+    Maps a type annotation to a JSON Schema fragment.
+    Unannotated parameters are treated as strings (the tools take JSON strings).
+    """
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return {"type": "string"}
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is Union:
+        non_null = [a for a in args if a is not type(None)]
+        if len(non_null) == 1:
+            return _annotation_schema(non_null[0])
+        return {"anyOf": [_annotation_schema(a) for a in non_null]}
+    if origin is typing.Literal:
+        return {"enum": list(args)}
+    if origin in (list, tuple, set, frozenset):
+        schema: Dict[str, Any] = {"type": "array"}
+        if args and args[0] is not Ellipsis:
+            schema["items"] = _annotation_schema(args[0])
+        return schema
+    if origin is dict:
+        return {"type": "object"}
+    return {"type": _JSON_TYPES.get(annotation, "string")}
+
+
+def _accepts(schema: Dict[str, Any], value: Any) -> bool:
+    """Whether `value` has one of the JSON types `schema` allows (untyped schemas accept anything)."""
+    if "anyOf" in schema:
+        return any(_accepts(option, value) for option in schema["anyOf"])
+    expected = _PYTHON_TYPES.get(schema.get("type"))
+    if isinstance(value, bool) and schema.get("type") in ("integer", "number"):
+        # bool is an int subclass, but JSON true/false is not a number
+        return False
+    return expected is None or isinstance(value, expected)
+
+
+@lru_cache(maxsize=None)
+def function_schema(func: Callable) -> Dict[str, Any]:
+    """
+    Builds the native tool definition (JSON Schema) of a function from its
+    signature, type hints and docstring. Cached per function.
+
+    Parameters:
+    func (Callable): The tool function.
+
+    Returns:
+    Dict[str, Any]: A chat-completions "function" tool definition.
+    """
+    try:
+        hints = typing.get_type_hints(func)
+    except Exception:
+        hints = {}
+    doc = inspect.cleandoc(func.__doc__ or "")
+    param_docs = {}
+    for line in doc.splitlines():
+        match = _PARAM_DOC.match(line)
+        if match:
+            param_docs[match.group(1)] = match.group(2).strip()
+
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    for name, param in inspect.signature(func).parameters.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD) or name == "self":
+            continue
+        prop = _annotation_schema(hints.get(name, param.annotation))
+        if name in param_docs:
+            prop["description"] = param_docs[name]
+        properties[name] = prop
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+
+    return {
+        "type": "function",
+        "function": {
+            "name": func.__name__,
+            # the summary paragraph is enough; parameter details live in the schema
+            "description": doc.split("\n\n")[0].replace("\n", " "),
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        },
+    }
+
+class ToolEntry:
+    """
+    A tool compiled once at registration: the callable, its signature, the
+    rendered prompt description, its native schema, an input validator, its
+    memo policy (see memo.memoize), if it declared one, and whether it runs in
+    the sandbox (see sandbox.sandboxed).
+    """
+
+    def __init__(self, func: Callable) -> None:
+        self.name = func.__name__
+        self.func = func
+        self.doc = (func.__doc__ or "").strip()
+        self.signature = inspect.signature(func)
+        self.description = f"{self.name}: \"{self.doc}\""
+        self.schema = function_schema(func)
+        self._properties = self.schema["function"]["parameters"]["properties"]
+        self._param_names = list(self._properties)
+        self.memo = policy_of(func)
+        self.sandboxed = is_sandboxed(func)
+
+    def bind(self, tool_input: Any) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """
+        Maps a ReAct `tool_input` onto the tool's parameters. A dict whose keys
+        are all parameter names is passed as keyword arguments, anything else as
+        the single positional argument.
+
+        Returns:
+        Tuple: (args, kwargs), validated against the signature.
+        """
+        if (
+            isinstance(tool_input, dict)
+            and tool_input
+            and set(tool_input) <= set(self._param_names)
+        ):
+            return self.validate((), tool_input)
+        return self.validate((tool_input,), {})
+
+    def validate(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """
+        Checks arguments against the signature and the annotated JSON types.
+
+        Raises:
+        ValueError: If the arguments do not fit the tool.
+        """
+        try:
+            bound = self.signature.bind(*args, **kwargs)
+        except TypeError as ex:
+            raise ValueError(str(ex)) from None
+        for name, value in bound.arguments.items():
+            schema = self._properties.get(name, {})
+            if not _accepts(schema, value):
+                expected = schema.get("type") or " or ".join(o.get("type", "any") for o in schema["anyOf"])
+                raise ValueError(f"argument '{name}' should be {expected}, got {type(value).__name__}")
+        return args, kwargs
+
+    def arguments(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Validated arguments by parameter name, the same however they were passed."""
+        return dict(self.signature.bind(*args, **kwargs).arguments)
+
 
 class ToolBox:
+    """
+    Registry of tools. Each tool is compiled into a ToolEntry once, descriptions
+    and schemas are memoized, and dispatch is a dict lookup restricted to the
+    registered tools. A ToolBox is read-only once built, so a single registry can
+    be shared by any number of agents.
+    """
+
     def __init__(self) -> None:
         # Stores tool name and docstring used by the LLM to call the tools
         self.tools_dict: Dict[str, str] = {}
+        # Stores tool name and compiled entry used for dispatch
+        self.entries: Dict[str, ToolEntry] = {}
+        self._description: Optional[str] = None
+        self._schemas: Optional[List[Dict[str, Any]]] = None
+        self._rendered_prompts: Dict[str, str] = {}
+
+    @property
+    def functions(self) -> Dict[str, Callable]:
+        """Mapping of tool names to their functions."""
+        return {name: entry.func for name, entry in self.entries.items()}
+
+    def get(self, name: str) -> Optional[ToolEntry]:
+        """Returns the registered tool called `name`, or None."""
+        return self.entries.get(name)
 
     def store(self, items: Iterable[Union[Callable, Type]]) -> Dict[str, str]:
         """
         Stores functions or public methods of tool classes along with their docstrings.
 
         Parameters:
-        items (Iterable[Callable or class]): Function objects or classes containing tool methods.
+        items (Iterable[Callable or class]): Function objects or classes containing tool methods
+            (nested lists, tuples and sets are flattened).
 
         Returns:
         Dict[str, str]: Mapping of tool names to their docstrings.
         """
         for obj in items:
-            if inspect.isfunction(obj) or inspect.ismethod(obj):
+            if isinstance(obj, (list, tuple, set, frozenset)):
+                self.store(obj)
+            elif inspect.isfunction(obj) or inspect.ismethod(obj):
                 self._register(obj)
             elif inspect.isclass(obj):
-                # Register each public method from the class
+                # Prefer an explicit user_functions set, else each public method
+                if hasattr(obj, "user_functions"):
+                    self.store(obj.user_functions)
+                    continue
                 for name, method in inspect.getmembers(obj, predicate=inspect.isfunction):
                     if not name.startswith("_"):
                         self._register(method)
@@ -33,20 +235,54 @@ class ToolBox:
 
     def describe_tools(self) -> str:
         """
-        Returns the description of all tools.
+        Returns the description of all tools (rendered once, then memoized).
 
         Returns:
         str: Tool names and their docstrings, formatted.
         """
-        return "\n".join(f"{name}: \"{doc}\"" for name, doc in self.tools_dict.items())
+        if self._description is None:
+            self._description = "\n".join(entry.description for entry in self.entries.values())
+        return self._description
+
+    def render_prompt(self, template: str) -> str:
+        """
+        Returns `template` formatted with the tool descriptions (memoized per template).
+
+        Parameters:
+        template (str): A prompt with a {tool_descriptions} placeholder.
+
+        Returns:
+        str: The rendered prompt.
+        """
+        rendered = self._rendered_prompts.get(template)
+        if rendered is None:
+            rendered = self._rendered_prompts[template] = template.format(
+                tool_descriptions=self.describe_tools()
+            )
+        return rendered
+
+    def tool_schemas(self) -> List[Dict[str, Any]]:
+        """
+        Returns the native tool definitions of all tools, for the API's `tools` parameter.
+
+        Returns:
+        List[Dict[str, Any]]: One JSON Schema function definition per tool.
+        """
+        if self._schemas is None:
+            self._schemas = [entry.schema for entry in self.entries.values()]
+        return self._schemas
 
     def _register(self, func: Callable) -> None:
         """
-        Registers a single function with its docstring.
+        Compiles and registers a single function.
 
         Parameters:
         func (Callable): Function to register.
         """
-        name = func.__name__
-        doc = (func.__doc__ or "").strip()
-        self.tools_dict[name] = doc
+        entry = ToolEntry(func)
+        self.tools_dict[entry.name] = entry.doc
+        self.entries[entry.name] = entry
+        # invalidate the memoized renderings
+        self._description = None
+        self._schemas = None
+        self._rendered_prompts.clear()
@@ -1,89 +1,56 @@
 
-import operator
-import json
-import requests
-from typing import Any, Callable, Set, Dict, List, Optional
+from calculator import calculate
+from memo import memoize
+from observations import read_observation
+from sandbox import sandboxed
+from weather import WEATHER_CACHE_TTL, format_weather, get_weather_client
+from typing import Any, Callable, Set, Dict, List, Optional, Union
 
 class Tools:
-    def basic_calculator(input_str):
+    # model-supplied arithmetic: run it in a worker process with CPU and memory limits
+    @memoize(pure=True)
+    @sandboxed
+    def basic_calculator(input_str: Union[str, dict, list]) -> str:
         """
-        Perform a numeric operation on two numbers based on the input string.
+        Evaluate arithmetic in one call: a single operation, an expression or a batch of them.
 
         Parameters:
-        input_str (str): A JSON string representing a dictionary with keys 'num1', 'num2', and 'operation'.
-                        Example: '{"num1": 5, "num2": 3, "operation": "add"}' or "{'num1': 67869, 'num2': 9030393, 'operation': 'divide'}"
+        input_str (str | dict | list): One of (as JSON text or already decoded)
+                        - an operation: '{"num1": 5, "num2": 3, "operation": "add"}' (operations: add, subtract,
+                          multiply, divide, floor_divide, modulus, power, lt, le, eq, ne, ge, gt); num1/num2 may be
+                          lists of numbers to apply the operation element-wise
+                        - an arithmetic expression: "(67869 / 9030393) * 100" (+ - * / // % **, comparisons, abs,
+                          round, min, max, sqrt, log, log10, exp, sin, cos, tan, pi, e)
+                        - a list of operations and/or expressions: '["12 * 7", {"num1": "r0", "num2": 4, "operation": "divide"}]';
+                          item i's result is available to later items as r<i>
 
         Returns:
-        str: The formatted result of the operation.
-
-        Raises:
-        Exception: If an error occurs during the operation (e.g., division by zero).
-        ValueError: If an unsupported operation is requested or input is invalid.
+        str: The formatted result, or one line per item for a batch.
         """
-        # Clean and parse the input string
-        try:
-            # Replace single quotes with double quotes
-            input_str_clean = input_str.replace("'", "\"")
-            # Remove any extraneous characters such as trailing quotes
-            input_str_clean = input_str_clean.strip().strip("\"")
-            
-            input_dict = json.loads(input_str_clean)
-            num1 = input_dict['num1']
-            num2 = input_dict['num2']
-            operation = input_dict['operation']
-        except (json.JSONDecodeError, KeyError) as e:
-            return str(e), "Invalid input format. Please provide a valid JSON string."
-
-        # Define the supported operations
-        operations = {
-            'add': operator.add,
-            'subtract': operator.sub,
-            'multiply': operator.mul,
-            'divide': operator.truediv,
-            'floor_divide': operator.floordiv,
-            'modulus': operator.mod,
-            'power': operator.pow,
-            'lt': operator.lt,
-            'le': operator.le,
-            'eq': operator.eq,
-            'ne': operator.ne,
-            'ge': operator.ge,
-            'gt': operator.gt
-        }
-        
-        # Check if the operation is supported
-        if operation in operations:
-            try:
-                # Perform the operation
-                result = operations[operation](num1, num2)
-                result_formatted = f"\n\nThe answer is: {result}.\nCalculated with basic_calculator."
-                return result_formatted
-            except Exception as e:
-                return str(e), "\n\nError during operation execution."
-        else:
-            return "\n\nUnsupported operation. Please provide a valid operation."
-        
+        # parsing, limits (e.g. on power exponents) and NumPy vectorization live in calculator.py
+        return calculate(input_str)
 
-    def get_weather(location: str) -> str:
+    # reports change slowly; a repeated lookup within the TTL is answered from the tool memo
+    @memoize(ttl=WEATHER_CACHE_TTL)
+    def get_weather(location: str, days: int = 0, full: bool = False) -> str:
         """
         Fetches the weather information for the specified location.
 
-        Parameters: 
-        The location to fetch weather for.
+        Parameters:
+        location (str): The location to fetch weather for.
+        days (int): Days of forecast to add, today included (0-3; default 0 = current conditions only).
+        full (bool): Return the raw wttr.in report instead (large; only when a field is missing otherwise).
 
-        Returns: 
-        Weather information as a JSON string.
+        Returns:
+        str: Weather information as a compact JSON string.
         """
-        weather_api_base = "https://wttr.in"
-        url = f"{weather_api_base}/{location}?format=j1"
-        
-        response = requests.get(url)
-        
-        return str(response.json())
+        # pooled, cached and coalesced wttr.in lookup, projected onto the fields an answer needs
+        return format_weather(get_weather_client().get(location), days, full)
 
-    # Define user functions
+    # Define user functions (read_observation fetches large outputs spilled from the history)
     user_functions: Set[Callable[..., Any]] = {
         get_weather,
         basic_calculator, 
+        read_observation,
  
     }
\ No newline at end of file
@@ -0,0 +1,371 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+# requests and httpx are imported when the first lookup needs them
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+WEATHER_API_BASE = "https://wttr.in"
+
+# Cache / connection settings, overridable from the environment
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "256"))
+WEATHER_CACHE_PATH = os.getenv("WEATHER_CACHE_PATH")  # unset = memory only
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "10"))
+WEATHER_POOL_SIZE = int(os.getenv("WEATHER_POOL_SIZE", "10"))
+# wttr.in forecasts today plus two days
+WEATHER_MAX_FORECAST_DAYS = 3
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry expiry and LRU eviction.
+
+    Entries expire `ttl` seconds after being stored. When the cache is full the
+    least recently used entry is evicted. If `path` is given, entries are loaded
+    from that JSON file on start-up and written back by `save()`.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, path: Optional[str] = None) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            # wall-clock expiry so persisted entries stay valid across processes
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Write the live entries to `path` (atomically replacing the file)."""
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            live = {k: v for k, v in self._entries.items() if v[0] >= now}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(live, f)
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (expires_at, value) in stored.items():
+            if expires_at >= now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class WeatherClient:
+    """
+    Shared wttr.in fetch layer used by the weather tools.
+
+    - sync (`get`) lookups go through a keep-alive `requests.Session` pool,
+      async (`aget`) lookups through a pooled `httpx.AsyncClient`
+    - concurrent lookups of the same location share one in-flight fetch
+    - responses are kept in a TTL + LRU cache, optionally persisted to disk
+    """
+
+    def __init__(
+        self,
+        ttl: float = WEATHER_CACHE_TTL,
+        max_entries: int = WEATHER_CACHE_MAX_ENTRIES,
+        cache_path: Optional[str] = WEATHER_CACHE_PATH,
+        timeout: float = WEATHER_TIMEOUT,
+        pool_size: int = WEATHER_POOL_SIZE,
+        api_base: str = WEATHER_API_BASE,
+    ) -> None:
+        self.api_base = api_base
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.cache = TTLCache(ttl, max_entries, cache_path)
+        self.fetches = 0
+        self.coalesced = 0
+        self.errors = 0
+
+        self._session: Optional["requests.Session"] = None
+        self._async_client: Optional["httpx.AsyncClient"] = None
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+    def _get_session(self) -> "requests.Session":
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @staticmethod
+    def _key(location: str) -> str:
+        return " ".join(location.split()).lower()
+
+    def _url(self, location: str) -> str:
+        return f"{self.api_base}/{location}?format=j1"
+
+    def get(self, location: str) -> Dict[str, Any]:
+        """
+        Returns the wttr.in `format=j1` payload for a location (blocking).
+        """
+        key = self._key(location)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            self.fetches += 1
+            response = self._get_session().get(self._url(location), timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            self.cache.set(key, data)
+            future.set_result(data)
+            return data
+        except Exception as ex:
+            self.errors += 1
+            future.set_exception(ex)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget(self, location: str) -> Dict[str, Any]:
+        """
+        Returns the wttr.in `format=j1` payload for a location (non-blocking).
+        """
+        key = self._key(location)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._async_inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # the fetch runs in its own task, so no single waiter owns it
+            task = self._async_inflight[key] = asyncio.ensure_future(self._afetch(key, location))
+            # mark a failure retrieved in case every waiter gave up
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        # shield so a waiter's cancellation (the first one's too) does not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    async def _afetch(self, key: str, location: str) -> Dict[str, Any]:
+        try:
+            self.fetches += 1
+            if self._async_client is None:
+                import httpx
+
+                self._async_client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.pool_size,
+                                        max_keepalive_connections=self.pool_size),
+                )
+            response = await self._async_client.get(self._url(location))
+            response.raise_for_status()
+            data = response.json()
+            self.cache.set(key, data)
+            return data
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache and fetch counters.
+        """
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "hit_rate": round(self.cache.hits / lookups, 3) if lookups else 0.0,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "entries": len(self.cache),
+        }
+
+    def close(self) -> None:
+        self.cache.save()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+def _number(value: Any) -> Any:
+    # j1 reports every number as a string
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def _text(items: Any) -> Optional[str]:
+    # j1 wraps texts as [{"value": ...}]
+    if isinstance(items, list) and items and isinstance(items[0], dict):
+        return items[0].get("value")
+    return None
+
+
+def _present(fields: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in fields.items() if value is not None}
+
+
+def _day_summary(day: Dict[str, Any]) -> Dict[str, Any]:
+    hourly: List[Dict[str, Any]] = day.get("hourly") or []
+    summary = _present({
+        "date": day.get("date"),
+        "min_c": _number(day.get("mintempC")),
+        "max_c": _number(day.get("maxtempC")),
+    })
+    if hourly:
+        # the midday slot describes the day best
+        condition = _text(hourly[len(hourly) // 2].get("weatherDesc"))
+        if condition:
+            summary["condition"] = condition
+        chances = [_number(h.get("chanceofrain")) for h in hourly]
+        chances = [c for c in chances if isinstance(c, (int, float))]
+        if chances:
+            summary["rain_chance_pct"] = max(chances)
+        precipitation = [_number(h.get("precipMM")) for h in hourly]
+        precipitation = [p for p in precipitation if isinstance(p, (int, float))]
+        if precipitation:
+            summary["precip_mm"] = round(sum(precipitation), 1)
+    return summary
+
+
+def compact_weather(data: Dict[str, Any], days: int = 0) -> Dict[str, Any]:
+    """
+    Projects a wttr.in `format=j1` payload onto the fields an answer needs:
+    the place, the current conditions and today's min/max, plus a one-line
+    summary per forecast day when `days` > 0.
+
+    Parameters:
+    data (Dict[str, Any]): The j1 payload.
+    days (int): Forecast days to summarize (0 to 3, today included).
+
+    Returns:
+    Dict[str, Any]: The compact report (fields missing from the payload are left out).
+    """
+    report: Dict[str, Any] = {}
+    area = (data.get("nearest_area") or [{}])[0]
+    place = [_text(area.get(field)) for field in ("areaName", "region", "country")]
+    if any(place):
+        report["location"] = ", ".join(p for p in place if p)
+
+    current = (data.get("current_condition") or [{}])[0]
+    if current:
+        report["current"] = _present({
+            "observed": current.get("localObsDateTime"),
+            "condition": _text(current.get("weatherDesc")),
+            "temp_c": _number(current.get("temp_C")),
+            "feels_like_c": _number(current.get("FeelsLikeC")),
+            "humidity_pct": _number(current.get("humidity")),
+            "wind_kph": _number(current.get("windspeedKmph")),
+            "wind_dir": current.get("winddir16Point"),
+            "precip_mm": _number(current.get("precipMM")),
+        })
+
+    forecast = data.get("weather") or []
+    if forecast:
+        today = forecast[0]
+        report["today"] = _present({"min_c": _number(today.get("mintempC")), "max_c": _number(today.get("maxtempC"))})
+    days = max(0, min(days, WEATHER_MAX_FORECAST_DAYS))
+    if days:
+        report["forecast"] = [_day_summary(day) for day in forecast[:days]]
+    return report
+
+
+def format_weather(data: Dict[str, Any], days: int = 0, full: bool = False) -> str:
+    """
+    Renders a j1 payload as the weather tools' observation: the compact
+    report as minimal JSON, or with `full` the whole payload as JSON.
+    """
+    if full:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(compact_weather(data, days), separators=(",", ":"), ensure_ascii=False)
+
+
+_weather_client: Optional[WeatherClient] = None
+_weather_client_lock = threading.Lock()
+
+
+def get_weather_client() -> WeatherClient:
+    """
+    Returns the process-wide weather client (created on first use).
+    """
+    global _weather_client
+    if _weather_client is None:
+        with _weather_client_lock:
+            if _weather_client is None:
+                _weather_client = WeatherClient()
+                # persist the cache (when configured) on interpreter exit
+                atexit.register(_weather_client.cache.save)
+    return _weather_client
@@ -1,34 +1,31 @@
 import asyncio
 from typing import Any
 import json
-import requests 
 from mcp.server.fastmcp import FastMCP 
+from weather import format_weather, get_weather_client
+from tool_runtime import limited
 
 # Initialize FastMCP server
 mcp = FastMCP("Weather")
 
-#defining constants
-weather_api_base = "https://wttr.in"
-
 # defining the MCP tools using the annotator @mcp.tool()
 @mcp.tool()
-async def get_weather_info(location: str) -> str:
+@limited(max_concurrency=8, timeout=15)
+async def get_weather_info(location: str, days: int = 0, full: bool = False) -> str:
     """
     Fetches the weather information for the specified location.
 
     Parameters:
-    name (str): The location to fetch weather for.
+    location (str): The location to fetch weather for.
+    days (int): Days of forecast to add, today included (0-3; default 0 = current conditions only).
+    full (bool): Return the raw wttr.in report instead (large; only when a field is missing otherwise).
 
     Returns:
-    str: Weather information as a JSON string.
+    str: Weather information as a compact JSON string.
     """
-    
-    weather_api_base = "https://wttr.in"
-    url = f"{weather_api_base}/{location}?format=j1"
-    
-    response = requests.get(url)
-    
-    return str(response.json())
+    # pooled, cached and coalesced wttr.in lookup that does not block the loop,
+    # projected onto the fields an answer needs
+    return format_weather(await get_weather_client().aget(location), days, full)
 
 if __name__ == "__main__":
     # initialize and start the MCP server
@@ -2,6 +2,7 @@ import asyncio
 import nest_asyncio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from tool_manifest import content_hash, get_manifest_store, server_identity
 
 nest_asyncio.apply()  # Needed to run interactive python
 
@@ -16,12 +17,18 @@ async def main():
     async with stdio_client(server_params) as (read_stream, write_stream):
         async with ClientSession(read_stream, write_stream) as session:
             # Initialize the connection
-            await session.initialize()
+            init_result = await session.initialize()
 
-            # List available tools
-            tools_result = await session.list_tools()
+            # List available tools (from the cached manifest while the server script is unchanged)
+            store = get_manifest_store()
+            identity = server_identity(server_params.command, server_params.args)
+            script_hash = content_hash(server_params.args[0])
+            manifest = store.get(identity, script_hash, init_result.serverInfo)
+            if manifest is None:
+                tools_result = await session.list_tools()
+                manifest = store.put(identity, script_hash, init_result.serverInfo, tools_result.tools)
             print("Available tools:")
-            for tool in tools_result.tools:
+            for tool in manifest.tools:
                 print(f"  - {tool.name}: {tool.description}")
 
             # Call our greeting tool
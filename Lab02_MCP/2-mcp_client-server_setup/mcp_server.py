@@ -1,5 +1,5 @@
-import requests
 from mcp.server.fastmcp import FastMCP
+from server_runner import create_http_app, run_server
 
 
 # Create an MCP server
@@ -22,14 +22,12 @@ async def greeting(name: str) -> str:
     return f"Hello, {name}! This is a simple MCP server response."
 
 
+def create_app():
+    """ASGI app for the HTTP transports (imported by every uvicorn worker)."""
+    return create_http_app(mcp)
+
+
 # Run the server
 if __name__ == "__main__":
-    transport = "stdio"
-    if transport == "stdio":
-        print("Running server with stdio transport")
-        mcp.run(transport="stdio")
-    elif transport == "sse":
-        print("Running server with SSE transport")
-        mcp.run(transport="sse")
-    else:
-        raise ValueError(f"Unknown transport: {transport}")
\ No newline at end of file
+    # e.g. python mcp_server.py --transport streamable-http --workers 4
+    run_server(mcp, "mcp_server:create_app", "Simple MCP server")
\ No newline at end of file
@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from batch import _percentile
+from deadline import AGENT_DEADLINE, AGENT_MAX_STEPS, ERROR, AgentResult
+from telemetry import configure_logging, logger
+
+# Agent service settings, overridable from the environment (and then the CLI)
+AGENT_SERVICE_HOST = os.getenv("AGENT_SERVICE_HOST", "0.0.0.0")
+AGENT_SERVICE_PORT = int(os.getenv("AGENT_SERVICE_PORT", "8080"))
+# warm agents, i.e. queries answered at once
+AGENT_SERVICE_WORKERS = int(os.getenv("AGENT_SERVICE_WORKERS", "16"))
+# queries waiting for an agent; beyond this new queries get a 429
+AGENT_SERVICE_QUEUE_SIZE = int(os.getenv("AGENT_SERVICE_QUEUE_SIZE", "64"))
+# a query not taken by an agent within this many seconds is answered with a 503
+AGENT_SERVICE_MAX_QUEUE_WAIT = float(os.getenv("AGENT_SERVICE_MAX_QUEUE_WAIT", "30"))
+# latencies kept for the percentiles in /stats
+AGENT_SERVICE_LATENCY_WINDOW = int(os.getenv("AGENT_SERVICE_LATENCY_WINDOW", "2048"))
+
+
+class ServiceSaturated(Exception):
+    """The admission queue is full; the caller should retry later."""
+
+
+class QueueTimeout(Exception):
+    """A query waited longer than `max_queue_wait` for a free agent."""
+
+
+class LatencyWindow:
+    """The latest `size` latencies of one kind, for rolling percentiles."""
+
+    def __init__(self, size: int = AGENT_SERVICE_LATENCY_WINDOW) -> None:
+        self._values: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._values.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self._values)
+        return {
+            "count": len(ordered),
+            "p50_s": round(_percentile(ordered, 50), 4),
+            "p90_s": round(_percentile(ordered, 90), 4),
+            "p99_s": round(_percentile(ordered, 99), 4),
+            "max_s": round(ordered[-1], 4) if ordered else 0.0,
+        }
+
+
+class _Job:
+    def __init__(self, query: str, deadline: Optional[float], max_steps: Optional[int]) -> None:
+        self.query = query
+        self.deadline = deadline
+        self.max_steps = max_steps
+        self.enqueued_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        # set when an agent takes the query
+        self.started: "asyncio.Future[None]" = loop.create_future()
+        self.future: "asyncio.Future[AgentResult]" = loop.create_future()
+
+
+class AgentService:
+    """
+    Serves queries from a pool of warm agents.
+
+    Queries enter a bounded admission queue and `workers` tasks, each owning
+    one agent, take them off it. Every agent shares the process-wide LLM client
+    and MCP session pool, so adding workers adds concurrency, not connections.
+    When the queue is full `submit` raises ServiceSaturated at once (the HTTP
+    front end answers 429) instead of letting latency grow without bound, and
+    a query no agent took within `max_queue_wait` seconds is dropped. The
+    deadline and step cap a query asks for are clamped to the service's.
+
+    Parameters:
+    agent_factory (Callable[[], Any]): Builds one agent exposing
+        `async execute(query, deadline, max_steps) -> AgentResult`.
+    workers (int): Number of agents.
+    queue_size (int): Queries that may wait for an agent.
+    max_queue_wait (float): Seconds a query may wait (0 = no limit).
+    deadline (float): Longest deadline a query may ask for (0 = no limit).
+    max_steps (int): Largest step cap a query may ask for (0 = no limit).
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], Any],
+        workers: int = AGENT_SERVICE_WORKERS,
+        queue_size: int = AGENT_SERVICE_QUEUE_SIZE,
+        max_queue_wait: float = AGENT_SERVICE_MAX_QUEUE_WAIT,
+        deadline: float = AGENT_DEADLINE,
+        max_steps: int = AGENT_MAX_STEPS,
+    ) -> None:
+        self.agent_factory = agent_factory
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.max_queue_wait = max_queue_wait
+        self.deadline = deadline
+        self.max_steps = max_steps
+        self.agents: List[Any] = []
+        self._queue: Optional["asyncio.Queue[_Job]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._busy = 0
+        self._started_at = time.monotonic()
+        self._counters: Counter = Counter()
+        self._statuses: Counter = Counter()
+        self._latency = LatencyWindow()
+        self._queue_wait = LatencyWindow()
+        self._run_time = LatencyWindow()
+
+    async def start(self) -> None:
+        """Builds and warms the agents, then starts taking queries."""
+        self._queue = asyncio.Queue(self.queue_size)
+        self.agents = [self.agent_factory() for _ in range(self.workers)]
+        # the agents share one session pool, so warming the first warms them all
+        warm = getattr(self.agents[0], "_connect", None)
+        if warm is not None:
+            await warm()
+        self._tasks = [asyncio.create_task(self._worker(agent)) for agent in self.agents]
+        self._started_at = time.monotonic()
+
+    def limits(self, deadline: Optional[float], max_steps: Optional[int]) -> Tuple[Optional[float], Optional[int]]:
+        """
+        The deadline and step cap a query gets: what it asked for, at most the
+        service's own (None = the service's).
+        """
+        if deadline is not None and self.deadline:
+            deadline = min(deadline, self.deadline)
+        if max_steps is not None and self.max_steps:
+            max_steps = min(max_steps, self.max_steps)
+        return deadline, max_steps
+
+    async def submit(
+        self, query: str, deadline: Optional[float] = None, max_steps: Optional[int] = None
+    ) -> AgentResult:
+        """
+        Queues a query and waits for its result.
+
+        Raises:
+        ServiceSaturated: If the admission queue is full.
+        QueueTimeout: If no agent took the query within `max_queue_wait` seconds.
+        """
+        if self._queue is None:
+            raise RuntimeError("AgentService is not started")
+        job = _Job(query, *self.limits(deadline, max_steps))
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            raise ServiceSaturated(f"{self._queue.qsize()} queries queued") from None
+        self._counters["accepted"] += 1
+        try:
+            if self.max_queue_wait:
+                try:
+                    await asyncio.wait_for(asyncio.shield(job.started), self.max_queue_wait)
+                except asyncio.TimeoutError:
+                    self._counters["queue_timeouts"] += 1
+                    raise QueueTimeout(f"queued for {self.max_queue_wait:g}s") from None
+            return await job.future
+        finally:
+            # a caller that timed out or went away cancels the job; a worker skips it
+            if not job.future.done():
+                job.future.cancel()
+
+    async def _worker(self, agent: Any) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.done():
+                    # the caller gave up (or timed out) while the query was queued
+                    self._counters["abandoned"] += 1
+                    continue
+                job.started.set_result(None)
+                self._queue_wait.add(time.monotonic() - job.enqueued_at)
+                await self._run(agent, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, agent: Any, job: _Job) -> None:
+        self._busy += 1
+        started = time.monotonic()
+        try:
+            result = await agent.execute(job.query, deadline=job.deadline, max_steps=job.max_steps)
+        except Exception as ex:
+            logger.exception("query failed")
+            result = AgentResult(f"Error: {ex}", ERROR, 0, time.monotonic() - started)
+        finally:
+            self._busy -= 1
+        self._run_time.add(time.monotonic() - started)
+        self._latency.add(time.monotonic() - job.enqueued_at)
+        self._statuses[result.status] += 1
+        self._counters["completed"] += 1
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and latency percentiles (total, queued, running)."""
+        uptime = time.monotonic() - self._started_at
+        return {
+            "workers": self.workers,
+            "busy": self._busy,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "uptime_s": round(uptime, 1),
+            "throughput_qps": round(self._counters["completed"] / uptime, 3) if uptime > 0 else 0.0,
+            "counters": dict(self._counters),
+            "statuses": dict(self._statuses),
+            "latency": self._latency.summary(),
+            "queue_wait": self._queue_wait.summary(),
+            "run_time": self._run_time.summary(),
+        }
+
+    async def aclose(self) -> None:
+        """Stops the workers, failing queued queries, and closes the agents."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(ServiceSaturated("service is shutting down"))
+        await asyncio.gather(*(agent.aclose() for agent in self.agents), return_exceptions=True)
+
+
+def create_app(service: AgentService, on_shutdown: Optional[Callable[[], Any]] = None) -> Any:
+    """
+    The HTTP front end of `service`:
+
+    - POST /query with {"query": ..., "deadline": seconds?, "max_steps": n?}
+      returns the AgentResult as JSON, 400 for an invalid request (deadline
+      and max_steps must be positive; larger ones are clamped to the
+      service's), 429 (with Retry-After) when the queue is full and 503 when
+      no agent took the query in time;
+    - GET /stats returns `service.stats()`;
+    - GET /healthz returns 200 once the agents are warm.
+
+    `on_shutdown` is awaited after the service has stopped.
+    """
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def query(request: Request) -> JSONResponse:
+        try:
+            body = await request.json()
+            text = body["query"]
+            deadline = body.get("deadline")
+            max_steps = body.get("max_steps")
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError("query must be a non-empty string")
+            # bool is an int too; 0 would mean "unlimited" to the agent
+            if deadline is not None and (
+                isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or not deadline > 0
+            ):
+                raise ValueError("deadline must be a positive number of seconds")
+            if max_steps is not None and (
+                isinstance(max_steps, bool) or not isinstance(max_steps, int) or max_steps <= 0
+            ):
+                raise ValueError("max_steps must be a positive integer")
+        except (ValueError, KeyError, TypeError, AttributeError) as ex:
+            return JSONResponse({"error": f"invalid request: {ex}"}, status_code=400)
+        try:
+            result = await service.submit(text, deadline=deadline, max_steps=max_steps)
+        except ServiceSaturated as ex:
+            return JSONResponse({"error": f"service saturated: {ex}"}, status_code=429, headers={"Retry-After": "1"})
+        except QueueTimeout as ex:
+            return JSONResponse({"error": f"no agent available: {ex}"}, status_code=503, headers={"Retry-After": "1"})
+        return JSONResponse(result.to_dict())
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse(service.stats())
+
+    async def healthz(request: Request) -> JSONResponse:
+        return JSONResponse({"ok": bool(service.agents)}, status_code=200 if service.agents else 503)
+
+    @asynccontextmanager
+    async def lifespan(app: Any) -> AsyncIterator[None]:
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.aclose()
+            if on_shutdown is not None:
+                await on_shutdown()
+
+    return Starlette(
+        routes=[
+            Route("/query", query, methods=["POST"]),
+            Route("/stats", stats, methods=["GET"]),
+            Route("/healthz", healthz, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def load_agent_class() -> Any:
+    """The ReActAgent of react-mcp-client.py (whose file name is not importable)."""
+    module = sys.modules.get("react_mcp_client")
+    if module is None:
+        spec = importlib.util.spec_from_file_location(
+            "react_mcp_client", Path(__file__).with_name("react-mcp-client.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["react_mcp_client"] = module
+        spec.loader.exec_module(module)
+    return module.ReActAgent
+
+
+def load_factory(path: str) -> Callable[..., Any]:
+    """Imports a "module:attribute" factory, e.g. "fakes:FakeChatClient"."""
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ReAct agent with MCP tools, served over HTTP")
+    parser.add_argument("--host", default=AGENT_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=AGENT_SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=AGENT_SERVICE_WORKERS,
+                        help="warm agents, i.e. queries answered concurrently")
+    parser.add_argument("--queue-size", type=int, default=AGENT_SERVICE_QUEUE_SIZE,
+                        help="queries waiting for an agent before new ones get a 429")
+    parser.add_argument("--max-queue-wait", type=float, default=AGENT_SERVICE_MAX_QUEUE_WAIT,
+                        help="seconds a query may wait for an agent before a 503 (0 = no limit)")
+    parser.add_argument("--server-url", default=None,
+                        help="shared MCP server URL instead of local stdio processes")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream model output and start tool calls as soon as they are generated")
+    parser.add_argument("--max-steps", type=int, default=AGENT_MAX_STEPS,
+                        help="reasoning steps per query unless the request sets max_steps (0 = unlimited)")
+    parser.add_argument("--deadline", type=float, default=AGENT_DEADLINE,
+                        help="seconds per query unless the request sets a deadline (0 = unlimited)")
+    parser.add_argument("--llm-factory", default=None,
+                        help='"module:callable" building the chat client instead of Azure OpenAI, '
+                             'e.g. "fakes:FakeChatClient" with benchmarks/ on PYTHONPATH')
+    parser.add_argument("--log-level", default=os.getenv("AGENT_LOG_LEVEL", "WARNING"),
+                        help="agent log level (per-step output is off by default)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    configure_logging(args.log_level)
+    import uvicorn
+    from llm import aclose_async_client
+    from mcp_pool import aclose_session_pools
+
+    agent_class = load_agent_class()
+    client = load_factory(args.llm_factory)() if args.llm_factory else None
+
+    def make_agent() -> Any:
+        return agent_class(
+            server_url=args.server_url,
+            client=client,
+            stream=args.stream,
+            max_steps=args.max_steps,
+            deadline=args.deadline,
+        )
+
+    async def shutdown() -> None:
+        await aclose_session_pools()
+        await aclose_async_client()
+
+    service = AgentService(
+        make_agent, args.workers, args.queue_size, args.max_queue_wait, args.deadline, args.max_steps
+    )
+    print(f"Serving {args.workers} agents on http://{args.host}:{args.port}", file=sys.stderr)
+    # one process: the agents share its LLM client and MCP sessions
+    uvicorn.run(create_app(service, shutdown), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
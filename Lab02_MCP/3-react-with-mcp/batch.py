@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_CONCURRENCY = 8
+
+
+def positive_int(value: str) -> int:
+    """argparse type for --concurrency: an integer of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def _read_queries(input_path: str, query_field: str = "query") -> Iterator[Dict[str, Any]]:
+    """
+    Yields {"id", "query"} records from a JSONL file.
+
+    Each line may be a JSON object holding the query under `query_field`
+    (plus an optional "id"), or a bare JSON string. A line that is not valid
+    JSON or holds no query yields {"id", "query": None, "error"} instead, so
+    one bad line does not stop the batch.
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as ex:
+                yield {"id": line_no, "query": None, "error": f"line {line_no}: invalid JSON: {ex}"}
+                continue
+            if isinstance(record, str):
+                yield {"id": line_no, "query": record}
+                continue
+            record_id = record.get("id", line_no) if isinstance(record, dict) else line_no
+            query = record.get(query_field) if isinstance(record, dict) else None
+            if not isinstance(query, str):
+                yield {"id": record_id, "query": None,
+                       "error": f"line {line_no}: no '{query_field}' string in the record"}
+            else:
+                yield {"id": record_id, "query": query}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies: List[float], wall_time: float, errors: int = 0) -> Dict[str, Any]:
+    """
+    Aggregates per-query latencies into throughput and latency percentiles.
+
+    Parameters:
+    latencies (List[float]): Per-query latencies in seconds.
+    wall_time (float): Total elapsed wall time in seconds.
+    errors (int): Number of failed queries.
+
+    Returns:
+    Dict[str, Any]: Summary statistics.
+    """
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "queries": count,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_qps": round(count / wall_time, 3) if wall_time > 0 else 0.0,
+        "latency_mean_s": round(sum(ordered) / count, 3) if count else 0.0,
+        "latency_p50_s": round(_percentile(ordered, 50), 3),
+        "latency_p90_s": round(_percentile(ordered, 90), 3),
+        "latency_p99_s": round(_percentile(ordered, 99), 3),
+        "latency_max_s": round(ordered[-1], 3) if count else 0.0,
+    }
+
+
+async def run_batch(
+    agent: Any,
+    input_path: str,
+    output_path: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    query_field: str = "query",
+) -> Dict[str, Any]:
+    """
+    Runs every query of a JSONL file through one warm agent.
+
+    Up to `concurrency` queries run at once on the same agent (and therefore the
+    same LLM client and tool connections). Each result is appended to
+    `output_path` as soon as its query finishes, so results stream out in
+    completion order rather than input order.
+
+    Parameters:
+    agent: An agent exposing `async run(query) -> str`; agents that also expose
+        `async execute(query) -> AgentResult` get each query's status and
+        step count recorded (and counted in the summary).
+    input_path (str): JSONL file of queries.
+    output_path (str): JSONL file to write results to.
+    concurrency (int): Maximum number of queries in flight.
+    query_field (str): Key holding the query in each input object.
+
+    Returns:
+    Dict[str, Any]: Aggregate throughput and latency statistics. Input lines
+        that could not be read are written as error rows and counted in
+        "errors", but not in "queries".
+
+    Raises:
+    ValueError: If `concurrency` is below 1 (no query would ever run).
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    latencies: List[float] = []
+    errors = 0
+    statuses: Dict[str, int] = {}
+
+    with open(output_path, "w", encoding="utf-8") as out:
+
+        async def worker() -> None:
+            nonlocal errors
+            while True:
+                record = await queue.get()
+                if record is None:
+                    return
+                error: Optional[str] = record.get("error")
+                answer: Optional[str] = None
+                outcome: Dict[str, Any] = {}
+                started = time.perf_counter()
+                if error is not None:
+                    # an unreadable input line: report it and move on
+                    errors += 1
+                    out.write(json.dumps({"id": record["id"], "query": None, "answer": None, "error": error},
+                                         ensure_ascii=False) + "\n")
+                    out.flush()
+                    continue
+                try:
+                    if hasattr(agent, "execute"):
+                        result = await agent.execute(record["query"])
+                        answer = result.answer
+                        outcome = {"status": result.status, "steps": result.steps}
+                        statuses[result.status] = statuses.get(result.status, 0) + 1
+                    else:
+                        answer = await agent.run(record["query"])
+                except Exception as ex:
+                    error = str(ex)
+                    errors += 1
+                latency = time.perf_counter() - started
+                latencies.append(latency)
+                out.write(json.dumps({
+                    "id": record["id"],
+                    "query": record["query"],
+                    "answer": answer,
+                    "error": error,
+                    **outcome,
+                    "latency_s": round(latency, 3),
+                }, ensure_ascii=False) + "\n")
+                out.flush()
+
+        started = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            # the bounded queue keeps only a small window of the file in memory
+            for record in _read_queries(input_path, query_field):
+                await queue.put(record)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        wall_time = time.perf_counter() - started
+
+    summary = summarize_latencies(latencies, wall_time, errors)
+    if statuses:
+        summary["statuses"] = statuses
+    return summary
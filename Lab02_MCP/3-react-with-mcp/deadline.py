@@ -0,0 +1,137 @@
+import asyncio
+import contextvars
+import os
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+# Per-query limits, overridable from the environment (0 disables a limit)
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "10"))
+AGENT_DEADLINE = float(os.getenv("AGENT_DEADLINE", "120"))
+# caps on a single LLM or tool call, within what the query has left
+AGENT_LLM_TIMEOUT = float(os.getenv("AGENT_LLM_TIMEOUT", "60"))
+AGENT_TOOL_TIMEOUT = float(os.getenv("AGENT_TOOL_TIMEOUT", "30"))
+# seconds of the budget held back for the forced final answer (at most a quarter of it)
+AGENT_FINAL_ANSWER_RESERVE = float(os.getenv("AGENT_FINAL_ANSWER_RESERVE", "10"))
+
+# how a run ended
+ANSWERED = "answered"
+MAX_STEPS = "max_steps"
+DEADLINE = "deadline"
+ERROR = "error"
+
+
+class DeadlineExceeded(Exception):
+    """The query's latency budget ran out."""
+
+
+class Deadline:
+    """
+    The latency budget of one query. LLM and tool calls take their timeouts
+    from it, so the budget flows down into every call of the run.
+    """
+
+    def __init__(self, seconds: Optional[float] = AGENT_DEADLINE) -> None:
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds if seconds else None
+        self.reserve = min(AGENT_FINAL_ANSWER_RESERVE, seconds / 4) if seconds else 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def expired(self, keep_reserve: bool = False) -> bool:
+        """True once the budget (or, with `keep_reserve`, all but the reserve) is used up."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= (self.reserve if keep_reserve else 0.0)
+
+    def timeout(self, cap: Optional[float] = None, keep_reserve: bool = True) -> Optional[float]:
+        """
+        Seconds the next call may take: `cap` shortened to what the budget has
+        left (minus the final-answer reserve unless `keep_reserve` is False).
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return cap or None
+        left = max(remaining - (self.reserve if keep_reserve else 0.0), 0.0)
+        return min(cap, left) if cap else left
+
+
+# the deadline of the current run; tool calls started by the run (also
+# streamed ones started with create_task) inherit it
+_run_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "run_deadline", default=None
+)
+_NO_DEADLINE = Deadline(None)
+
+
+def current_deadline() -> Deadline:
+    return _run_deadline.get() or _NO_DEADLINE
+
+
+def set_deadline(deadline: Deadline) -> contextvars.Token:
+    return _run_deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _run_deadline.reset(token)
+
+
+async def with_timeout(awaitable: Awaitable[Any], cap: Optional[float] = None, keep_reserve: bool = True) -> Any:
+    """
+    Awaits `awaitable` for at most `cap` seconds and never past the current
+    run's deadline; the awaitable is cancelled when time runs out.
+
+    Raises:
+    DeadlineExceeded: If the run's deadline cut the call short.
+    TimeoutError: If the call took longer than `cap`.
+    """
+    deadline = current_deadline()
+    timeout = deadline.timeout(cap, keep_reserve)
+    try:
+        if timeout is None:
+            return await awaitable
+        if hasattr(asyncio, "timeout"):
+            # Python 3.11+: no extra task per call, unlike wait_for
+            async with asyncio.timeout(timeout):
+                return await awaitable
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        if deadline.expired(keep_reserve):
+            raise DeadlineExceeded(f"query deadline reached after {deadline.elapsed():.1f}s") from None
+        raise TimeoutError(f"timed out after {timeout:g}s") from None
+
+
+class AgentResult:
+    """
+    The outcome of one query.
+
+    `status` is "answered", "max_steps" or "deadline" (the answer was forced
+    or pieced together from the observations so far) or "error"; `steps` is
+    the number of LLM steps taken.
+    """
+
+    def __init__(self, answer: Optional[str], status: str, steps: int, elapsed_s: float) -> None:
+        self.answer = answer
+        self.status = status
+        self.steps = steps
+        self.elapsed_s = elapsed_s
+
+    @property
+    def partial(self) -> bool:
+        return self.status in (MAX_STEPS, DEADLINE)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "answer": self.answer,
+            "status": self.status,
+            "steps": self.steps,
+            "elapsed_s": round(self.elapsed_s, 3),
+        }
+
+    def __repr__(self) -> str:
+        return f"AgentResult(status={self.status!r}, steps={self.steps}, elapsed_s={self.elapsed_s:.3f})"
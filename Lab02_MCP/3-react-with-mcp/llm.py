@@ -0,0 +1,246 @@
+import asyncio
+import inspect
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+# openai, httpx and azure.identity take most of the agents' import time, so
+# they are imported on first use rather than at startup
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI
+
+load_dotenv()
+
+# Azure OpenAI Configuration
+AZURE_AI_ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
+AZURE_AI_API_VERSION = os.getenv("AZURE_AI_API_VERSION", "2024-12-01-preview")
+TOKEN_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+# HTTP connection pool shared by every agent in the process
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+
+# Bearer token refresh: fetch the next token this long before the current one
+# expires, retry a failed background refresh after this many seconds, and make
+# requests wait for a new token once less than this many seconds are left
+TOKEN_REFRESH_MARGIN = float(os.getenv("LLM_TOKEN_REFRESH_MARGIN", "300"))
+TOKEN_RETRY_INTERVAL = float(os.getenv("LLM_TOKEN_RETRY_INTERVAL", "10"))
+TOKEN_MIN_VALIDITY = float(os.getenv("LLM_TOKEN_MIN_VALIDITY", "30"))
+
+
+class TokenManager:
+    """
+    Keeps the Azure OpenAI bearer token fresh for every agent in the process.
+
+    A background task fetches the next token `refresh_margin` seconds before
+    the current one expires, so LLM calls only wait on the credential for the
+    very first token (or when a token has actually run out). Callers that do
+    have to wait share one in-flight refresh.
+
+    `credential` is anything with azure-core's `get_token(scope)` returning an
+    object with `token` and `expires_on` (epoch seconds), e.g. a fake in tests;
+    sync credentials run on a worker thread, async ones are awaited. It
+    defaults to a DefaultAzureCredential built on first use.
+    """
+
+    def __init__(
+        self,
+        credential: Any = None,
+        scope: str = TOKEN_SCOPE,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN,
+        retry_interval: float = TOKEN_RETRY_INTERVAL,
+        min_validity: float = TOKEN_MIN_VALIDITY,
+    ) -> None:
+        self._credential = credential
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.min_validity = min_validity
+        self._token: Optional[str] = None
+        self._expires_on = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refreshing: Optional["asyncio.Future[None]"] = None
+        self._refresher: Optional["asyncio.Task[None]"] = None
+        self._counters = {
+            "refreshes": 0, "background_refreshes": 0, "inline_refreshes": 0,
+            "failures": 0, "waits": 0, "coalesced": 0,
+        }
+        self._refresh_ms: List[float] = []
+
+    @property
+    def credential(self) -> Any:
+        if self._credential is None:
+            from azure.identity import DefaultAzureCredential
+
+            self._credential = DefaultAzureCredential()
+        return self._credential
+
+    async def get_token(self) -> str:
+        """
+        Returns a token valid for at least `min_validity` seconds.
+
+        Returns:
+        str: The bearer token.
+        """
+        self._ensure_refresher()
+        if self._token is None or self._expires_on - time.time() < self.min_validity:
+            self._counters["waits"] += 1
+            await self._refresh(background=False)
+        return self._token
+
+    # the manager itself can be passed as an async azure_ad_token_provider
+    async def __call__(self) -> str:
+        return await self.get_token()
+
+    def _ensure_refresher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # futures and tasks of a previous event loop cannot be awaited here
+            self._loop = loop
+            self._refreshing = None
+            self._refresher = None
+        if self._refresher is None or self._refresher.done():
+            self._refresher = loop.create_task(self._refresh_loop())
+
+    async def _refresh(self, background: bool) -> None:
+        """Fetches a new token, joining the refresh already in flight if any."""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._fetch(background))
+        else:
+            self._counters["coalesced"] += 1
+        # shielded: a cancelled caller must not cancel the shared refresh
+        await asyncio.shield(self._refreshing)
+
+    async def _fetch(self, background: bool) -> None:
+        get_token = self.credential.get_token
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(get_token):
+                access = await get_token(self.scope)
+            else:
+                access = await asyncio.to_thread(get_token, self.scope)
+        except Exception:
+            self._counters["failures"] += 1
+            raise
+        self._refresh_ms.append((time.perf_counter() - started) * 1000)
+        self._token, self._expires_on = access.token, float(access.expires_on)
+        self._counters["refreshes"] += 1
+        self._counters["background_refreshes" if background else "inline_refreshes"] += 1
+
+    async def _refresh_loop(self) -> None:
+        """Refreshes the token `refresh_margin` seconds before it expires."""
+        delay = 0.0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                if self._token is None or self._expires_on - time.time() <= self.refresh_margin:
+                    await self._refresh(background=True)
+                delay = self._expires_on - self.refresh_margin - time.time()
+                if delay <= 0:
+                    # tokens live shorter than the margin: at most a second apart, and
+                    # halfway to the point where callers would have to wait, which
+                    # leaves the fetch time to finish
+                    delay = min(1.0, max(self._expires_on - self.min_validity - time.time(), 0.0) / 2)
+            except Exception:
+                delay = self.retry_interval
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns refresh counters and timings (ms)."""
+        timings = self._refresh_ms
+        return dict(
+            self._counters,
+            last_refresh_ms=round(timings[-1], 3) if timings else 0.0,
+            max_refresh_ms=round(max(timings), 3) if timings else 0.0,
+            avg_refresh_ms=round(sum(timings) / len(timings), 3) if timings else 0.0,
+            expires_in=round(self._expires_on - time.time(), 1) if self._token else 0.0,
+        )
+
+    async def aclose(self) -> None:
+        """Stops the background refresh."""
+        if self._refresher is not None and not self._refresher.done():
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except (asyncio.CancelledError, RuntimeError):
+                # RuntimeError: the task belongs to an event loop that is gone
+                pass
+        self._refresher = None
+
+
+_token_manager: Optional[TokenManager] = None
+_async_client: Optional["AsyncAzureOpenAI"] = None
+
+
+def get_token_manager() -> TokenManager:
+    """
+    Returns the process-wide token manager (built on first use, so importing
+    the agents or running `--help` does not touch the credential chain).
+    """
+    global _token_manager
+    if _token_manager is None:
+        _token_manager = TokenManager()
+    return _token_manager
+
+
+def set_token_manager(manager: TokenManager) -> None:
+    """
+    Replaces the process-wide token manager, e.g. with one built on a fake
+    credential. The shared client picks it up on its next request.
+    """
+    global _token_manager
+    _token_manager = manager
+
+
+async def _provide_token() -> str:
+    # looked up per request so set_token_manager also applies to an existing client
+    return await get_token_manager().get_token()
+
+
+def get_async_client() -> "AsyncAzureOpenAI":
+    """
+    Returns the process-wide async Azure OpenAI client.
+
+    The client (and its keep-alive connection pool) is created on first use and
+    shared by every agent afterwards, so steps reuse warm TLS connections and
+    many agents can overlap their LLM calls on a single event loop.
+
+    Returns:
+    AsyncAzureOpenAI: The shared client.
+    """
+    global _async_client
+    if _async_client is None:
+        import httpx
+        from openai import AsyncAzureOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        _async_client = AsyncAzureOpenAI(
+            azure_endpoint=AZURE_AI_ENDPOINT,
+            api_version=AZURE_AI_API_VERSION,
+            azure_ad_token_provider=_provide_token,
+            http_client=http_client,
+        )
+    return _async_client
+
+
+async def aclose_async_client() -> None:
+    """
+    Closes the shared client and its connection pool and stops the token
+    refresh (call once on shutdown).
+    """
+    global _async_client
+    if _token_manager is not None:
+        await _token_manager.aclose()
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Response cache settings, overridable from the environment
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+# sampling above this temperature is not deterministic enough to replay
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.2"))
+# run disk eviction once every this many writes
+EVICT_EVERY_WRITES = 100
+
+
+class ResponseCache:
+    """
+    Exact-match cache of chat completions.
+
+    Keys are a stable SHA-256 of the messages plus the sampling parameters, so
+    only byte-identical requests hit. Lookups go to an in-memory LRU first and
+    then to a SQLite file; the file is kept under `max_bytes` (least recently
+    used entries go first) and entries older than `max_age` seconds expire.
+    Requests sampled above `max_temperature` are never cached.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        max_age: float = LLM_CACHE_MAX_AGE,
+        max_temperature: float = LLM_CACHE_MAX_TEMPERATURE,
+    ) -> None:
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+            self._db.commit()
+
+    def cacheable(self, params: Dict[str, Any]) -> bool:
+        """
+        Returns whether a request with these sampling parameters may be cached.
+        """
+        if params.get("temperature", 1.0) > self.max_temperature or params.get("n", 1) != 1:
+            self.bypassed += 1
+            return False
+        return True
+
+    @staticmethod
+    def key(messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """
+        Returns the stable hash of a request (messages + sampling parameters).
+        """
+        payload = json.dumps(
+            {"messages": messages, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.max_age:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+
+        now = time.time()
+        with self._lock:
+            row = None
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, row[1], row[0])
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY_WRITES == 0:
+                self._evict(now)
+            self._db.commit()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Non-blocking `get` (the disk tier is read on a worker thread)."""
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Non-blocking `set` (the disk tier is written on a worker thread)."""
+        await asyncio.to_thread(self.set, key, value)
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        """Drops expired rows, then least recently used rows above max_bytes."""
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if excess <= 0:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            excess -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._evict(time.time())
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+def is_complete_step(text: Optional[str]) -> bool:
+    """
+    Returns whether a reply is worth caching: a JSON object holding an action
+    or a final answer. Truncated or malformed replies are not replayed.
+    """
+    if not text:
+        return False
+    try:
+        step = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(step, dict) and ("final_answer" in step or "action" in step)
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Returns the process-wide response cache, or None unless LLM_CACHE_ENABLED is set.
+    """
+    global _response_cache
+    if _response_cache is None and LLM_CACHE_ENABLED:
+        _response_cache = ResponseCache()
+    return _response_cache
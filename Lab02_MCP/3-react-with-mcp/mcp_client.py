@@ -2,6 +2,7 @@ import asyncio
 import nest_asyncio
 from mcp import ClientSession
 from mcp.client.sse import sse_client
+from tool_manifest import get_manifest_store
 
 nest_asyncio.apply()  # Needed to run interactive python
 
@@ -15,15 +16,20 @@ Make sure:
 """
 async def main():
     # Connect to the server using SSE
-    async with sse_client("http://localhost:8050/sse") as (read_stream, write_stream):
+    server_url = "http://localhost:8050/sse"
+    async with sse_client(server_url) as (read_stream, write_stream):
         async with ClientSession(read_stream, write_stream) as session:
             # Initialize the connection
-            await session.initialize()
-
-            # List available tools
-            tools_result = await session.list_tools()
+            init_result = await session.initialize()
+
+            # List available tools (cached per server URL and server version)
+            store = get_manifest_store()
+            manifest = store.get(server_url, None, init_result.serverInfo)
+            if manifest is None:
+                tools_result = await session.list_tools()
+                manifest = store.put(server_url, None, init_result.serverInfo, tools_result.tools)
             print("Available tools:")
-            for tool in tools_result.tools:
+            for tool in manifest.tools:
                 print(f"  - {tool.name}: {tool.description}")
 
             result = await session.call_tool("get_weather_info", arguments={"location": "Seattle"})
@@ -0,0 +1,362 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from tool_manifest import ManifestStore, ToolManifest, content_hash, get_manifest_store, server_identity
+
+# Session pool settings, overridable from the environment
+# URL of a shared HTTP server (".../mcp" streamable HTTP, ".../sse" SSE);
+# unset = spawn stdio server processes
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL")
+MCP_POOL_MIN_SIZE = int(os.getenv("MCP_POOL_MIN_SIZE", "1"))
+MCP_POOL_MAX_SIZE = int(os.getenv("MCP_POOL_MAX_SIZE", "4"))
+# runs sharing one session at a time (stdio sessions multiplex requests)
+MCP_POOL_MAX_LEASES = int(os.getenv("MCP_POOL_MAX_LEASES", "4"))
+# recycle a server process after this many leases or seconds
+MCP_POOL_MAX_USES = int(os.getenv("MCP_POOL_MAX_USES", "500"))
+MCP_POOL_MAX_AGE = float(os.getenv("MCP_POOL_MAX_AGE", "3600"))
+# ping a session before leasing it when it has not been checked for this long
+MCP_POOL_HEALTH_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "30"))
+MCP_POOL_PING_TIMEOUT = float(os.getenv("MCP_POOL_PING_TIMEOUT", "5"))
+
+
+class PooledServer:
+    """One MCP server process (or HTTP connection) and its client session."""
+
+    def __init__(self) -> None:
+        self.session: Optional[ClientSession] = None
+        self.leases = 0
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.checked_at = self.created_at
+        self.draining = False
+        self.server_info: Any = None
+        self.stop = asyncio.Event()
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self.task is not None and not self.task.done()
+
+
+class MCPSessionPool:
+    """
+    Keeps warm MCP server processes and leases their sessions to agent runs.
+
+    Between `min_size` and `max_size` processes are kept. A lease goes to the
+    least busy healthy session with fewer than `max_leases` runs on it; a new
+    process is only started when every session is busy, and callers wait once
+    `max_size` is reached. Sessions idle for longer than `health_interval` are
+    pinged before being leased, dead or unresponsive ones are replaced, and a
+    process is recycled after `max_uses` leases or `max_age` seconds.
+
+    The tool list comes from a cached manifest (see tool_manifest), so new
+    processes skip list_tools until the server script changes or a server
+    sends a tool-list-changed notification.
+
+    With `url` set, the pool keeps sessions to a shared HTTP server instead of
+    spawning processes, so many agents can use one (multi-worker) tool server.
+
+    Each process is owned by a background task, so its stdio transport is
+    entered and closed in the same task whichever run leased it.
+    """
+
+    def __init__(
+        self,
+        server_script: str,
+        command: str = "python",
+        min_size: int = MCP_POOL_MIN_SIZE,
+        max_size: int = MCP_POOL_MAX_SIZE,
+        max_leases: int = MCP_POOL_MAX_LEASES,
+        max_uses: int = MCP_POOL_MAX_USES,
+        max_age: float = MCP_POOL_MAX_AGE,
+        health_interval: float = MCP_POOL_HEALTH_INTERVAL,
+        ping_timeout: float = MCP_POOL_PING_TIMEOUT,
+        url: Optional[str] = MCP_SERVER_URL,
+        manifest_store: Optional[ManifestStore] = None,
+    ) -> None:
+        self.server_params = StdioServerParameters(command=command, args=[server_script])
+        self.url = url
+        self.server_script = None if url else server_script
+        self.identity = server_identity(command, [server_script], url)
+        self.manifest_store = manifest_store or get_manifest_store()
+        self.manifest: Optional[ToolManifest] = None
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.max_leases = max(1, max_leases)
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self._servers: List[PooledServer] = []
+        self._starting = 0
+        self._cond = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._start_task: Optional["asyncio.Task[None]"] = None
+        # processes being started for callers that may have given up meanwhile
+        self._growing: Set["asyncio.Task[None]"] = set()
+        # manifest reloads after a tool-list change (held so they are not collected)
+        self._reloading: Set["asyncio.Task[None]"] = set()
+        self._closed = False
+        self._counters = {
+            "spawned": 0, "retired": 0, "health_failures": 0, "leases": 0, "waits": 0,
+            "manifest_hits": 0, "manifest_refreshes": 0,
+        }
+
+    @property
+    def tools(self) -> List[types.Tool]:
+        return self.manifest.tools if self.manifest else []
+
+    @property
+    def tools_description(self) -> str:
+        """The tools rendered for the ReAct prompt (cached with the manifest)."""
+        return self.manifest.description if self.manifest else ""
+
+    @property
+    def manifest_version(self) -> int:
+        return self.manifest.version if self.manifest else 0
+
+    async def _load_manifest(self, session: ClientSession, server_info: Any) -> None:
+        """Uses the cached manifest when it is still valid, else lists the tools."""
+        script_hash = content_hash(self.server_script)
+        manifest = self.manifest_store.get(self.identity, script_hash, server_info)
+        if manifest is not None:
+            self._counters["manifest_hits"] += 1
+        else:
+            tools = (await session.list_tools()).tools
+            manifest = self.manifest_store.put(self.identity, script_hash, server_info, tools)
+            self._counters["manifest_refreshes"] += 1
+        self.manifest = manifest
+
+    def _message_handler(self, server: PooledServer) -> Any:
+        async def handle(message: Any) -> None:
+            # the server's tools changed: drop the cached manifest and re-list
+            if isinstance(message, types.ServerNotification) and isinstance(
+                message.root, types.ToolListChangedNotification
+            ):
+                self.manifest_store.invalidate(self.identity)
+                if server.session is not None:
+                    task = asyncio.create_task(self._load_manifest(server.session, server.server_info))
+                    self._reloading.add(task)
+                    task.add_done_callback(self._reloading.discard)
+        return handle
+
+    def _transport(self) -> Any:
+        if not self.url:
+            return stdio_client(self.server_params)
+        if self.url.rstrip("/").endswith("/sse"):
+            return sse_client(self.url)
+        return streamablehttp_client(self.url)
+
+    async def _serve(self, server: PooledServer, ready: "asyncio.Future[None]") -> None:
+        """Owns one server process from startup until `server.stop` is set."""
+        try:
+            async with self._transport() as streams:
+                # streamable HTTP also yields a session id getter
+                read, write = streams[0], streams[1]
+                async with ClientSession(read, write, message_handler=self._message_handler(server)) as session:
+                    server.server_info = (await session.initialize()).serverInfo
+                    await self._load_manifest(session, server.server_info)
+                    server.session = session
+                    ready.set_result(None)
+                    await server.stop.wait()
+        except BaseException as ex:
+            if not ready.done():
+                ready.set_exception(ex if isinstance(ex, Exception) else RuntimeError("MCP server startup cancelled"))
+            if not isinstance(ex, Exception):
+                raise
+        finally:
+            server.session = None
+
+    async def _spawn(self) -> PooledServer:
+        server = PooledServer()
+        ready: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        server.task = asyncio.create_task(self._serve(server, ready))
+        await ready
+        self._counters["spawned"] += 1
+        return server
+
+    async def _retire(self, server: PooledServer) -> None:
+        server.stop.set()
+        if server.task is not None:
+            try:
+                await asyncio.wait_for(server.task, timeout=self.ping_timeout)
+            except Exception:
+                server.task.cancel()
+        self._counters["retired"] += 1
+
+    async def _healthy(self, server: PooledServer) -> bool:
+        """Pings a session that has not been checked for `health_interval` seconds."""
+        if not server.alive:
+            return False
+        if time.monotonic() - server.checked_at < self.health_interval:
+            return True
+        try:
+            await asyncio.wait_for(server.session.send_ping(), timeout=self.ping_timeout)
+        except Exception:
+            self._counters["health_failures"] += 1
+            return False
+        server.checked_at = time.monotonic()
+        return True
+
+    def _pick(self) -> Optional[PooledServer]:
+        """Least busy live session with a free lease slot (drops dead processes)."""
+        dead = [s for s in self._servers if not s.alive and s.leases == 0]
+        for server in dead:
+            self._servers.remove(server)
+        candidates = [
+            s for s in self._servers if s.alive and not s.draining and s.leases < self.max_leases
+        ]
+        return min(candidates, key=lambda s: s.leases) if candidates else None
+
+    async def start(self) -> None:
+        """Starts `min_size` processes (at least one, to learn the tool list)."""
+        # the processes start in a task of their own: a caller that gives up
+        # (its deadline ran out) leaves them starting, and the next caller
+        # waits for the same task
+        task = self._start_task
+        if task is None or task.done():
+            task = self._start_task = asyncio.ensure_future(self._start_servers())
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        await asyncio.shield(task)
+
+    async def _start_servers(self) -> None:
+        # concurrent callers wait for the first one, so the tools are known on return
+        async with self._start_lock:
+            missing = max(self.min_size, 1) - len(self._servers) - self._starting
+            if missing <= 0:
+                return
+            self._starting += missing
+            servers: List[PooledServer] = []
+            try:
+                servers = await asyncio.gather(*(self._spawn() for _ in range(missing)))
+            finally:
+                async with self._cond:
+                    self._starting -= missing
+                    self._servers.extend(servers)
+                    # a failed start frees its slots for the callers waiting on them
+                    self._cond.notify_all()
+
+    async def _acquire(self) -> PooledServer:
+        while True:
+            if self._closed:
+                raise RuntimeError("MCP session pool is closed")
+            async with self._cond:
+                server = self._pick()
+                if server is None:
+                    if len(self._servers) + self._starting >= self.max_size:
+                        self._counters["waits"] += 1
+                        await self._cond.wait()
+                        continue
+                    self._starting += 1
+                else:
+                    server.leases += 1
+                    server.uses += 1
+
+            if server is None:
+                # start another process outside the lock, in a task of its own:
+                # a caller that gives up still leaves the process in the pool
+                task = asyncio.ensure_future(self._grow())
+                self._growing.add(task)
+                task.add_done_callback(self._growing.discard)
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                await asyncio.shield(task)
+                continue
+
+            try:
+                healthy = await self._healthy(server)
+            except BaseException:
+                # cancelled while checking: hand the lease back
+                await self._release(server)
+                raise
+            if healthy:
+                self._counters["leases"] += 1
+                return server
+            # replace the unresponsive process and try again
+            server.draining = True
+            await self._release(server)
+
+    async def _grow(self) -> None:
+        spawned: Optional[PooledServer] = None
+        try:
+            spawned = await self._spawn()
+        finally:
+            async with self._cond:
+                self._starting -= 1
+                if spawned is not None:
+                    self._servers.append(spawned)
+                # a failed start frees its slot for a caller waiting on it
+                self._cond.notify_all()
+
+    async def _release(self, server: PooledServer) -> None:
+        retire = False
+        async with self._cond:
+            server.leases -= 1
+            age = time.monotonic() - server.created_at
+            if server.uses >= self.max_uses or age >= self.max_age or not server.alive:
+                server.draining = True
+            if server.draining and server.leases == 0 and server in self._servers:
+                self._servers.remove(server)
+                retire = True
+            self._cond.notify_all()
+        if retire:
+            await self._retire(server)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[ClientSession]:
+        """
+        Leases a warm session for the duration of one run.
+
+        Yields:
+        ClientSession: An initialized session (possibly shared with up to
+            `max_leases - 1` other runs).
+        """
+        server = await self._acquire()
+        try:
+            yield server.session
+        finally:
+            await self._release(server)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self._counters,
+            processes=len(self._servers),
+            active_leases=sum(s.leases for s in self._servers),
+        )
+
+    async def aclose(self) -> None:
+        self._closed = True
+        async with self._cond:
+            servers, self._servers = self._servers, []
+            self._cond.notify_all()
+        await asyncio.gather(*(self._retire(s) for s in servers), return_exceptions=True)
+
+
+_pools: Dict[str, MCPSessionPool] = {}
+
+
+def get_session_pool(server_script: str, url: Optional[str] = None) -> MCPSessionPool:
+    """
+    Returns the process-wide session pool for `server_script` (or for the HTTP
+    server at `url`, defaulting to MCP_SERVER_URL), shared by every agent using
+    that server.
+    """
+    url = url or MCP_SERVER_URL
+    key = url or server_script
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = MCPSessionPool(server_script, url=url)
+    return pool
+
+
+async def aclose_session_pools() -> None:
+    """Stops every pooled server process (call once at shutdown)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    await asyncio.gather(*(pool.aclose() for pool in pools), return_exceptions=True)
@@ -1,7 +1,11 @@
-import requests
-import operator
-import json
+from calculator import calculate
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+from memo import MemoPolicy
+from server_runner import create_http_app, run_server
+from weather import WEATHER_CACHE_TTL, format_weather, get_weather_client
+from sandbox import SANDBOX_TIMEOUT
+from tool_runtime import limited, run_sandboxed, sandbox_lifespan
 from dotenv import load_dotenv
 
 load_dotenv("../.env")
@@ -11,91 +15,61 @@ mcp = FastMCP(
     name="React with MCP Server",
     host="0.0.0.0",  
     port=8050,  
+    lifespan=sandbox_lifespan,
 )
 
-@mcp.tool()
-def basic_calculator(input_str):
+# the annotations tell clients the result only depends on the input, so
+# they may memoize it (see memo.MemoPolicy)
+@mcp.tool(annotations=ToolAnnotations(**MemoPolicy(pure=True).to_annotations()))
+# the sandbox's own limits fire first and report which one was hit
+@limited(max_concurrency=8, timeout=SANDBOX_TIMEOUT + 1)
+async def basic_calculator(input_str):
         """
-        Perform a numeric operation on two numbers based on the input string.
+        Evaluate arithmetic in one call: a single operation, an expression or a batch of them.
 
         Parameters:
-        input_str (str): A JSON string representing a dictionary with keys 'num1', 'num2', and 'operation'.
-                        Example: '{"num1": 5, "num2": 3, "operation": "add"}' or "{'num1': 67869, 'num2': 9030393, 'operation': 'divide'}"
+        input_str (str): One of
+                        - an operation: '{"num1": 5, "num2": 3, "operation": "add"}' (operations: add, subtract,
+                          multiply, divide, floor_divide, modulus, power, lt, le, eq, ne, ge, gt); num1/num2 may be
+                          lists of numbers to apply the operation element-wise
+                        - an arithmetic expression: "(67869 / 9030393) * 100" (+ - * / // % **, comparisons, abs,
+                          round, min, max, sqrt, log, log10, exp, sin, cos, tan, pi, e)
+                        - a list of operations and/or expressions: '["12 * 7", {"num1": "r0", "num2": 4, "operation": "divide"}]';
+                          item i's result is available to later items as r<i>
 
         Returns:
-        str: The formatted result of the operation.
-
-        Raises:
-        Exception: If an error occurs during the operation (e.g., division by zero).
-        ValueError: If an unsupported operation is requested or input is invalid.
+        str: The formatted result, or one line per item for a batch.
         """
-        # Clean and parse the input string
-        try:
-            # Replace single quotes with double quotes
-            input_str_clean = input_str.replace("'", "\"")
-            # Remove any extraneous characters such as trailing quotes
-            input_str_clean = input_str_clean.strip().strip("\"")
-            
-            input_dict = json.loads(input_str_clean)
-            num1 = input_dict['num1']
-            num2 = input_dict['num2']
-            operation = input_dict['operation']
-        except (json.JSONDecodeError, KeyError) as e:
-            return str(e), "Invalid input format. Please provide a valid JSON string."
+        # FastMCP hands over JSON inputs already decoded (dicts/lists), which
+        # calculate() accepts as well; the evaluation runs in a sandbox worker
+        # process with CPU and memory limits, off the server's event loop
+        return await run_sandboxed(calculate, input_str)
+
 
-        # Define the supported operations
-        operations = {
-            'add': operator.add,
-            'subtract': operator.sub,
-            'multiply': operator.mul,
-            'divide': operator.truediv,
-            'floor_divide': operator.floordiv,
-            'modulus': operator.mod,
-            'power': operator.pow,
-            'lt': operator.lt,
-            'le': operator.le,
-            'eq': operator.eq,
-            'ne': operator.ne,
-            'ge': operator.ge,
-            'gt': operator.gt
-        }
-        
-        # Check if the operation is supported
-        if operation in operations:
-            try:
-                # Perform the operation
-                result = operations[operation](num1, num2)
-                result_formatted = f"\n\nThe answer is: {result}.\nCalculated with basic_calculator."
-                return result_formatted
-            except Exception as e:
-                return str(e), "\n\nError during operation execution."
-        else:
-            return "\n\nUnsupported operation. Please provide a valid operation."
-# Add the weather tool
-@mcp.tool()
-def get_weather(location: str) -> str:
+# Add the weather tool (clients may reuse a report for the weather cache's TTL)
+@mcp.tool(annotations=ToolAnnotations(**MemoPolicy(ttl=WEATHER_CACHE_TTL).to_annotations()))
+@limited(max_concurrency=8, timeout=15)
+async def get_weather(location: str, days: int = 0, full: bool = False) -> str:
         """
         Fetches the weather information for the specified location.
 
-        :Parameters: The location to fetch weather for.
-        :Returns: Weather information as a JSON string.
+        :Parameters: location: the location to fetch weather for; days: days of
+            forecast to add, today included (0-3, default 0 = current conditions
+            only); full: return the raw wttr.in report instead (large).
+        :Returns: Weather information as a compact JSON string.
         """
-        weather_api_base = "https://wttr.in"
-        url = f"{weather_api_base}/{location}?format=j1"
-        
-        response = requests.get(url)
-        
-        return str(response.json())
+        # pooled, cached and coalesced wttr.in lookup on the async client, so a
+        # slow response does not stall other requests; the report is projected
+        # onto the fields an answer needs
+        return format_weather(await get_weather_client().aget(location), days, full)
+
+
+def create_app():
+    """ASGI app for the HTTP transports (imported by every uvicorn worker)."""
+    return create_http_app(mcp)
 
 
 # Run the server
 if __name__ == "__main__":
-    transport = "stdio"
-    if transport == "stdio":
-        print("Running server with stdio transport")
-        mcp.run(transport="stdio")
-    elif transport == "sse":
-        print("Running server with SSE transport")
-        mcp.run(transport="sse")
-    else:
-        raise ValueError(f"Unknown transport: {transport}")
\ No newline at end of file
+    # e.g. python mcp_server.py --transport streamable-http --workers 4
+    run_server(mcp, "mcp_server:create_app", "React with MCP server")
\ No newline at end of file
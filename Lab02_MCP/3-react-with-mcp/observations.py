@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Observation store settings, overridable from the environment
+OBSERVATION_STORE_ENABLED = os.getenv("OBSERVATION_STORE_ENABLED", "1").lower() in ("1", "true", "yes")
+OBSERVATION_STORE_PATH = os.getenv("OBSERVATION_STORE_PATH")  # unset = memory only
+OBSERVATION_STORE_MAX_MB = int(os.getenv("OBSERVATION_STORE_MAX_MB", "256"))
+# observations longer than this many characters are stored and only previewed in the history
+OBSERVATION_SPILL_CHARS = int(os.getenv("OBSERVATION_SPILL_CHARS", "4000"))
+OBSERVATION_PREVIEW_CHARS = int(os.getenv("OBSERVATION_PREVIEW_CHARS", "500"))
+# largest slice one read returns (kept below the spill size, so reads are never spilled)
+OBSERVATION_READ_CHARS = min(int(os.getenv("OBSERVATION_READ_CHARS", "3000")), OBSERVATION_SPILL_CHARS)
+
+# name of the retrieval tool the agents offer next to their own tools
+READ_TOOL_NAME = "read_observation"
+
+# path steps: .key, [0], ["key"]
+_PATH_STEP = re.compile(r"""\[(-?\d+)\]|\[["']([^"']*)["']\]|\.?([^.\[\]]+)""")
+
+
+def _resolve(value: Any, path: str) -> Any:
+    """
+    Follows a JSON path such as `weather[0].hourly` (a leading `$` is allowed).
+
+    Raises:
+    ValueError: If a step of the path does not exist.
+    """
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    walked = "$"
+    for match in _PATH_STEP.finditer(path):
+        index, quoted, key = match.groups()
+        if index is None and key is not None and key.isdigit() and isinstance(value, list):
+            index = key
+        try:
+            if index is not None:
+                value = value[int(index)]
+                walked += f"[{index}]"
+            else:
+                name = quoted if quoted is not None else key
+                value = value[name]
+                walked += f".{name}"
+        except (KeyError, IndexError, TypeError):
+            if isinstance(value, dict):
+                raise ValueError(f"{walked} has no '{match.group(0).lstrip('.')}'; keys: {', '.join(value)}") from None
+            if isinstance(value, list):
+                raise ValueError(f"{walked} is a list of {len(value)} items") from None
+            raise ValueError(f"{walked} is a {type(value).__name__}, not an object or list") from None
+    return value
+
+
+def _shape(text: str) -> str:
+    # a hint at what the stored observation contains
+    try:
+        if text.lstrip()[:1] not in ("{", "["):
+            raise ValueError
+        value = json.loads(text)
+    except ValueError:
+        return f"{text.count(chr(10)) + 1} lines"
+    if isinstance(value, dict):
+        return "JSON object with keys " + ", ".join(list(value)[:12])
+    if isinstance(value, list):
+        return f"JSON list of {len(value)} items"
+    return "JSON value"
+
+
+class ObservationStore:
+    """
+    Content-addressed store for large tool observations (SQLite, in memory or
+    in a file shared across runs).
+
+    `spill` puts an observation that is too large for the history into the
+    store and returns a short preview that names its handle; `read` returns a
+    slice of it by character range or JSON path. An observation's handle is
+    derived from its content, so repeated outputs are stored once. When the
+    store grows past `max_mb`, the least recently read observations go first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = OBSERVATION_STORE_PATH,
+        max_mb: int = OBSERVATION_STORE_MAX_MB,
+        spill_chars: int = OBSERVATION_SPILL_CHARS,
+        preview_chars: int = OBSERVATION_PREVIEW_CHARS,
+        read_chars: int = OBSERVATION_READ_CHARS,
+    ) -> None:
+        self.path = path or ":memory:"
+        self.max_chars = max_mb * 2 ** 20
+        self.spill_chars = spill_chars
+        self.preview_chars = preview_chars
+        self.read_chars = min(read_chars, spill_chars)
+        # imported here to keep sqlite3 out of agent startup
+        import sqlite3
+
+        # one connection guarded by a lock: reads run on the tool thread pool
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ":memory:":
+            # cheap commits: a spill must not stall the event loop on fsync
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS observations "
+            "(handle TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._counters = {"spilled": 0, "deduplicated": 0, "reads": 0, "chars_spilled": 0, "evictions": 0}
+
+    @staticmethod
+    def handle_of(text: str) -> str:
+        return "obs_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def put(self, text: str) -> str:
+        """Stores `text` (once per content) and returns its handle."""
+        handle = self.handle_of(text)
+        with self._lock:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?)", (handle, text, len(text), time.time())
+            ).rowcount
+            if inserted:
+                self._evict()
+            else:
+                self._counters["deduplicated"] += 1
+                self._db.execute("UPDATE observations SET accessed = ? WHERE handle = ?", (time.time(), handle))
+        return handle
+
+    def _evict(self) -> None:
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM observations").fetchone()
+        while total > self.max_chars:
+            row = self._db.execute("SELECT handle, size FROM observations ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                return
+            self._db.execute("DELETE FROM observations WHERE handle = ?", (row[0],))
+            total -= row[1]
+            self._counters["evictions"] += 1
+
+    def spill(self, observation: Any) -> Any:
+        """
+        Returns `observation` unchanged when it is short, otherwise stores it and
+        returns a preview with its handle and how to read the rest.
+        """
+        text = observation if isinstance(observation, str) else str(observation)
+        if len(text) <= self.spill_chars:
+            return observation
+        handle = self.put(text)
+        self._counters["spilled"] += 1
+        self._counters["chars_spilled"] += len(text)
+        return (
+            f"[stored as {handle}: {len(text)} chars, {_shape(text)}]\n"
+            f"{text[:self.preview_chars]}...\n"
+            f"[read more with {READ_TOOL_NAME}: handle \"{handle}\", start {self.preview_chars} "
+            f"and length (at most {self.read_chars}), or a JSON path such as \"key[0].field\"]"
+        )
+
+    def read(self, handle: str, start: int = 0, length: Optional[int] = None, path: str = "") -> str:
+        """
+        Returns a slice of a stored observation: `length` characters from
+        `start`, of the whole observation or of the JSON value at `path`.
+
+        Raises:
+        KeyError: If the handle is unknown (or was evicted).
+        ValueError: If the path does not exist or the observation is not JSON.
+        """
+        length = self.read_chars if not length or length <= 0 else min(length, self.read_chars)
+        start = max(start, 0)
+        with self._lock:
+            if path:
+                row = self._db.execute(
+                    "SELECT body, size FROM observations WHERE handle = ?", (handle,)
+                ).fetchone()
+            else:
+                # SQLite's substr counts characters, so only the slice is loaded
+                row = self._db.execute(
+                    "SELECT substr(body, ?, ?), size FROM observations WHERE handle = ?", (start + 1, length, handle)
+                ).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE observations SET accessed = ? WHERE handle = ?", (time.time(), handle))
+        if row is None:
+            raise KeyError(f"no stored observation '{handle}'")
+        self._counters["reads"] += 1
+        text, size = row
+        if path:
+            try:
+                value = json.loads(text)
+            except ValueError:
+                raise ValueError(f"{handle} is not JSON; read it by start and length instead") from None
+            text = json.dumps(_resolve(value, path), separators=(",", ":"), ensure_ascii=False)
+            size = len(text)
+            text = text[start:start + length]
+        end = start + len(text)
+        more = f", next start {end}" if end < size else ""
+        return f"[{handle}{' ' + path if path else ''}: chars {start}-{end} of {size}{more}]\n{text}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, chars = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM observations"
+            ).fetchone()
+        return dict(self._counters, entries=entries, chars_stored=chars)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_observation_store: Optional[ObservationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_observation_store() -> Optional[ObservationStore]:
+    """
+    Returns the process-wide observation store, or None when
+    OBSERVATION_STORE_ENABLED is off (observations then stay inline).
+    """
+    global _observation_store
+    if _observation_store is None and OBSERVATION_STORE_ENABLED:
+        with _store_lock:
+            if _observation_store is None:
+                _observation_store = ObservationStore()
+    return _observation_store
+
+
+def read_observation(handle: str, start: int = 0, length: int = OBSERVATION_READ_CHARS, path: str = "") -> str:
+    """
+    Reads part of a large tool output that was stored instead of shown in full.
+
+    Parameters:
+    handle (str): The handle from the "[stored as obs_...]" preview.
+    start (int): Character offset to read from (default 0).
+    length (int): Characters to read (capped per call).
+    path (str): Optional JSON path into the stored output, e.g. "weather[0].hourly"; start/length then apply to that value.
+
+    Returns:
+    str: The slice, headed by its range and the next start offset.
+    """
+    store = get_observation_store()
+    if store is None:
+        return "Observation store is disabled"
+    try:
+        return store.read(handle, start, length, path)
+    except KeyError as ex:
+        return f"Unknown handle: {ex.args[0]}"
+    except ValueError as ex:
+        return f"Could not read {handle}: {ex}"
+
+
+def describe_read_tool() -> str:
+    """The retrieval tool's line for a prompt's tool list."""
+    return f"{READ_TOOL_NAME}: \"{(read_observation.__doc__ or '').strip()}\""
@@ -37,3 +37,11 @@ You will generate a JSON response this format strictly:
     {tool_descriptions}
 """.strip()
 
+
+# Appended when a run hits its step or time limit, to get one last answer
+# from what the model has gathered so far ({limit}: "steps" or "time")
+final_answer_prompt = """
+You have run out of {limit}. Do not call any more tools. Answer the query now, as well as you can from the
+observations so far, and say what is still missing if the answer is incomplete.
+Reply with a JSON object holding "thought" and "final_answer".
+""".strip()
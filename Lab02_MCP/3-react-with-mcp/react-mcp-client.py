@@ -1,215 +1,652 @@
-import asyncio, json, os
-from typing import Dict, Any, List, Iterable
+import argparse, asyncio, contextlib, contextvars, json, logging
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Iterable, Optional, Tuple
 
-from openai import AsyncOpenAI, AzureOpenAI          # ← keep Azure creds for chat
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from llm import get_async_client, aclose_async_client, get_token_manager   # shared async Azure client for chat
+from llm_cache import ResponseCache, get_response_cache, is_complete_step
+from memo import MemoPolicy, ToolMemo, end_run_scope, get_tool_memo, start_run_scope
+from observations import READ_TOOL_NAME, ObservationStore, describe_read_tool, get_observation_store, read_observation
 
-from prompts import react_prompt_template
-from contextlib import AsyncExitStack
-from mcp import ClientSession, StdioServerParameters
+from batch import run_batch, positive_int, DEFAULT_CONCURRENCY
+from deadline import (
+    AGENT_DEADLINE, AGENT_LLM_TIMEOUT, AGENT_MAX_STEPS, AGENT_TOOL_TIMEOUT,
+    ANSWERED, DEADLINE, ERROR, MAX_STEPS,
+    AgentResult, Deadline, DeadlineExceeded, current_deadline, reset_deadline, set_deadline, with_timeout,
+)
+from history import HistoryManager
+from streaming import StepStreamParser
+from prompts import react_prompt_template, final_answer_prompt
+from telemetry import Telemetry, configure_logging, get_telemetry, logger
+# the MCP SDK is imported on first connect, keeping it out of CLI startup
+if TYPE_CHECKING:
+    from mcp import ClientSession
+    from mcp_pool import MCPSessionPool
 # from mcp_use import MCPAgent, MCPClient
-from mcp.client.stdio import stdio_client
 
-from dotenv import load_dotenv
+# Maximum number of in-flight calls per MCP tool (per agent)
+DEFAULT_TOOL_CONCURRENCY = 4
 
-load_dotenv()
-# Azure OpenAI Configuration
-AZURE_AI_ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
-AZURE_AI_API_VERSION = os.getenv("AZURE_AI_API_VERSION", "2024-12-01-preview")
-CREDENTIAL = DefaultAzureCredential()
-TOKEN_PROVIDER = get_bearer_token_provider(CREDENTIAL, "https://cognitiveservices.azure.com/.default")
+# the session leased to the current run; tool calls dispatched by the run
+# (including streamed ones started with create_task) inherit it
+_run_session: "contextvars.ContextVar[Optional[ClientSession]]" = contextvars.ContextVar(
+    "run_session", default=None
+)
+
+
+class ToolResultError(Exception):
+    """An MCP tool call that reported an error; the message is the observation."""
 
 
 class ReActAgent:
-    def __init__(self, server_script: str = "mcp_server.py") -> None:
+    def __init__(
+        self,
+        server_script: str = "mcp_server.py",
+        server_url: Optional[str] = None,
+        client: Optional[Any] = None,
+        tool_concurrency: Optional[Dict[str, int]] = None,
+        history_options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        on_answer_delta: Optional[Callable[[str], None]] = None,
+        response_cache: Optional[ResponseCache] = None,
+        tool_memo: Optional[ToolMemo] = None,
+        observation_store: Optional[ObservationStore] = None,
+        telemetry: Optional[Telemetry] = None,
+        pool: Optional["MCPSessionPool"] = None,
+        max_steps: int = AGENT_MAX_STEPS,
+        deadline: Optional[float] = AGENT_DEADLINE,
+        llm_timeout: Optional[float] = AGENT_LLM_TIMEOUT,
+        tool_timeout: Optional[float] = AGENT_TOOL_TIMEOUT,
+    ) -> None:
+        # the async client is shared by every agent in the process
+        self.client = client or get_async_client()
+        # sampling parameters of every completion request
+        self.completion_params = {"model": "gpt-4o", "temperature": 0.7, "max_tokens": 1000}
+        # opt-in exact-match response cache (bypassed for high temperatures)
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        # results of tools the server declared pure or TTL-cacheable, shared across agents
+        self.tool_memo = tool_memo if tool_memo is not None else get_tool_memo()
+        # large observations are kept out of the history, behind a preview and a
+        # handle the model passes to the local read_observation tool
+        self.observation_store = observation_store if observation_store is not None else get_observation_store()
         self.react_prompt = react_prompt_template
         self._server_script = server_script
-        self._exit_stack: AsyncExitStack | None = None
-        self.session: ClientSession | None = None
+        self._server_url = server_url
+        # warm server processes shared by every agent using the same script
+        self.pool = pool
+        self._connect_lock = asyncio.Lock()
+        self._connected = False
+        self._manifest_version = 0
         self.tools_description: str = ""  
+        self.system_message: Dict[str, str] = {}
         self.available_tools: Dict[str, Any] = {}
+        self.memo_policies: Dict[str, MemoPolicy] = {}
+        self.tool_concurrency = tool_concurrency or {}
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # streaming mode dispatches actions before the step is fully generated
+        self.stream = stream
+        self.on_answer_delta = on_answer_delta
+        # HistoryManager settings (token_budget, keep_recent_steps, ...) and totals
+        self.history_options = history_options or {}
+        self.history_stats = {"runs": 0, "compactions": 0, "tokens_saved": 0}
+        # latency/token events for every LLM call, tool call, parse and render
+        self.telemetry = telemetry or get_telemetry()
+        # per-query step cap and latency budget (0/None = unlimited), and the
+        # caps on single calls within that budget
+        self.max_steps = max_steps
+        self.deadline = deadline
+        self.llm_timeout = llm_timeout
+        self.tool_timeout = tool_timeout
 
     # formats the thought process history as a string for prompt context
     def _format_thought_history(self, thought_process: List[Dict[str, Any]]) -> str:
-        history = ""
+        lines: List[str] = []
         for step in thought_process:
-            history += f"Thought: {step['thought']}\n"
+            lines.append(f"Thought: {step['thought']}\n")
             if step.get("action"):
-                history += f"Action: {json.dumps(step['action'])}\n"
+                lines.append(f"Action: {json.dumps(step['action'])}\n")
             if step.get("observation"):
-                history += f"Observation: {step['observation']}\n"
+                lines.append(f"Observation: {step['observation']}\n")
             if step.get("pause_reflection"):
-                history += f"PAUSE: {step['pause_reflection']}\n"
-        return history
+                lines.append(f"PAUSE: {step['pause_reflection']}\n")
+        return "".join(lines)
+
+    # formats the observations of one step as the message appended after it
+    def _format_observations(self, step_records: List[Dict[str, Any]]) -> str:
+        """
+        Formats the actions and observations of a single step.
+        """
+        if not step_records:
+            return "No tool was called. Continue with the next step."
+        return "".join(
+            f"Action: {json.dumps(record['action'])}\nObservation: {record['observation']}\n"
+            for record in step_records
+        )
+
+    def _record_history(self, history: HistoryManager) -> None:
+        """Adds a finished run's compaction metrics to the agent totals."""
+        stats = history.stats()
+        self.history_stats["runs"] += 1
+        self.history_stats["compactions"] += stats["compactions"]
+        self.history_stats["tokens_saved"] += stats["tokens_saved"]
+        if stats["compactions"]:
+            logger.info("\nHistory compacted %sx, saved %s tokens", stats["compactions"], stats["tokens_saved"])
     
-    # connect to the mcp server
+    # attach to the pool of warm mcp servers
     async def _connect(self) -> None:
-        """Spin up / attach to the MCP server exactly once."""
-        if self.session:                            
+        """Warm the session pool and build the tool prompt exactly once."""
+        if self._connected:
             return
 
-        self._exit_stack = AsyncExitStack()
-        await self._exit_stack.__aenter__()
+        # concurrent runs on one agent must not build the prompt twice
+        async with self._connect_lock:
+            if not self._connected:
+                await self._load_tools()
+
+    async def _load_tools(self) -> None:
+        if self.pool is None:
+            from mcp_pool import get_session_pool
+
+            self.pool = get_session_pool(self._server_script, self._server_url)
+        await self.pool.start()
+        self._apply_manifest()
+        # publish only once the tools are known
+        self._connected = True
+
+    def _apply_manifest(self) -> None:
+        """Builds the tool prompt from the pool's (cached) tool manifest."""
+        self.available_tools = {tool.name: tool for tool in self.pool.tools}
+        # memo policies come from the tools' annotations
+        self.memo_policies = {}
+        for tool in self.pool.tools:
+            policy = MemoPolicy.from_annotations(getattr(tool, "annotations", None))
+            if policy is not None:
+                self.memo_policies[tool.name] = policy
+        # the description string is rendered once per manifest version
+        self.tools_description = self.pool.tools_description
+        if self.observation_store is not None:
+            self.tools_description += "\n" + describe_read_tool()
+        # static system prefix rendered once per manifest (not once per step)
+        self.system_message = {
+            "role": "system",
+            "content": self.react_prompt.format(tool_descriptions=self.tools_description),
+        }
+        self._manifest_version = self.pool.manifest_version
+
+    def _tool_semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """Return the semaphore enforcing the per-tool concurrency limit."""
+        semaphore = self._tool_semaphores.get(tool_name)
+        if semaphore is None:
+            limit = self.tool_concurrency.get(tool_name, DEFAULT_TOOL_CONCURRENCY)
+            semaphore = self._tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+        return semaphore
 
-        stdio_transport = await self._exit_stack.enter_async_context(
-            stdio_client(
-                StdioServerParameters(command="python", args=[self._server_script])
-            )
-        )
-        stdio, write = stdio_transport
-        self.session = await self._exit_stack.enter_async_context(
-            ClientSession(stdio, write)
-        )
-        await self.session.initialize()
-
-        # Build description string for prompt
-        tools = await self.session.list_tools()
-        tool_descriptions = []
-        for tool in tools.tools:
-            self.available_tools[tool.name] = tool
-            tool_descriptions.append(f"{tool.name}: \"{tool.description}\"")
-        self.tools_description = "\n".join(tool_descriptions)
-        # tools = await self.session.list_tools()
-        # self.tools_description = "\n".join(
-        #     f"{t.name}: \"{t.description}\"" for t in tools.tools
-        # )
     async def _execute_mcp_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
-        """Execute a tool through the MCP session."""
-        if not self.session:
+        """Execute a tool through the MCP session leased to the current run."""
+        # the retrieval tool is served locally, from the agent's observation store
+        if tool_name == READ_TOOL_NAME and self.observation_store is not None:
+            return await self._read_observation(tool_input)
+        session = _run_session.get()
+        if session is None:
             return "Error: MCP session not initialized"
         
         if tool_name not in self.available_tools:
             return f"Unknown tool '{tool_name}'"
-        
+        return self._spill(await self._call_or_memoized(session, tool_name, tool_input))
+
+    async def _call_or_memoized(self, session: "ClientSession", tool_name: str, tool_input: Dict[str, Any]) -> str:
         try:
-            result = await self.session.call_tool(tool_name, tool_input)
-            
-            # Extract content from MCP response
-            if hasattr(result, 'content') and result.content:
-                if isinstance(result.content, list):
-                    content_parts = []
-                    for item in result.content:
-                        if hasattr(item, 'text'):
-                            content_parts.append(item.text)
-                        else:
-                            content_parts.append(str(item))
-                    return "\n".join(content_parts)
-                else:
-                    return str(result.content)
-            else:
-                return str(result)
-                
+            # tools the server declared memoizable are answered from the tool
+            # memo when the same input was seen before; errors are not memoized
+            policy = self.memo_policies.get(tool_name)
+            if policy is None or self.tool_memo is None:
+                return await self._timed_mcp_tool(session, tool_name, tool_input)
+            return await self.tool_memo.call(
+                tool_name, tool_input, policy, partial(self._timed_mcp_tool, session, tool_name, tool_input)
+            )
+        except DeadlineExceeded:
+            raise
+        except ToolResultError as ex:
+            return str(ex)
         except Exception as ex:
             return f"Tool runtime error: {ex}"
+
+    def _spill(self, observation: str) -> str:
+        """Moves a large observation to the observation store, leaving a preview with its handle."""
+        if self.observation_store is None:
+            return observation
+        return self.observation_store.spill(observation)
+
+    async def _read_observation(self, tool_input: Any) -> str:
+        """Runs the local retrieval tool (a bare string is taken as the handle)."""
+        if isinstance(tool_input, str):
+            tool_input = {"handle": tool_input}
+        if not isinstance(tool_input, dict):
+            return f"Invalid input for tool '{READ_TOOL_NAME}': expected an object with a handle"
+        with self.telemetry.span("tool_call", tool=READ_TOOL_NAME):
+            try:
+                return await asyncio.to_thread(read_observation, **tool_input)
+            except TypeError as ex:
+                return f"Invalid input for tool '{READ_TOOL_NAME}': {ex}"
+
+    async def _timed_mcp_tool(self, session: "ClientSession", tool_name: str, tool_input: Dict[str, Any]) -> str:
+        # the wait for a free slot counts against the timeout too; a
+        # cancelled call is dropped by the session, the server may finish it
+        result = await with_timeout(self._call_mcp_tool(session, tool_name, tool_input), self.tool_timeout)
+
+        # Extract content from MCP response
+        if hasattr(result, 'content') and result.content:
+            if isinstance(result.content, list):
+                content_parts = []
+                for item in result.content:
+                    if hasattr(item, 'text'):
+                        content_parts.append(item.text)
+                    else:
+                        content_parts.append(str(item))
+                text = "\n".join(content_parts)
+            else:
+                text = str(result.content)
+        else:
+            text = str(result)
+        if getattr(result, "isError", False):
+            raise ToolResultError(text)
+        return text
+
+    async def _call_mcp_tool(self, session: "ClientSession", tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        async with self._tool_semaphore(tool_name):
+            with self.telemetry.span("tool_call", tool=tool_name) as span:
+                result = await session.call_tool(tool_name, tool_input)
+                span.set(tool_error=bool(getattr(result, "isError", False)))
+                return result
+
+    async def _execute_action(self, act: Dict[str, Any]) -> str:
+        """Execute a single action dict from the model's step."""
+        tool_name  = act.get("tool_choice")
+        tool_input = act.get("tool_input")
+
+        if not tool_name or tool_input is None:
+            return "Missing tool_choice/tool_input"
+        return await self._execute_mcp_tool(tool_name, tool_input)
         
+    def _cache_key(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Key of this request in the response cache, or None when it must not be cached."""
+        if self.response_cache is None or not self.response_cache.cacheable(self.completion_params):
+            return None
+        return self.response_cache.key(messages, self.completion_params)
+
+    @staticmethod
+    def _usage_fields(usage: Any) -> Dict[str, Any]:
+        """Token counts of a completion for the llm_call event."""
+        if usage is None:
+            return {}
+        return {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+        }
+
     # send a request to OpenAI and get the response
-    async def _get_openai_response(self, prompt: str, query: str) -> str:
+    async def _get_openai_response(self, messages: List[Dict[str, str]], final: bool = False) -> str:
+        # `final`: the forced last answer, which may use the deadline's reserve
+        with self.telemetry.span("llm_call", streamed=False, cache_hit=False) as span:
+            # identical low-temperature requests are served from the response cache
+            cache_key = self._cache_key(messages)
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    span.set(cache_hit=True)
+                    return cached
 
-        oai_client = AzureOpenAI(
-            azure_endpoint=AZURE_AI_ENDPOINT,
-            api_version=AZURE_AI_API_VERSION,
-            azure_ad_token_provider=TOKEN_PROVIDER,
-            )
-    
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": query}
+            try:
+                response = await with_timeout(
+                    self.client.chat.completions.create(
+                            messages = messages,
+                            **self.completion_params
+                    ),
+                    self.llm_timeout,
+                    keep_reserve=not final,
+                )
+                content = response.choices[0].message.content
+                span.set(**self._usage_fields(getattr(response, "usage", None)))
+                logger.info("\nAgent response: %s", content)
+                if cache_key and is_complete_step(content):
+                    await self.response_cache.aset(cache_key, content)
+                return content
+            except DeadlineExceeded:
+                span.set(error="DeadlineExceeded")
+                raise
+            except Exception as e:
+                span.set(error=type(e).__name__)
+                return f"Error generating response: {e}"
+
+    # stream a request to OpenAI, dispatching each action as soon as it is complete
+    async def _stream_openai_response(
+        self,
+        messages: List[Dict[str, str]],
+        dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]],
+    ) -> str:
+        """
+        Streams the next step and starts each tool call while the model is still
+        generating the rest of the step. Started calls are appended to
+        `dispatched` as (action, task) pairs.
+        """
+        parser = StepStreamParser()
+        with self.telemetry.span("llm_call", streamed=True, cache_hit=False) as span:
+            cache_key = self._cache_key(messages)
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    span.set(cache_hit=True)
+                    # replay the cached step through the parser to dispatch its actions
+                    for act in parser.feed(cached):
+                        dispatched.append((act, asyncio.create_task(self._execute_action(act))))
+                    return cached
+
+            async def consume() -> None:
+                stream = await self.client.chat.completions.create(
+                            messages = messages,
+                            stream=True,
+                            # the last chunk then carries the token counts
+                            stream_options={"include_usage": True},
+                            **self.completion_params
+                )
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        span.set(**self._usage_fields(chunk.usage))
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    for act in parser.feed(chunk.choices[0].delta.content):
+                        dispatched.append((act, asyncio.create_task(self._execute_action(act))))
+                    if self.on_answer_delta:
+                        answer = parser.answer_delta()
+                        if answer:
+                            self.on_answer_delta(answer)
+
+            try:
+                # the whole stream, not just its first chunk, is under the timeout
+                await with_timeout(consume(), self.llm_timeout)
+                span.set(early_actions=len(dispatched))
+                logger.info("\nAgent response: %s", parser.text)
+                if cache_key and is_complete_step(parser.text):
+                    await self.response_cache.aset(cache_key, parser.text)
+                return parser.text
+            except DeadlineExceeded:
+                span.set(error="DeadlineExceeded")
+                raise
+            except Exception as e:
+                span.set(error=type(e).__name__)
+                return f"Error generating response: {e}"
+
+    @staticmethod
+    def _cancel_dispatched(dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]]) -> None:
+        for _, task in dispatched:
+            task.cancel()
+
+    async def _gather_actions(
+        self,
+        actions: List[Dict[str, Any]],
+        dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]],
+    ) -> List[Any]:
+        """
+        Runs the step's actions concurrently, reusing the calls already started
+        while streaming. gather keeps the results in action order.
+        """
+        early = [act for act, _ in dispatched]
+        if early != actions[:len(early)]:
+            # the streamed entries do not line up with the parsed step; start over
+            self._cancel_dispatched(dispatched)
+            dispatched = []
+        tasks = [task for _, task in dispatched] + [
+            asyncio.ensure_future(self._execute_action(act)) for act in actions[len(dispatched):]
         ]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # deadline or cancellation: stop the step's other calls too
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def _log_thought_history(self, thought_process: List[Dict[str, Any]]) -> None:
+        """Logs the full chain of thought (skipped entirely when INFO is off)."""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        with self.telemetry.span("history_render", kind="thought_history", records=len(thought_process)):
+            text = self._format_thought_history(thought_process)
+        logger.info(text)
+
+    def _add_step(self, history: HistoryManager, step_text: str, step_records: List[Dict[str, Any]]) -> None:
+        """Appends a step to the history, timing the render of its messages."""
+        with self.telemetry.span("history_render", kind="step", records=len(step_records)) as span:
+            history.add_step(step_text, step_records)
+            span.set(history_tokens=history.total_tokens)
 
+    def _fallback_answer(self, limit: str, thought_process: List[Dict[str, Any]]) -> str:
+        """The partial result when even the forced final answer fails."""
+        answer = f"No final answer within the {limit} limit."
+        if thought_process:
+            answer += "\nLatest observations:\n" + self._format_observations(thought_process[-3:])
+        return answer
+
+    async def _force_final_answer(
+        self,
+        history: HistoryManager,
+        status: str,
+        steps: int,
+        thought_process: List[Dict[str, Any]],
+    ) -> Tuple[str, str, int]:
+        """
+        Asks the model for a final answer from what it has gathered so far (no
+        more tool calls), using the time held back by the deadline. Falls back
+        to the latest observations when that fails too.
+        """
+        limit = "steps" if status == MAX_STEPS else "time"
+        logger.warning("Run stopped after %s steps (%s limit); forcing a final answer", steps, limit)
+        if current_deadline().expired():
+            return self._fallback_answer(limit, thought_process), status, steps
         try:
-            response = oai_client.chat.completions.create(
-                        model = "gpt-4o",
-                        messages = messages,
-                        temperature=0.7,
-                        max_tokens=1000
+            prompt = final_answer_prompt.format(limit=limit)
+            step_text = await self._get_openai_response(
+                history.messages + [{"role": "user", "content": prompt}], final=True
             )
-            print(f"\nAgent response: {response.choices[0].message.content}")
-            return  response.choices[0].message.content
-        except Exception as e:
-            return f"Error generating response: {e}"
-        
-    # executes the ReAct loop      
+            step = json.loads(step_text)
+            if isinstance(step, dict) and "final_answer" in step:
+                return step["final_answer"], status, steps + 1
+        except (DeadlineExceeded, json.JSONDecodeError):
+            pass
+        return self._fallback_answer(limit, thought_process), status, steps + 1
+
+    def _out_of_budget(self, step_index: int, max_steps: int) -> Optional[str]:
+        """MAX_STEPS or DEADLINE when the run must stop before the next step."""
+        if max_steps and step_index >= max_steps:
+            return MAX_STEPS
+        # the reserve is kept for the forced final answer
+        if current_deadline().expired(keep_reserve=True):
+            return DEADLINE
+        return None
+
+    async def execute(
+        self, query: str, deadline: Optional[float] = None, max_steps: Optional[int] = None
+    ) -> AgentResult:
+        """
+        Answers a query within a step cap and a latency budget.
+
+        Every LLM and tool call gets a timeout cut from the budget. When the
+        steps or the time run out, in-flight calls are cancelled and the model
+        is asked once more for a final answer (falling back to the latest
+        observations), which the result reports as partial.
+
+        Parameters:
+        query (str): The user query.
+        deadline (Optional[float]): Seconds for the whole query, including
+            the wait for a pooled session (default: the agent's).
+        max_steps (Optional[int]): Step cap (default: the agent's).
+
+        Returns:
+        AgentResult: The answer, its status ("answered", "max_steps",
+            "deadline" or "error"), the steps taken and the elapsed time.
+        """
+        budget = Deadline(self.deadline if deadline is None else deadline)
+        token = set_deadline(budget)
+        memo_token = start_run_scope()
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                try:
+                    # starting the pool and waiting for a free session count
+                    # against the budget (the whole of it: there is no answer
+                    # to force without a session)
+                    await with_timeout(self._connect(), keep_reserve=False)
+                    # lease a warm server session for the whole run
+                    session = await with_timeout(stack.enter_async_context(self.pool.lease()), keep_reserve=False)
+                except DeadlineExceeded:
+                    logger.warning("No MCP session within the query deadline")
+                    return AgentResult("No MCP session became available within the time limit.",
+                                       DEADLINE, 0, budget.elapsed())
+                if self.pool.manifest_version != self._manifest_version:
+                    # the server announced a tool-list change since the prompt was built
+                    self._apply_manifest()
+                self.telemetry.start_run()
+                session_token = _run_session.set(session)
+                try:
+                    with self.telemetry.span("run", stream=self.stream) as span:
+                        steps_cap = self.max_steps if max_steps is None else max_steps
+                        answer, status, steps = await self._run_react(query, steps_cap)
+                        span.set(status=status, steps=steps)
+                finally:
+                    # the session goes back to the pool: nothing may reach it through the context
+                    _run_session.reset(session_token)
+        finally:
+            end_run_scope(memo_token)
+            reset_deadline(token)
+        return AgentResult(answer, status, steps, budget.elapsed())
+
     async def run(self, query: str) -> str:
-        await self._connect()
+        return (await self.execute(query)).answer
 
+    # executes the ReAct loop      
+    async def _run_react(self, query: str, max_steps: int) -> Tuple[str, str, int]:
         thought_process: List[Dict[str, Any]] = []
+        # append-only conversation: the system prefix is rendered once and each
+        # step only appends its assistant/observation messages at the end (older
+        # steps are compacted once the token budget is exceeded)
+        history = HistoryManager(
+            self.system_message, query, self._format_observations, **self.history_options
+        )
 
-        while True:
-            # Prepare prompt and appends thought history if available
-            prompt = (
-                self.react_prompt.format(tool_descriptions=self.tools_description)
-            )
-            if thought_process:
-                prompt += self._format_thought_history(thought_process)
-
-            # Get next step from LLM (assumes JSON-formatted output)
-            step_text = await self._get_openai_response(prompt, query)
+        step_index = 0
+        dispatched: List[Tuple[Dict[str, Any], "asyncio.Task[Any]"]] = []
+        try:
+            while True:
+                status = self._out_of_budget(step_index, max_steps)
+                if status:
+                    return await self._force_final_answer(history, status, step_index, thought_process)
 
-            try:
-                step = json.loads(step_text)
-            except json.JSONDecodeError as e:
-                return f"Could not parse LLM JSON: {e}\nRaw: {step_text}"
-
-            # When final answer is present, return it
-            if "final_answer" in step:
-                # (Optional) print the full chain of thought
-                print(self._format_thought_history(thought_process))
-                return step["final_answer"]
-
-            # Continues reasoning 
-            thought = step.get("thought", "")
-            actions = step.get("action", []) 
-            pause   = step.get("pause", None)
-
-            if not isinstance(actions, list):
-                actions = [actions]  
-
-            # Execute each tool call
-            for act in actions:
-                tool_name  = act.get("tool_choice")
-                tool_input = act.get("tool_input")
-
-                if not tool_name or tool_input is None:
-                    thought_process.append(
-                        {
-                            "thought": thought,
-                            "action": act,
-                            "observation": "Missing tool_choice/tool_input",
-                            "pause": pause,
-                        }
-                    )
-                    continue
-
-                # tool_func = getattr(self.tools, tool_name, None)
-                tool_func = await self._execute_mcp_tool(tool_name, tool_input)
-                if callable(tool_func):
-                    try:
-                        result = tool_func(tool_input)
-                    except Exception as ex:
-                        result = f"Tool runtime error: {ex}"
+                # Get next step from LLM (assumes JSON-formatted output)
+                self.telemetry.set_step(step_index)
+                dispatched = []
+                if self.stream:
+                    step_text = await self._stream_openai_response(history.messages, dispatched)
                 else:
-                    result = f"Unknown tool '{tool_name}'"
+                    step_text = await self._get_openai_response(history.messages)
 
-                thought_process.append(
+                try:
+                    with self.telemetry.span("parse", chars=len(step_text)):
+                        step = json.loads(step_text)
+                except json.JSONDecodeError as e:
+                    return f"Could not parse LLM JSON: {e}\nRaw: {step_text}", ERROR, step_index + 1
+
+                # When final answer is present, return it
+                if "final_answer" in step:
+                    # (Optional) log the full chain of thought
+                    self._log_thought_history(thought_process)
+                    return step["final_answer"], ANSWERED, step_index + 1
+
+                # Continues reasoning 
+                thought = step.get("thought", "")
+                actions = step.get("action", []) 
+                pause   = step.get("pause", None)
+
+                if not isinstance(actions, list):
+                    actions = [actions]  
+
+                # Execute the step's tool calls concurrently over the session;
+                # gather keeps the results in action order
+                results = await self._gather_actions(actions, dispatched)
+                step_records = [
                     {
                         "thought": thought,
                         "action": act,
                         "observation": result,
                         "pause": pause,
                     }
-                )
+                    for act, result in zip(actions, results)
+                ]
+                thought_process.extend(step_records)
+                self._add_step(history, step_text, step_records)
+                step_index += 1
+        except DeadlineExceeded:
+            self._cancel_dispatched(dispatched)
+            return await self._force_final_answer(history, DEADLINE, step_index, thought_process)
+        finally:
+            # tool calls started while streaming must not outlive the run
+            self._cancel_dispatched(dispatched)
+            self._record_history(history)
+
     async def aclose(self) -> None:
-        if self._exit_stack:
-            await self._exit_stack.aclose()
+        # the pooled server processes outlive the agent; see aclose_session_pools
+        pass
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ReAct agent with MCP tools")
+    parser.add_argument("--batch", metavar="INPUT", help="JSONL file of queries to run in batch mode")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file for batch results")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream model output and start tool calls as soon as they are generated")
+    parser.add_argument("--concurrency", type=positive_int, default=DEFAULT_CONCURRENCY,
+                        help="maximum number of queries in flight in batch mode")
+    parser.add_argument("--server-url", default=None,
+                        help="shared MCP server URL (e.g. http://localhost:8050/mcp) instead of local stdio processes")
+    parser.add_argument("--max-steps", type=int, default=AGENT_MAX_STEPS,
+                        help="reasoning steps per query before a final answer is forced (0 = unlimited)")
+    parser.add_argument("--deadline", type=float, default=AGENT_DEADLINE,
+                        help="seconds per query before a final answer is forced (0 = unlimited)")
+    parser.add_argument("--log-level", default=None,
+                        help="agent log level (default: AGENT_LOG_LEVEL or INFO; WARNING silences per-step output)")
+    return parser.parse_args()
 
 async def main() -> None:
-    agent = ReActAgent()  
+    args = parse_args()
+    configure_logging(args.log_level)
+    agent = ReActAgent(
+        server_url=args.server_url,
+        stream=args.stream,
+        max_steps=args.max_steps,
+        deadline=args.deadline,
+        # show the answer as it streams (interactive mode only)
+        on_answer_delta=None if args.batch else lambda delta: print(delta, end="", flush=True),
+    )
     try:
-        q = input("Enter your query: ")
-        answer = await agent.run(q)
-        print("\nFinal Answer:", answer)
+        if args.batch:
+            # one agent, LLM client and MCP session stay warm for the whole file
+            summary = await run_batch(agent, args.batch, args.output, args.concurrency)
+            summary["token"] = get_token_manager().stats()
+            summary["mcp_pool"] = agent.pool.stats()
+            if agent.tool_memo is not None:
+                summary["tool_memo"] = agent.tool_memo.stats()
+            if agent.observation_store is not None:
+                summary["observations"] = agent.observation_store.stats()
+            print("\nBatch summary:", json.dumps(summary, indent=2))
+        else:
+            q = input("Enter your query: ")
+            result = await agent.execute(q)
+            print("\nFinal Answer:", result.answer)
+            if result.status != ANSWERED:
+                print(f"({result.status} after {result.steps} steps, {result.elapsed_s:.1f}s)")
     finally:
         await agent.aclose()
+        agent.telemetry.close()
+        from mcp_pool import aclose_session_pools
+
+        await aclose_session_pools()
+        await aclose_async_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
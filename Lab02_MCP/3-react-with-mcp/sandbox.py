@@ -0,0 +1,287 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import resource
+except ImportError:  # not on Windows: workers then only get the wall-clock limit
+    resource = None
+
+# Sandbox settings, overridable from the environment
+SANDBOX_ENABLED = os.getenv("SANDBOX_ENABLED", "1").lower() in ("1", "true", "yes")
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "2"))
+# per-call CPU seconds and wall-clock seconds; a worker over either is killed and replaced
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "5"))
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "10"))
+# address-space limit of a worker (its whole memory, not just the call's)
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+# recycle a worker after this many calls
+SANDBOX_MAX_TASKS = int(os.getenv("SANDBOX_MAX_TASKS", "1000"))
+
+# attribute the declaration is stored under on the tool function
+_SANDBOX_ATTR = "__tool_sandboxed__"
+
+# how a sandboxed call failed
+TIMEOUT = "timeout"
+CPU_LIMIT = "cpu_limit"
+MEMORY_LIMIT = "memory_limit"
+CRASHED = "crashed"
+TOOL_ERROR = "error"
+
+
+def sandboxed(func: Callable) -> Callable:
+    """
+    Declares that a tool must run in the sandbox process pool (CPU-heavy or
+    untrusted work). The function is returned unchanged; it must be importable
+    by name (a module-level function or a method of a module-level class).
+    """
+    setattr(func, _SANDBOX_ATTR, True)
+    return func
+
+
+def is_sandboxed(func: Callable) -> bool:
+    return getattr(func, _SANDBOX_ATTR, False)
+
+
+class SandboxError(Exception):
+    """
+    A sandboxed call that did not return: `kind` is "timeout", "cpu_limit",
+    "memory_limit", "crashed" or "error" (the tool raised). str() is a JSON
+    object, so it can be handed to the model as the observation.
+    """
+
+    def __init__(self, kind: str, tool: str, detail: str) -> None:
+        self.kind = kind
+        self.tool = tool
+        self.detail = detail
+        super().__init__(json.dumps(self.to_dict()))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"error": self.kind, "tool": self.tool, "detail": self.detail}
+
+
+def _worker_main(conn: Any, cpu_seconds: int, memory_bytes: int) -> None:
+    """Runs calls received on `conn` until the pipe closes."""
+    # keep math libraries to one thread, so the memory limit is not spent on thread stacks
+    for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+    if resource is not None and memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    while True:
+        try:
+            func, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        if resource is not None and cpu_seconds:
+            # RLIMIT_CPU counts the whole process, so the limit moves with each call
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+        try:
+            reply: Tuple[str, Any] = ("ok", func(*args, **kwargs))
+        except MemoryError:
+            reply = (MEMORY_LIMIT, f"out of memory (limit {memory_bytes // 2 ** 20} MB)")
+        except BaseException as ex:
+            reply = (TOOL_ERROR, f"{type(ex).__name__}: {ex}")
+        try:
+            conn.send(reply)
+        except Exception as ex:  # e.g. an unpicklable result
+            conn.send((TOOL_ERROR, f"result could not be returned: {ex}"))
+
+
+class _Worker:
+    def __init__(self, context: Any, cpu_seconds: int, memory_bytes: int) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, cpu_seconds, memory_bytes), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ProcessSandbox:
+    """
+    A pre-started pool of worker processes for tools that may burn CPU or
+    memory. Each call gets `cpu_seconds` of CPU (RLIMIT_CPU), at most
+    `timeout` seconds of wall time, and the worker's address space is capped
+    at `memory_mb` (RLIMIT_AS). A worker that runs over, crashes or is
+    cancelled mid-call is killed and replaced, and the call fails with a
+    SandboxError; the event loop only ever waits on the worker's pipe.
+
+    Parameters:
+    workers (int): Worker processes (calls beyond that wait for a free worker).
+    cpu_seconds (int): CPU time per call (0 = no limit).
+    memory_mb (int): Address-space limit per worker (0 = no limit).
+    timeout (float): Wall-clock seconds per call.
+    max_tasks (int): Calls before a worker is recycled.
+    """
+
+    def __init__(
+        self,
+        workers: int = SANDBOX_WORKERS,
+        cpu_seconds: int = SANDBOX_CPU_SECONDS,
+        memory_mb: int = SANDBOX_MEMORY_MB,
+        timeout: float = SANDBOX_TIMEOUT,
+        max_tasks: int = SANDBOX_MAX_TASKS,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 2 ** 20
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        # workers are forked from a clean server process, not from the agent
+        # (forking a process that runs an event loop and threads is unsafe)
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._idle: Optional["asyncio.Queue[_Worker]"] = None
+        self._all: List[_Worker] = []
+        self._start_lock = asyncio.Lock()
+        self._replacing: Set["asyncio.Task[None]"] = set()
+        self._counters = {
+            "calls": 0, "timeouts": 0, "cpu_limits": 0, "memory_limits": 0, "crashes": 0,
+            "tool_errors": 0, "replaced": 0,
+        }
+
+    def _new_worker(self) -> _Worker:
+        worker = _Worker(self._context, self.cpu_seconds, self.memory_bytes)
+        self._all.append(worker)
+        return worker
+
+    async def start(self) -> None:
+        """Starts the worker processes (off the event loop)."""
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            idle: "asyncio.Queue[_Worker]" = asyncio.Queue()
+            workers = await asyncio.gather(
+                *(asyncio.to_thread(self._new_worker) for _ in range(self.workers))
+            )
+            for worker in workers:
+                idle.put_nowait(worker)
+            self._idle = idle
+
+    async def _replace(self, worker: _Worker) -> None:
+        """Kills `worker` and puts a fresh one in its place."""
+        self._counters["replaced"] += 1
+        if worker in self._all:
+            self._all.remove(worker)
+        await asyncio.to_thread(worker.kill)
+        if self._idle is not None:  # not closed meanwhile
+            self._idle.put_nowait(await asyncio.to_thread(self._new_worker))
+
+    async def _recv(self, worker: _Worker, timeout: Optional[float]) -> Tuple[str, Any]:
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = worker.conn.fileno()
+        try:
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        except NotImplementedError:
+            # Windows' proactor loop cannot watch pipes: wait on a thread instead
+            if not await asyncio.to_thread(worker.conn.poll, timeout):
+                raise asyncio.TimeoutError from None
+            return worker.conn.recv()
+        try:
+            await asyncio.wait_for(readable, timeout)
+        finally:
+            loop.remove_reader(fd)
+        return worker.conn.recv()
+
+    def _died(self, worker: _Worker, name: str) -> SandboxError:
+        worker.process.join(timeout=1)
+        code = worker.process.exitcode
+        if code is not None and code == -getattr(signal, "SIGXCPU", 0):
+            self._counters["cpu_limits"] += 1
+            return SandboxError(CPU_LIMIT, name, f"used more than {self.cpu_seconds}s of CPU")
+        if code is not None and code == -getattr(signal, "SIGKILL", 0):
+            # the kernel's OOM killer, or the address-space limit hit outside Python
+            self._counters["memory_limits"] += 1
+            return SandboxError(MEMORY_LIMIT, name, "worker was killed, likely out of memory")
+        self._counters["crashes"] += 1
+        return SandboxError(CRASHED, name, f"worker exited with code {code}")
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs `func(*args, **kwargs)` in a worker process and returns its result.
+
+        Raises:
+        SandboxError: If the call timed out, ran over a limit, crashed the
+            worker or raised.
+        """
+        if self._idle is None:
+            await self.start()
+        name = getattr(func, "__name__", "tool")
+        worker = await self._idle.get()
+        self._counters["calls"] += 1
+        try:
+            worker.conn.send((func, args, kwargs))
+            kind, value = await self._recv(worker, self.timeout)
+        except asyncio.TimeoutError:
+            self._counters["timeouts"] += 1
+            await self._replace(worker)
+            raise SandboxError(TIMEOUT, name, f"no result after {self.timeout:g}s") from None
+        except (EOFError, OSError):
+            error = self._died(worker, name)
+            await self._replace(worker)
+            raise error from None
+        except asyncio.CancelledError:
+            # the worker is still busy with the abandoned call
+            task = asyncio.ensure_future(self._replace(worker))
+            self._replacing.add(task)
+            task.add_done_callback(self._replacing.discard)
+            raise
+        except BaseException:
+            # e.g. the call could not be pickled; the worker is untouched
+            self._idle.put_nowait(worker)
+            raise
+
+        worker.tasks += 1
+        if kind == MEMORY_LIMIT or worker.tasks >= self.max_tasks:
+            # a worker that hit MemoryError may be left in a bad state
+            await self._replace(worker)
+        else:
+            self._idle.put_nowait(worker)
+        if kind == "ok":
+            return value
+        self._counters["memory_limits" if kind == MEMORY_LIMIT else "tool_errors"] += 1
+        raise SandboxError(kind, name, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._counters, workers=len(self._all))
+
+    async def aclose(self) -> None:
+        workers, self._all = self._all, []
+        self._idle = None
+        await asyncio.gather(*(asyncio.to_thread(w.kill) for w in workers))
+
+
+_sandbox: Optional[ProcessSandbox] = None
+
+
+def get_sandbox() -> Optional[ProcessSandbox]:
+    """
+    Returns the process-wide sandbox, or None when SANDBOX_ENABLED is off
+    (sandboxed tools then run like any other tool).
+    """
+    global _sandbox
+    if _sandbox is None and SANDBOX_ENABLED:
+        _sandbox = ProcessSandbox()
+    return _sandbox
+
+
+async def aclose_sandbox() -> None:
+    """Stops the sandbox workers (call once at shutdown)."""
+    global _sandbox
+    if _sandbox is not None:
+        await _sandbox.aclose()
+        _sandbox = None
@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+from typing import Any, Optional
+
+# Transport settings, overridable from the environment (and then the CLI)
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio")
+MCP_HOST = os.getenv("MCP_HOST")
+MCP_PORT = os.getenv("MCP_PORT")
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+# uvicorn connection limits: concurrent connections/tasks before 503s, idle
+# keep-alive seconds and the listen backlog
+MCP_LIMIT_CONCURRENCY = os.getenv("MCP_LIMIT_CONCURRENCY")
+MCP_KEEP_ALIVE = int(os.getenv("MCP_KEEP_ALIVE", "5"))
+MCP_BACKLOG = int(os.getenv("MCP_BACKLOG", "2048"))
+
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+
+
+def parse_args(mcp: Any, description: str) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--transport", choices=TRANSPORTS, default=MCP_TRANSPORT,
+                        help="stdio (one client per process), sse or streamable-http")
+    parser.add_argument("--host", default=MCP_HOST or mcp.settings.host)
+    parser.add_argument("--port", type=int, default=int(MCP_PORT or mcp.settings.port))
+    parser.add_argument("--workers", type=int, default=MCP_WORKERS,
+                        help="worker processes behind the port (streamable-http only)")
+    parser.add_argument("--limit-concurrency", type=int,
+                        default=int(MCP_LIMIT_CONCURRENCY) if MCP_LIMIT_CONCURRENCY else None,
+                        help="maximum concurrent connections per worker")
+    parser.add_argument("--keep-alive", type=int, default=MCP_KEEP_ALIVE,
+                        help="seconds to keep idle HTTP connections open")
+    parser.add_argument("--backlog", type=int, default=MCP_BACKLOG)
+    return parser.parse_args()
+
+
+def create_http_app(mcp: Any, transport: Optional[str] = None) -> Any:
+    """
+    Returns the ASGI app of `mcp` for an HTTP transport (MCP_TRANSPORT when
+    omitted). With MCP_WORKERS > 1 the streamable HTTP app is stateless, so any
+    worker can answer any request.
+    """
+    # read at call time: run_server sets these just before starting uvicorn
+    transport = transport or os.getenv("MCP_TRANSPORT", "stdio")
+    if transport == "sse":
+        return mcp.sse_app()
+    if transport == "streamable-http":
+        if int(os.getenv("MCP_WORKERS", "1")) > 1:
+            mcp.settings.stateless_http = True
+        return mcp.streamable_http_app()
+    raise ValueError(f"No HTTP app for transport: {transport}")
+
+
+def run_server(mcp: Any, app_factory: str, description: str = "MCP server") -> None:
+    """
+    Runs `mcp` over the transport chosen on the command line or in the environment.
+
+    Parameters:
+    mcp (FastMCP): The server.
+    app_factory (str): Import string of a zero-argument function returning the
+        HTTP app (e.g. "mcp_server:create_app"); uvicorn imports it in every
+        worker process.
+    description (str): CLI description.
+    """
+    args = parse_args(mcp, description)
+    # stdout carries the protocol in stdio mode, so status goes to stderr
+    print(f"Running server with {args.transport} transport", file=sys.stderr)
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+        return
+
+    if args.workers > 1 and args.transport != "streamable-http":
+        raise ValueError("Multiple workers need --transport streamable-http (SSE sessions are per process)")
+
+    import uvicorn
+
+    # the workers read their settings back from the environment
+    os.environ["MCP_TRANSPORT"] = args.transport
+    os.environ["MCP_WORKERS"] = str(args.workers)
+    uvicorn.run(
+        app_factory,
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        limit_concurrency=args.limit_concurrency,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        log_level=mcp.settings.log_level.lower(),
+    )
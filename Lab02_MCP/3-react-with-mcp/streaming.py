@@ -0,0 +1,126 @@
+import json
+from typing import Any, Dict, List, Optional
+
+
+class StepStreamParser:
+    """
+    Incremental scanner for the step JSON streamed by the model.
+
+    Text is fed chunk by chunk. The scanner tracks string/escape state and
+    nesting depth, and returns each element of the top-level "action" array
+    as soon as that element is syntactically complete, long before the whole
+    step has been generated. It also decodes the "final_answer" string as it
+    streams so the answer can be shown token by token.
+    """
+
+    def __init__(self, action_key: str = "action", answer_key: str = "final_answer") -> None:
+        self.action_key = action_key
+        self.answer_key = answer_key
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_action_array = False
+        self._element_start: Optional[int] = None
+        self._answer_start: Optional[int] = None
+        self._answer_end: Optional[int] = None
+        self._answer_emitted = ""
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consumes a chunk of streamed text.
+
+        Parameters:
+        chunk (str): The next piece of model output.
+
+        Returns:
+        List[Dict[str, Any]]: Action entries completed by this chunk, in order.
+        """
+        self._text += chunk
+        text = self._text
+        completed: List[Dict[str, Any]] = []
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:i]
+                        if self._answer_start == self._string_start + 1:
+                            self._answer_end = i
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._current_key == self.answer_key:
+                    self._answer_start = i + 1
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+            elif ch in "{[":
+                if self._depth == 1 and self._current_key == self.action_key:
+                    if ch == "[":
+                        self._in_action_array = True
+                    else:
+                        # a single action object instead of a list
+                        self._element_start = i
+                elif self._depth == 2 and self._in_action_array and ch == "{":
+                    self._element_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                element_depth = 2 if self._in_action_array else 1
+                if ch == "}" and self._element_start is not None and self._depth == element_depth:
+                    try:
+                        element = json.loads(text[self._element_start:i + 1])
+                    except json.JSONDecodeError:
+                        element = None
+                    if isinstance(element, dict):
+                        completed.append(element)
+                    self._element_start = None
+                elif ch == "]" and self._in_action_array and self._depth == 1:
+                    self._in_action_array = False
+
+        self._pos = len(text)
+        return completed
+
+    def answer_delta(self) -> str:
+        """
+        Returns the part of the decoded "final_answer" string not returned before.
+        """
+        if self._answer_start is None:
+            return ""
+        if self._answer_end is not None:
+            raw = self._text[self._answer_start:self._answer_end]
+        else:
+            raw = self._text[self._answer_start:self._pos]
+            # leave a possibly incomplete escape sequence for the next chunk
+            cut = raw.rfind("\\")
+            if cut != -1 and cut >= len(raw) - 6:
+                raw = raw[:cut]
+        try:
+            decoded = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            return ""
+        if self._answer_end is None and decoded and "\ud800" <= decoded[-1] <= "\udbff":
+            # the first half of a \uXXXX surrogate pair: wait for the second
+            decoded = decoded[:-1]
+        delta = decoded[len(self._answer_emitted):]
+        self._answer_emitted = decoded
+        return delta
@@ -0,0 +1,225 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from mcp import types
+
+# Tool manifest cache settings, overridable from the environment
+MCP_MANIFEST_PATH = os.getenv("MCP_MANIFEST_PATH", ".mcp_tool_manifest.json")
+# servers without a local script to hash (HTTP servers) are re-listed after this long
+MCP_MANIFEST_MAX_AGE = float(os.getenv("MCP_MANIFEST_MAX_AGE", str(24 * 3600)))
+
+# environment variables a module reads: os.getenv("X"), os.environ.get("X"), os.environ["X"]
+_ENV_READ = re.compile(r"""os\.(?:getenv|environ\.get)\(\s*["'](\w+)["']|os\.environ\[\s*["'](\w+)["']""")
+
+
+def render_tool_descriptions(tools: List[types.Tool]) -> str:
+    """Formats the tools the way the ReAct prompt lists them."""
+    return "\n".join(f"{tool.name}: \"{tool.description}\"" for tool in tools)
+
+
+def server_identity(command: str, args: List[str], url: Optional[str] = None) -> str:
+    """Identifies a server by its URL, or by its command line for stdio servers."""
+    if url:
+        return url
+    return " ".join([command] + [os.path.abspath(a) if os.path.exists(a) else a for a in args])
+
+
+def _local_imports(path: str, source: bytes) -> List[str]:
+    """Paths of the modules next to `path` that its source imports."""
+    names = set()
+    for node in ast.walk(ast.parse(source, filename=path)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    folder = os.path.dirname(path)
+    return sorted(p for p in (os.path.join(folder, f"{name}.py") for name in names) if os.path.isfile(p))
+
+
+def content_hash(path: Optional[str]) -> Optional[str]:
+    """
+    SHA-256 of what the server's tool list depends on: the server script, the
+    local modules it imports (transitively), the .env file next to it and the
+    values of the environment variables those modules read (e.g. the memo
+    TTLs). None when there is no local script.
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    sources: Dict[str, bytes] = {}
+    pending = [os.path.abspath(path)]
+    while pending:
+        module = pending.pop()
+        if module in sources:
+            continue
+        with open(module, "rb") as f:
+            sources[module] = f.read()
+        try:
+            pending.extend(_local_imports(module, sources[module]))
+        except SyntaxError:
+            # the server will fail to start anyway; hash the text as it is
+            pass
+    digest = hashlib.sha256()
+    env_names = set()
+    for module in sorted(sources):
+        digest.update(os.path.basename(module).encode("utf-8") + b"\0" + sources[module])
+        env_names.update(a or b for a, b in _ENV_READ.findall(sources[module].decode("utf-8", "replace")))
+    env_file = os.path.join(os.path.dirname(os.path.abspath(path)), ".env")
+    if os.path.isfile(env_file):
+        with open(env_file, "rb") as f:
+            digest.update(b".env\0" + f.read())
+    for name in sorted(env_names):
+        digest.update(f"{name}={os.environ.get(name)!r}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _server_version(server_info: Any) -> str:
+    if server_info is None:
+        return ""
+    return f"{server_info.name}@{server_info.version}"
+
+
+class ToolManifest:
+    """
+    The tool list of one server, with the prompt description rendered once.
+
+    `version` is bumped every time the tools of a server change.
+    """
+
+    def __init__(
+        self,
+        identity: str,
+        content_hash: Optional[str],
+        server_version: str,
+        tools: List[types.Tool],
+        version: int = 1,
+        created_at: Optional[float] = None,
+        description: Optional[str] = None,
+    ) -> None:
+        self.identity = identity
+        self.content_hash = content_hash
+        self.server_version = server_version
+        self.tools = tools
+        self.version = version
+        self.created_at = created_at or time.time()
+        self.description = description if description is not None else render_tool_descriptions(tools)
+        self.tools_hash = hashlib.sha256(
+            json.dumps([t.model_dump(mode="json") for t in tools], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "content_hash": self.content_hash,
+            "server_version": self.server_version,
+            "version": self.version,
+            "created_at": self.created_at,
+            "description": self.description,
+            "tools": [t.model_dump(mode="json", exclude_none=True) for t in self.tools],
+        }
+
+    @classmethod
+    def from_dict(cls, identity: str, data: Dict[str, Any]) -> "ToolManifest":
+        return cls(
+            identity,
+            data.get("content_hash"),
+            data.get("server_version", ""),
+            [types.Tool.model_validate(t) for t in data["tools"]],
+            version=data.get("version", 1),
+            created_at=data.get("created_at"),
+            description=data.get("description"),
+        )
+
+
+class ManifestStore:
+    """
+    On-disk cache of tool manifests keyed by server identity.
+
+    A cached manifest is used only while the server reports the same name and
+    version and, for stdio servers, while the content hash of the script, its
+    local imports and the environment they read still matches; manifests of HTTP servers expire after `max_age` seconds.
+    """
+
+    def __init__(self, path: Optional[str] = MCP_MANIFEST_PATH, max_age: float = MCP_MANIFEST_MAX_AGE) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, ToolManifest] = {}
+        if path:
+            self._load()
+
+    def get(self, identity: str, content_hash: Optional[str], server_info: Any) -> Optional[ToolManifest]:
+        with self._lock:
+            manifest = self._entries.get(identity)
+            fresh = manifest is not None and manifest.server_version == _server_version(server_info) and (
+                manifest.content_hash == content_hash
+                if content_hash is not None
+                else time.time() - manifest.created_at < self.max_age
+            )
+            if not fresh:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return manifest
+
+    def put(
+        self, identity: str, content_hash: Optional[str], server_info: Any, tools: List[types.Tool]
+    ) -> ToolManifest:
+        """Stores a freshly listed manifest, bumping the version if the tools changed."""
+        manifest = ToolManifest(identity, content_hash, _server_version(server_info), list(tools))
+        with self._lock:
+            previous = self._entries.get(identity)
+            if previous is not None:
+                changed = previous.tools_hash != manifest.tools_hash
+                manifest.version = previous.version + 1 if changed else previous.version
+            self._entries[identity] = manifest
+        self.save()
+        return manifest
+
+    def invalidate(self, identity: str) -> None:
+        """Forces the next lookup for `identity` to list the tools again."""
+        with self._lock:
+            manifest = self._entries.get(identity)
+            if manifest is not None:
+                # keep the version so the next put can bump it
+                manifest.server_version = ""
+                manifest.content_hash = None
+                manifest.created_at = 0.0
+        self.save()
+
+    def save(self) -> None:
+        """Writes the manifests to `path` (atomically replacing the file)."""
+        if not self.path:
+            return
+        with self._lock:
+            data = {identity: m.to_dict() for identity, m in self._entries.items()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = {identity: ToolManifest.from_dict(identity, m) for identity, m in data.items()}
+        except (OSError, ValueError, KeyError):
+            # missing or unreadable cache: start empty
+            self._entries = {}
+
+
+_store: Optional[ManifestStore] = None
+
+
+def get_manifest_store() -> ManifestStore:
+    """Returns the process-wide manifest store."""
+    global _store
+    if _store is None:
+        _store = ManifestStore()
+    return _store
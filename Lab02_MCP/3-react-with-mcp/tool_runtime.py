@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from sandbox import get_sandbox
+
+# Server-side tool execution limits, overridable from the environment
+MCP_TOOL_MAX_WORKERS = int(os.getenv("MCP_TOOL_MAX_WORKERS", "4"))
+MCP_TOOL_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "8"))
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "30"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the bounded thread pool that runs blocking or CPU-bound tool work,
+    so it never runs on the server's event loop.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MCP_TOOL_MAX_WORKERS, thread_name_prefix="mcp-tool")
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a sync function on the tool executor and awaits its result.
+
+    Parameters:
+    func (Callable): The blocking function.
+    *args, **kwargs: Its arguments.
+
+    Returns:
+    Any: The function's return value.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def run_sandboxed(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a sync function in the sandbox process pool (see sandbox.py), with
+    per-call CPU, memory and wall-clock limits; on the tool executor when the
+    sandbox is disabled. `func` must be importable by name.
+
+    Raises:
+    SandboxError: If the call ran over a limit or failed (str() is a JSON object).
+    """
+    sandbox = get_sandbox()
+    if sandbox is None:
+        return await run_blocking(func, *args, **kwargs)
+    return await sandbox.run(func, *args, **kwargs)
+
+
+@asynccontextmanager
+async def sandbox_lifespan(server: Any) -> AsyncIterator[Dict[str, Any]]:
+    """
+    FastMCP lifespan starting the sandbox workers with the server, so the
+    first sandboxed call does not wait for them. The workers are left running
+    at exit (they are daemons): HTTP servers enter the lifespan per session.
+    """
+    sandbox = get_sandbox()
+    if sandbox is not None:
+        await sandbox.start()
+    yield {}
+
+
+def limited(
+    max_concurrency: int = MCP_TOOL_CONCURRENCY,
+    timeout: Optional[float] = MCP_TOOL_TIMEOUT,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Decorator for async tools: at most `max_concurrency` calls of the tool run
+    at once (the others wait) and each call is abandoned after `timeout`
+    seconds, which FastMCP reports to the client as a tool error.
+
+    Apply it below `@mcp.tool()`; the wrapped signature and docstring are kept,
+    so the tool's schema is unchanged.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(func(*args, **kwargs), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{func.__name__} timed out after {timeout:g}s") from None
+
+        return wrapper
+
+    return decorator
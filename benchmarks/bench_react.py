@@ -0,0 +1,464 @@
+"""
+Offline benchmarks for the ReAct agents.
+
+Runs the Lab01 function-calling agent and the Lab02 MCP agent against a
+scripted fake chat-completions backend and local fake tools, so only the
+agents' own overhead is measured (no Azure, no wttr.in, no MCP subprocess).
+
+    python benchmarks/bench_react.py                   # run and print
+    python benchmarks/bench_react.py --save-baseline   # record a baseline
+    python benchmarks/bench_react.py --compare         # flag regressions vs the baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fakes import FakeChatClient, FakeCredential, FakeMCPPool, make_echo_tool, make_weather_payload, spin
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+LAB01_DIR = REPO_ROOT / "Lab01_ReActAgent" / "2-react-with-function-calling"
+LAB02_DIR = REPO_ROOT / "Lab02_MCP" / "3-react-with-mcp"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+
+STEP_COUNTS = [1, 5, 10, 20]
+OBSERVATION_SIZES = [256, 8 * 1024, 64 * 1024]
+CONCURRENCY_LEVELS = [1, 8, 32]
+CONCURRENT_QUERIES = 64
+FAKE_LLM_LATENCY = 0.02
+# short-lived fake tokens, so several refreshes happen during the token benchmark
+FAKE_TOKEN_LIFETIME = 2.0
+FAKE_CREDENTIAL_LATENCY = 0.05
+TOKEN_BENCH_SECONDS = 3.0
+# a slow tool the fake model calls with the same input in every step
+FAKE_TOOL_LATENCY = 0.01
+MEMO_BENCH_STEPS = 5
+MEMO_BENCH_QUERIES = 16
+# the HTTP service: a few agents behind a small queue, offered more load than it admits
+SERVICE_WORKERS = 8
+SERVICE_QUEUE_SIZE = 16
+SERVICE_REQUESTS = 128
+SERVICE_CLIENTS = 64
+# a long run with large observations, with and without the observation store
+OBSERVATION_BENCH_STEPS = 20
+OBSERVATION_BENCH_SIZE = 64 * 1024
+# forecast days of the compact weather report with a forecast
+WEATHER_FORECAST_DAYS = 3
+# CPU limit of the sandbox benchmark's runaway call
+SANDBOX_CPU_SECONDS = 1
+
+
+def load_lab_module(lab_dir: Path, filename: str, name: str) -> Any:
+    """
+    Imports a lab script by path, with its folder first on sys.path.
+
+    The labs reuse module names (prompts, history, llm, ...), so lab-local
+    modules already imported from another lab are dropped first.
+    """
+    for mod_name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if not path:
+            continue
+        folder = Path(path).resolve().parent
+        if folder != lab_dir and folder.parent.parent == REPO_ROOT and folder.parent.name.startswith("Lab"):
+            del sys.modules[mod_name]
+
+    sys.path.insert(0, str(lab_dir))
+    try:
+        spec = importlib.util.spec_from_file_location(name, lab_dir / filename)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(str(lab_dir))
+    return module
+
+
+def timeit(fn: Callable[[], Any], repeat: int = 200) -> float:
+    """Median wall time of `fn` in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+async def atimeit(fn: Callable[[], Awaitable[Any]], repeat: int = 50) -> float:
+    """Median wall time of the coroutine returned by `fn` in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+class Results:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, value: float, unit: str = "s", better: str = "lower") -> None:
+        self.metrics[name] = {"value": value, "unit": unit, "better": better}
+        shown = f"{value * 1e6:10.1f} us" if unit == "s" else f"{value:10.1f} {unit}"
+        print(f"  {name:<55}{shown}", file=sys.stderr)
+
+
+def lab01_agent(module: Any, observation_size: int, **script: Any) -> Any:
+    toolbox = module.ToolBox()
+    toolbox.store([make_echo_tool(observation_size)])
+    # no step cap: the scaling runs go up to 20 steps
+    return module.ReActAgent(client=FakeChatClient(**script), toolbox=toolbox, max_steps=0)
+
+
+def lab02_agent(module: Any, observation_size: int, **script: Any) -> Any:
+    # lease a fake session instead of spawning MCP server processes
+    return module.ReActAgent(client=FakeChatClient(**script), pool=FakeMCPPool(observation_size), max_steps=0)
+
+
+def sample_history(steps: int, observation_size: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "thought": f"step {i}",
+            "action": {"tool_choice": "echo", "tool_input": "payload"},
+            "observation": "x" * observation_size,
+            "pause": "check",
+        }
+        for i in range(steps)
+    ]
+
+
+async def bench_step_overhead(results: Results, lab01: Any) -> None:
+    """Per-step building blocks of the loop."""
+    print("per-step overhead (lab01):", file=sys.stderr)
+    agent = lab01_agent(lab01, 1024)
+    template = agent.react_prompt
+    description = agent.toolbox.describe_tools()
+    results.add("step.prompt_format", timeit(lambda: template.format(tool_descriptions=description)))
+    results.add("step.prompt_render_memoized", timeit(lambda: agent.toolbox.render_prompt(template)))
+
+    step_text = FakeChatClient(steps=1).chat.completions.step_text(0)
+    results.add("step.json_parse", timeit(lambda: json.loads(step_text)))
+
+    for steps in STEP_COUNTS:
+        history = sample_history(steps, 1024)
+        results.add(
+            f"step.format_thought_history.steps={steps}",
+            timeit(lambda: agent._format_thought_history(history), repeat=50),
+        )
+
+    action = {"tool_choice": "echo", "tool_input": "payload"}
+    results.add("step.tool_dispatch", await atimeit(lambda: agent._execute_action(action), repeat=200))
+
+    record = sample_history(1, 1024)
+    def add_steps() -> None:
+        history = lab01.HistoryManager(agent.system_message, "query", agent._format_observations)
+        for _ in range(10):
+            history.add_step(step_text, record)
+    results.add("step.history_add_10_steps", timeit(add_steps, repeat=50))
+    await agent.aclose()
+
+
+async def bench_scaling(results: Results, name: str, make_agent: Callable[..., Any]) -> None:
+    """End-to-end run time against step count and observation size."""
+    print(f"scaling ({name}):", file=sys.stderr)
+    for observation_size in OBSERVATION_SIZES:
+        for steps in STEP_COUNTS:
+            agent = make_agent(observation_size, steps=steps)
+            elapsed = await atimeit(lambda: agent.run("benchmark query"), repeat=5)
+            results.add(f"{name}.run.steps={steps}.obs={observation_size}", elapsed)
+            results.add(f"{name}.per_step.steps={steps}.obs={observation_size}", elapsed / (steps + 1))
+            if name == "lab01":
+                await agent.aclose()
+
+
+async def bench_concurrency(results: Results, name: str, make_agent: Callable[..., Any]) -> None:
+    """Queries per second with a fixed fake LLM latency."""
+    print(f"concurrency ({name}, {FAKE_LLM_LATENCY * 1000:.0f} ms fake LLM):", file=sys.stderr)
+    for concurrency in CONCURRENCY_LEVELS:
+        agent = make_agent(1024, steps=3, latency=FAKE_LLM_LATENCY)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                await agent.run("benchmark query")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(CONCURRENT_QUERIES)))
+        elapsed = time.perf_counter() - started
+        results.add(f"{name}.qps.concurrency={concurrency}", CONCURRENT_QUERIES / elapsed, "qps", "higher")
+        if name == "lab01":
+            await agent.aclose()
+
+
+async def bench_token_refresh(results: Results, llm: Any) -> None:
+    """
+    Token lookups while tokens keep expiring: after the first token, no
+    lookup should wait on the (slow) credential.
+    """
+    credential = FakeCredential(lifetime=FAKE_TOKEN_LIFETIME, latency=FAKE_CREDENTIAL_LATENCY)
+    manager = llm.TokenManager(credential, refresh_margin=FAKE_TOKEN_LIFETIME / 2, min_validity=0.1)
+    await manager.get_token()
+    latencies = []
+    deadline = time.perf_counter() + TOKEN_BENCH_SECONDS
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await asyncio.gather(*(manager.get_token() for _ in range(8)))
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+    await manager.aclose()
+    stats = manager.stats()
+    print(f"token refresh: {stats['background_refreshes']} background refreshes, "
+          f"{stats['waits']} waits", file=sys.stderr)
+    results.add("token.lookup_max", max(latencies))
+    results.add("token.waits_after_first", stats["waits"] - 1, "count")
+
+
+async def bench_tool_memo(results: Results, lab01: Any, memo: Any) -> None:
+    """
+    Queries repeating one call of a slow tool, with and without the tool
+    declared pure: the memoized runs should only pay for the first call.
+    """
+    print(f"tool memo ({FAKE_TOOL_LATENCY * 1000:.0f} ms tool, {MEMO_BENCH_STEPS} steps):", file=sys.stderr)
+    for label, policy in (("uncached", None), ("memoized", memo.memoize(pure=True))):
+        tool = make_echo_tool(1024, latency=FAKE_TOOL_LATENCY)
+        if policy is not None:
+            tool = policy(tool)
+        toolbox = lab01.ToolBox()
+        toolbox.store([tool])
+        tool_memo = memo.ToolMemo()
+        agent = lab01.ReActAgent(
+            client=FakeChatClient(steps=MEMO_BENCH_STEPS), toolbox=toolbox, tool_memo=tool_memo, max_steps=0
+        )
+        started = time.perf_counter()
+        for _ in range(MEMO_BENCH_QUERIES):
+            await agent.run("benchmark query")
+        results.add(f"memo.run.{label}", (time.perf_counter() - started) / MEMO_BENCH_QUERIES)
+        if policy is not None:
+            results.add("memo.hit_rate", tool_memo.stats()["hit_rate"], "ratio", "higher")
+        await agent.aclose()
+
+
+async def bench_observation_store(results: Results, lab01: Any, observations: Any) -> None:
+    """
+    A long run with large observations, inline in the history and spilled to
+    the observation store: the largest prompt sent and the run time.
+    """
+    print(f"observation store ({OBSERVATION_BENCH_STEPS} steps, "
+          f"{OBSERVATION_BENCH_SIZE // 1024} KB observations):", file=sys.stderr)
+    for label, store in (("inline", None), ("spilled", observations.ObservationStore())):
+        agent = lab01_agent(lab01, OBSERVATION_BENCH_SIZE, steps=OBSERVATION_BENCH_STEPS)
+        agent.observation_store = store
+        elapsed = await atimeit(lambda: agent.run("benchmark query"), repeat=5)
+        results.add(f"obs.run.{label}", elapsed)
+        results.add(f"obs.max_prompt_chars.{label}", agent.client.chat.completions.max_prompt_chars, "chars")
+        await agent.aclose()
+    results.add("obs.read_slice", timeit(
+        lambda: store.read(store.handle_of("x" * OBSERVATION_BENCH_SIZE), 30000), repeat=200
+    ))
+
+
+def bench_weather_output(results: Results, weather: Any, history: Any) -> None:
+    """
+    Tokens a weather observation adds to the history: the raw report as the
+    tool used to return it, and the compact report with and without a forecast.
+    """
+    payload = make_weather_payload()
+    outputs = {
+        "raw": str(payload),
+        "compact": weather.format_weather(payload),
+        f"forecast{WEATHER_FORECAST_DAYS}": weather.format_weather(payload, WEATHER_FORECAST_DAYS),
+    }
+    print("weather observation tokens:", file=sys.stderr)
+    tokens = {label: history.count_tokens(text) for label, text in outputs.items()}
+    for label, count in tokens.items():
+        results.add(f"weather.tokens.{label}", count, "tokens")
+    results.add("weather.tokens_saved_per_call", tokens["raw"] - tokens["compact"], "tokens", "higher")
+    results.add("weather.format_compact", timeit(lambda: weather.format_weather(payload)))
+
+
+async def bench_service(results: Results, lab02: Any, service_module: Any) -> None:
+    """
+    Requests through the HTTP front end of the agent service: throughput and
+    latency of admitted queries, and how often a query was turned away with
+    a 429 (and retried) while more clients than agents plus queue slots hit it.
+    """
+    import httpx
+
+    print(f"agent service ({SERVICE_WORKERS} agents, queue {SERVICE_QUEUE_SIZE}, "
+          f"{SERVICE_CLIENTS} clients, {FAKE_LLM_LATENCY * 1000:.0f} ms fake LLM):", file=sys.stderr)
+    client = FakeChatClient(steps=3, latency=FAKE_LLM_LATENCY)
+    pool = FakeMCPPool(1024)
+    service = service_module.AgentService(
+        lambda: lab02.ReActAgent(client=client, pool=pool, max_steps=0),
+        workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE,
+    )
+    await service.start()
+    transport = httpx.ASGITransport(app=service_module.create_app(service))
+    codes: Dict[int, int] = {}
+    latencies: List[float] = []
+    remaining = list(range(SERVICE_REQUESTS))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://service") as http:
+        async def caller() -> None:
+            while remaining:
+                remaining.pop()
+                # retry a rejected query until it is admitted
+                while True:
+                    started = time.perf_counter()
+                    response = await http.post("/query", json={"query": "benchmark query"})
+                    codes[response.status_code] = codes.get(response.status_code, 0) + 1
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - started)
+                        break
+                    # back off as Retry-After asks, scaled down for the benchmark
+                    await asyncio.sleep(FAKE_LLM_LATENCY)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(SERVICE_CLIENTS)))
+        elapsed = time.perf_counter() - started
+        stats = (await http.get("/stats")).json()
+    await service.aclose()
+
+    latencies.sort()
+    print(f"agent service: status codes {codes}, queue wait p99 {stats['queue_wait']['p99_s']}s",
+          file=sys.stderr)
+    results.add("service.qps", codes.get(200, 0) / elapsed, "qps", "higher")
+    results.add("service.latency_p50", latencies[len(latencies) // 2])
+    results.add("service.latency_p99", latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))])
+    results.add("service.rejections_per_query", codes.get(429, 0) / SERVICE_REQUESTS, "ratio")
+
+
+async def bench_sandbox(results: Results) -> None:
+    """
+    Round trip of a trivial call through the sandbox process pool, and how long
+    a runaway CPU-bound call takes to be killed while the event loop keeps
+    ticking (the largest tick delay is the loop's responsiveness).
+    """
+    print(f"sandbox ({SANDBOX_CPU_SECONDS}s CPU limit):", file=sys.stderr)
+    # workers (also the replacements) unpickle sandbox._worker_main, so the
+    # module must stay importable by its own name
+    sys.path.insert(0, str(LAB02_DIR))
+    sys.modules.pop("sandbox", None)
+    try:
+        sandbox_module = importlib.import_module("sandbox")
+        sandbox = sandbox_module.ProcessSandbox(workers=2, cpu_seconds=SANDBOX_CPU_SECONDS, timeout=10)
+        await sandbox.start()
+        results.add("sandbox.call", await atimeit(lambda: sandbox.run(spin, 0.0), repeat=200))
+
+        lags: List[float] = []
+
+        async def ticker() -> None:
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - started - 0.005)
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        try:
+            await sandbox.run(spin)
+        except sandbox_module.SandboxError as ex:
+            print(f"sandbox: runaway call ended with {ex.kind}", file=sys.stderr)
+        results.add("sandbox.cpu_limit_kill", time.perf_counter() - started)
+        ticking.cancel()
+        results.add("sandbox.loop_lag_max", max(lags))
+        # the replacement worker answers
+        await sandbox.run(spin, 0.0)
+        await sandbox.aclose()
+    finally:
+        sys.path.remove(str(LAB02_DIR))
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Returns the metrics that regressed by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, metric in current["metrics"].items():
+        old = baseline["metrics"].get(name)
+        if not old or not old["value"]:
+            continue
+        change = (metric["value"] - old["value"]) / old["value"]
+        if metric["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{name}: {old['value']:.6g} -> {metric['value']:.6g} ({change:+.0%})")
+    return regressions
+
+
+async def run_all() -> Dict[str, Any]:
+    results = Results()
+    lab01 = load_lab_module(LAB01_DIR, "agents.py", "lab01_agents")
+    lab01_memo = load_lab_module(LAB01_DIR, "memo.py", "lab01_memo")
+    lab01_weather = load_lab_module(LAB01_DIR, "weather.py", "lab01_weather")
+    lab01_history = load_lab_module(LAB01_DIR, "history.py", "lab01_history")
+    lab01_observations = load_lab_module(LAB01_DIR, "observations.py", "lab01_observations")
+    lab02 = load_lab_module(LAB02_DIR, "react-mcp-client.py", "lab02_agent")
+    lab02_service = load_lab_module(LAB02_DIR, "agent_service.py", "lab02_service")
+
+    await bench_step_overhead(results, lab01)
+    await bench_scaling(results, "lab01", lambda size, **s: lab01_agent(lab01, size, **s))
+    await bench_scaling(results, "lab02", lambda size, **s: lab02_agent(lab02, size, **s))
+    await bench_concurrency(results, "lab01", lambda size, **s: lab01_agent(lab01, size, **s))
+    await bench_concurrency(results, "lab02", lambda size, **s: lab02_agent(lab02, size, **s))
+    await bench_token_refresh(results, sys.modules["llm"])
+    await bench_tool_memo(results, lab01, lab01_memo)
+    bench_weather_output(results, lab01_weather, lab01_history)
+    await bench_observation_store(results, lab01, lab01_observations)
+    await bench_service(results, lab02, lab02_service)
+    await bench_sandbox(results)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "metrics": results.metrics,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline ReAct agent benchmarks")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="where to write this run's results")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    # the agents print every response; keep that out of the measurements' output
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = asyncio.run(run_all())
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"results written to {args.output}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"baseline written to {args.baseline}")
+
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"no baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
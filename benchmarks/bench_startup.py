@@ -0,0 +1,122 @@
+"""
+Startup benchmark for the agent entry points.
+
+For each agent it measures, in fresh interpreters:
+
+- import time of the module (from `python -X importtime`), with the
+  heaviest top-level imports listed;
+- wall time of `python <script> --help`, i.e. CLI startup.
+
+Medians are compared against the budgets in startup_budget.json:
+
+    python benchmarks/bench_startup.py            # measure and check the budget
+    python benchmarks/bench_startup.py --top 10   # show more import offenders
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+BUDGET_PATH = BENCH_DIR / "startup_budget.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "startup.json"
+
+# name -> (lab folder, module, script)
+TARGETS = {
+    "lab01_basic": (REPO_ROOT / "Lab01_ReActAgent" / "1-basic-react", "agents", None),
+    "lab01_function_calling": (
+        REPO_ROOT / "Lab01_ReActAgent" / "2-react-with-function-calling", "agents", "agents.py"
+    ),
+    "lab02_react_mcp": (
+        REPO_ROOT / "Lab02_MCP" / "3-react-with-mcp", "react-mcp-client", "react-mcp-client.py"
+    ),
+}
+
+
+def measure_import(lab_dir: Path, module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+    Tuple[float, List[Tuple[str, float]]]: The module's cumulative import time
+        in ms and the cumulative times of its direct imports.
+    """
+    # __import__ (unlike importlib.import_module) is reported by -X importtime
+    code = f"__import__({module!r})"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=lab_dir, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    children: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        # "| " then two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        ms = int(cumulative) / 1000
+        if name == module and depth == 0:
+            total = ms
+        elif depth == 1:
+            children.append((name, ms))
+    return total, sorted(children, key=lambda c: -c[1])
+
+
+def measure_cli(lab_dir: Path, script: str) -> float:
+    """Wall time in ms of `python <script> --help`."""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, script, "--help"], cwd=lab_dir, capture_output=True, check=True
+    )
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (median is kept)")
+    parser.add_argument("--top", type=int, default=5, help="heaviest direct imports to show")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    budgets: Dict[str, float] = json.loads(BUDGET_PATH.read_text()) if BUDGET_PATH.exists() else {}
+    report: Dict[str, Dict[str, float]] = {}
+    over_budget = []
+
+    for name, (lab_dir, module, script) in TARGETS.items():
+        runs = [measure_import(lab_dir, module) for _ in range(args.repeat)]
+        import_ms = statistics.median(total for total, _ in runs)
+        report[f"{name}.import_ms"] = {"value": import_ms}
+        print(f"{name}: import {import_ms:.0f} ms")
+        for child, ms in runs[-1][1][:args.top]:
+            print(f"    {child:<40}{ms:8.1f} ms")
+
+        if script:
+            cli_ms = statistics.median(measure_cli(lab_dir, script) for _ in range(args.repeat))
+            report[f"{name}.cli_help_ms"] = {"value": cli_ms}
+            print(f"{name}: `{script} --help` {cli_ms:.0f} ms")
+
+    for metric, budget in budgets.items():
+        measured = report.get(metric, {}).get("value")
+        if measured is not None and measured > budget:
+            over_budget.append(f"{metric}: {measured:.0f} ms > budget {budget:.0f} ms")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    for line in over_budget:
+        print(f"OVER BUDGET {line}")
+    if not over_budget:
+        print("within budget")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
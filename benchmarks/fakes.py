@@ -0,0 +1,229 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+def _next_turn(messages: List[Dict[str, Any]]) -> int:
+    # read the step number back from the latest assistant message: counting
+    # assistant messages breaks once history compaction folds old steps away
+    for message in reversed(messages):
+        if message.get("role") != "assistant":
+            continue
+        try:
+            return json.loads(message.get("content") or "")["step"] + 1
+        except (ValueError, KeyError, TypeError):
+            return sum(1 for m in messages if m.get("role") == "assistant")
+    return 0
+
+
+class ScriptedCompletions:
+    """
+    Stand-in for `client.chat.completions` that answers from a script.
+
+    The reply is chosen from the step number of the latest assistant turn in
+    the conversation, so one fake can serve many concurrent runs: turns before
+    `steps` call `tool_name` `actions_per_step` times, the next turn returns the
+    final answer. Streaming requests yield the same text in small chunks.
+    `max_prompt_chars` records the largest conversation it was sent.
+    """
+
+    def __init__(
+        self,
+        steps: int = 3,
+        tool_name: str = "echo",
+        tool_input: Any = "payload",
+        actions_per_step: int = 1,
+        latency: float = 0.0,
+        chunk_size: int = 16,
+    ) -> None:
+        self.steps = steps
+        self.tool_name = tool_name
+        self.tool_input = tool_input
+        self.actions_per_step = actions_per_step
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.max_prompt_chars = 0
+
+    def step_text(self, turn: int) -> str:
+        if turn >= self.steps:
+            return json.dumps({
+                "step": turn,
+                "thought": "I now know the final answer",
+                "final_answer": f"done after {turn} steps",
+            })
+        return json.dumps({
+            "step": turn,
+            "thought": f"step {turn}: call the tool",
+            "action": [
+                {"tool_choice": self.tool_name, "tool_input": self.tool_input}
+                for _ in range(self.actions_per_step)
+            ],
+            "pause": "check the observation",
+        })
+
+    async def create(self, messages: List[Dict[str, Any]], stream: bool = False, **params: Any) -> Any:
+        self.calls += 1
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        self.max_prompt_chars = max(self.max_prompt_chars, prompt_chars)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        turn = _next_turn(messages)
+        # the agent forces a final answer once it runs out of steps or time
+        forced = "Do not call any more tools" in (messages[-1].get("content") or "")
+        text = self.step_text(self.steps if forced else turn)
+        usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        if not stream:
+            message = SimpleNamespace(content=text, tool_calls=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+        async def chunks():
+            for i in range(0, len(text), self.chunk_size):
+                delta = SimpleNamespace(content=text[i:i + self.chunk_size])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        return chunks()
+
+
+class FakeChatClient:
+    """Minimal AsyncAzureOpenAI look-alike exposing `chat.completions.create`."""
+
+    def __init__(self, **script: Any) -> None:
+        self.chat = SimpleNamespace(completions=ScriptedCompletions(**script))
+
+
+def make_echo_tool(observation_size: int, latency: float = 0.0):
+    """
+    Returns a local tool producing an observation of `observation_size`
+    characters, sleeping `latency` seconds per call.
+    """
+    observation = "x" * observation_size
+
+    def echo(payload: str) -> str:
+        """
+        Returns a fixed-size observation.
+
+        Parameters:
+        payload (str): Ignored input.
+        """
+        if latency:
+            time.sleep(latency)
+        return observation
+
+    return echo
+
+
+class FakeMCPSession:
+    """Stand-in for an MCP `ClientSession` whose tools return fixed-size text."""
+
+    def __init__(self, observation_size: int, latency: float = 0.0) -> None:
+        self.observation = "x" * observation_size
+        self.latency = latency
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.observation)], isError=False)
+
+
+class FakeMCPPool:
+    """Stand-in for `MCPSessionPool` leasing a single `FakeMCPSession`."""
+
+    def __init__(self, observation_size: int, latency: float = 0.0) -> None:
+        self.session = FakeMCPSession(observation_size, latency)
+        self.tools = [SimpleNamespace(name="echo", description="Returns a fixed-size observation.")]
+        self.tools_description = 'echo: "Returns a fixed-size observation."'
+        self.manifest_version = 1
+
+    async def start(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self.session
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class FakeCredential:
+    """
+    Stand-in for an azure-identity credential: every `get_token` call sleeps
+    `latency` seconds and returns a token valid for `lifetime` seconds.
+    """
+
+    def __init__(self, lifetime: float = 3600.0, latency: float = 0.0) -> None:
+        self.lifetime = lifetime
+        self.latency = latency
+        self.calls = 0
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(token=f"fake-token-{self.calls}", expires_on=time.time() + self.lifetime)
+
+
+def spin(seconds: Optional[float] = None) -> int:
+    """A CPU-bound sandbox test tool: busy-loops for `seconds` (forever by default)."""
+    stop = time.process_time() + seconds if seconds is not None else None
+    count = 0
+    while stop is None or time.process_time() < stop:
+        count += 1
+    return count
+
+
+def make_weather_payload(days: int = 3, hours: int = 8) -> Dict[str, Any]:
+    """
+    A wttr.in `format=j1` payload with the shape and field set of a real one
+    (every number as a string, texts as [{"value": ...}]), for `days` days of
+    `hours` forecast slots each.
+    """
+    def text(value: str) -> List[Dict[str, str]]:
+        return [{"value": value}]
+
+    def conditions(hour: int) -> Dict[str, Any]:
+        return {
+            "FeelsLikeC": str(14 + hour % 5), "FeelsLikeF": str(57 + hour % 5), "cloudcover": "75",
+            "humidity": "81", "precipInches": "0.0", "precipMM": "0.1", "pressure": "1012",
+            "pressureInches": "30", "uvIndex": "3", "visibility": "10", "visibilityMiles": "6", "weatherCode": "116",
+            "weatherDesc": text("Partly cloudy"),
+            "weatherIconUrl": text("https://cdn.worldweatheronline.com/images/wsymbols01_png_64/wsymbol_0002.png"),
+            "winddir16Point": "WSW", "winddirDegree": "247", "windspeedKmph": "17", "windspeedMiles": "11",
+        }
+
+    hourly = []
+    for slot in range(hours):
+        hour = dict(conditions(slot), time=str(slot * 2400 // hours), tempC=str(15 + slot % 5),
+                    tempF=str(59 + slot % 5), DewPointC="11", DewPointF="52",
+                    HeatIndexC="16", HeatIndexF="61", WindChillC="14", WindChillF="57",
+                    WindGustKmph="25", WindGustMiles="16", diffRad="52.3", shortRad="181.9")
+        for chance in ("fog", "frost", "highTemp", "overcast", "rain", "remdry", "snow", "sunshine", "thunder", "windy"):
+            hour[f"chanceof{chance}"] = str((slot * 13 + len(chance) * 7) % 100)
+        hourly.append(hour)
+    return {
+        "current_condition": [dict(conditions(0), temp_C="15", temp_F="59", localObsDateTime="2026-10-17 09:12 AM",
+                                   observation_time="07:12 AM", lang_de=text("Teilweise bewölkt"))],
+        "nearest_area": [{
+            "areaName": text("Seattle"), "country": text("United States of America"), "region": text("Washington"),
+            "latitude": "47.606", "longitude": "-122.332", "population": "608660",
+            "weatherUrl": text("https://www.worldweatheronline.com/v2/weather.aspx?q=47.6062,-122.3321"),
+        }],
+        "request": [{"query": "Lat 47.61 and Lon -122.33", "type": "LatLon"}],
+        "weather": [
+            {
+                "date": f"2026-10-{17 + day:02d}", "avgtempC": "15", "avgtempF": "59",
+                "maxtempC": str(18 + day), "maxtempF": str(64 + day), "mintempC": str(10 + day),
+                "mintempF": str(50 + day), "sunHour": "6.5", "totalSnow_cm": "0.0", "uvIndex": "3",
+                "astronomy": [{
+                    "moon_illumination": "41", "moon_phase": "Waxing Crescent", "moonrise": "01:12 PM",
+                    "moonset": "10:40 PM", "sunrise": "07:28 AM", "sunset": "06:20 PM",
+                }],
+                "hourly": hourly,
+            }
+            for day in range(days)
+        ],
+    }
@@ -0,0 +1,68 @@
+"""
+Shared fixtures for the lab tests.
+
+The labs are flat script folders that reuse module names (memo, history,
+sandbox, ...), so a test imports lab modules through the `lab01`/`lab02`
+fixtures: they put the lab's folder on sys.path and drop the other lab's
+modules first, like benchmarks/bench_react.py does. The scripted fakes of
+the benchmarks (fake LLM, fake MCP pool, ...) are importable as `fakes`.
+"""
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LAB01_DIR = REPO_ROOT / "Lab01_ReActAgent" / "2-react-with-function-calling"
+LAB02_DIR = REPO_ROOT / "Lab02_MCP" / "3-react-with-mcp"
+BENCH_DIR = REPO_ROOT / "benchmarks"
+
+if str(BENCH_DIR) not in sys.path:
+    sys.path.insert(0, str(BENCH_DIR))
+
+
+class Lab:
+    """Imports the modules of one lab folder by name (or a script by file name)."""
+
+    def __init__(self, lab_dir: Path) -> None:
+        self.lab_dir = lab_dir
+
+    def _activate(self) -> None:
+        for mod_name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if not path:
+                continue
+            folder = Path(path).resolve().parent
+            if folder != self.lab_dir and folder.parent.parent == REPO_ROOT and folder.parent.name.startswith("Lab"):
+                del sys.modules[mod_name]
+        for other in (LAB01_DIR, LAB02_DIR):
+            if other != self.lab_dir and str(other) in sys.path:
+                sys.path.remove(str(other))
+        if str(self.lab_dir) not in sys.path:
+            # stays on sys.path: lab code imports some of its modules lazily
+            sys.path.insert(0, str(self.lab_dir))
+
+    def __call__(self, name: str) -> Any:
+        self._activate()
+        return importlib.import_module(name)
+
+    def script(self, filename: str, name: str) -> Any:
+        """Loads a script whose file name is not importable (e.g. react-mcp-client.py)."""
+        self._activate()
+        spec = importlib.util.spec_from_file_location(name, self.lab_dir / filename)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+
+@pytest.fixture(scope="module")
+def lab01() -> Lab:
+    return Lab(LAB01_DIR)
+
+
+@pytest.fixture(scope="module")
+def lab02() -> Lab:
+    return Lab(LAB02_DIR)
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import json
+
+import pytest
+
+
+class EchoAgent:
+    """Answers every query with its own text."""
+
+    async def run(self, query):
+        return f"answer to {query}"
+
+
+@pytest.fixture(scope="module")
+def batch(lab01):
+    return lab01("batch")
+
+
+def test_bad_lines_become_error_rows(batch, tmp_path):
+    input_path = tmp_path / "queries.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text("\n".join([
+        '{"id": "a", "query": "first"}',
+        '{"query": "truncated',
+        '{"id": "b", "question": "wrong field"}',
+        '"bare string"',
+        "42",
+        '{"query": "last"}',
+    ]) + "\n", encoding="utf-8")
+
+    summary = asyncio.run(batch.run_batch(EchoAgent(), str(input_path), str(output_path), concurrency=2))
+
+    rows = {row["id"]: row for row in map(json.loads, output_path.read_text(encoding="utf-8").splitlines())}
+    assert summary["queries"] == 3
+    assert summary["errors"] == 3
+    assert rows["a"]["answer"] == "answer to first"
+    assert rows[4]["answer"] == "answer to bare string"
+    assert rows[6]["answer"] == "answer to last"
+    assert rows[2]["error"].startswith("line 2: invalid JSON")
+    assert rows["b"]["error"] == "line 3: no 'query' string in the record"
+    assert rows[5]["error"].startswith("line 5:")
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_concurrency_below_one_is_rejected(batch, tmp_path, concurrency):
+    input_path = tmp_path / "queries.jsonl"
+    input_path.write_text('{"query": "q"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="at least 1"):
+        asyncio.run(batch.run_batch(EchoAgent(), str(input_path), str(tmp_path / "out.jsonl"), concurrency))
+
+
+def test_concurrency_option_type(batch):
+    assert batch.positive_int("4") == 4
+    for value in ("0", "-2", "many"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            batch.positive_int(value)
@@ -0,0 +1,49 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def calculator_entry(lab01):
+    toolbox = lab01("toolbox").ToolBox()
+    toolbox.store([lab01("tools").Tools])
+    return toolbox.get("basic_calculator")
+
+
+def run(entry, tool_input):
+    args, kwargs = entry.bind(tool_input)
+    return entry.func(*args, **kwargs)
+
+
+def test_dict_input_binds_and_evaluates(calculator_entry):
+    assert "8" in run(calculator_entry, {"num1": 5, "num2": 3, "operation": "add"})
+
+
+def test_list_and_string_inputs(calculator_entry):
+    assert "r1 = 9" in run(calculator_entry, ["1 + 2", "r0 * 3"])
+    assert "1024" in run(calculator_entry, '{"num1": 2, "num2": 10, "operation": "power"}')
+
+
+def test_schema_accepts_each_input_form(calculator_entry):
+    schema = calculator_entry.schema["function"]["parameters"]["properties"]["input_str"]
+    assert [option["type"] for option in schema["anyOf"]] == ["string", "object", "array"]
+    with pytest.raises(ValueError):
+        calculator_entry.bind(5)
+
+
+def test_list_results_cannot_be_repeated(lab01):
+    calculate = lab01("calculator").calculate
+    output = calculate([{"num1": [1, 2, 3], "num2": 2, "operation": "multiply"}, "r0 * 100000000", "-r0"])
+    assert "r0 = [2, 4, 6]" in output
+    assert "r1: error: expected a number, got list" in output
+    assert "r2: error: expected a number, got list" in output
+
+
+def test_element_wise_operands_must_be_flat_numbers(lab01):
+    output = lab01("calculator").calculate({"num1": [[1]], "num2": 100000000, "operation": "multiply"})
+    assert "Error: expected a number, got list" in output
+
+
+def test_sequence_results_are_bounded(lab01, monkeypatch):
+    calculator = lab01("calculator")
+    monkeypatch.setattr(calculator, "CALCULATOR_MAX_ARRAY_SIZE", 2)
+    with pytest.raises(calculator.CalculatorError):
+        calculator._check_result([1, 2, 3])
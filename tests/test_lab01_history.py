@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def history(lab01):
+    return lab01("history")
+
+
+def make_history(history, **options):
+    formatter = lambda records: "\n".join(json.dumps(r) for r in records)
+    return history.HistoryManager(
+        {"role": "system", "content": "system"}, "query", formatter, counter=len, **options
+    )
+
+
+def add(manager, size):
+    manager.add_step("step", [{"action": {"tool": "t"}, "observation": "x" * size}])
+
+
+def test_no_compaction_is_recorded_when_nothing_can_be_removed(history):
+    manager = make_history(history, token_budget=500, keep_recent_steps=2)
+    add(manager, 400)
+    add(manager, 400)
+    messages = manager.messages
+    assert manager.stats()["compactions"] == 0
+    add(manager, 400)
+    assert manager.stats()["compactions"] == 1
+    assert manager.messages is not messages
+
+
+
+
+def test_long_runs_stay_under_the_budget(history):
+    manager = make_history(history, token_budget=3000, keep_recent_steps=2, preview_chars=40)
+    for step in range(300):
+        record = {"thought": f"step {step} " + "t" * 150, "action": {"tool": "t", "n": step}, "observation": "x" * 300}
+        manager.add_step(json.dumps(record), [record])
+        assert manager.total_tokens <= manager.token_budget
+        assert manager.total_tokens == sum(manager._message_tokens(m) for m in manager.messages)
+    # the oldest folded steps are only counted, the latest steps stay verbatim
+    assert manager.messages[2]["content"].startswith("Summary of earlier steps:\n- (")
+    assert '"n": 299' in manager.messages[-2]["content"]
@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def memo(lab01):
+    return lab01("memo")
+
+
+@pytest.fixture
+def clock(memo, monkeypatch):
+    """A settable clock for the memo's expiry checks (asyncio keeps the real one)."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(memo, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def make_tool():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return f"result {len(calls)}"
+
+    return compute, calls
+
+
+def test_ttl_entries_expire(memo, clock):
+    tool_memo = memo.ToolMemo()
+    policy = memo.MemoPolicy(ttl=10)
+    compute, calls = make_tool()
+
+    async def call():
+        return await tool_memo.call("get_weather", {"location": "Paris"}, policy, compute)
+
+    assert asyncio.run(call()) == "result 1"
+    clock.value += 9
+    assert asyncio.run(call()) == "result 1"
+    clock.value += 1
+    assert asyncio.run(call()) == "result 2"
+    assert len(calls) == 2
+    stats = tool_memo.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 2, 1)
+
+
+def test_pure_entries_do_not_expire(memo, clock):
+    tool_memo = memo.ToolMemo()
+    compute, calls = make_tool()
+
+    async def call():
+        return await tool_memo.call("basic_calculator", "1 + 2", memo.MemoPolicy(pure=True), compute)
+
+    asyncio.run(call())
+    clock.value += 10 ** 6
+    asyncio.run(call())
+    assert len(calls) == 1
+
+
+def test_first_caller_cancelled_does_not_cancel_the_shared_call(memo):
+    async def main():
+        tool_memo = memo.ToolMemo()
+        policy = memo.MemoPolicy(pure=True)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "result"
+
+        first = asyncio.ensure_future(tool_memo.call("slow", "x", policy, compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(tool_memo.call("slow", "x", policy, compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        value = await second
+        # the result was stored although its first caller went away
+        again = await tool_memo.call("slow", "x", policy, compute)
+        return first.cancelled(), value, again, len(calls)
+
+    assert asyncio.run(main()) == (True, "result", "result", 1)
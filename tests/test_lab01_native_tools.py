@@ -0,0 +1,130 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def agents(lab01):
+    return lab01("agents")
+
+
+def add(a: int, b: int) -> str:
+    """
+    Adds two integers.
+
+    Parameters:
+    a (int): The first number.
+    b (int): The second number.
+
+    Returns:
+    str: The sum.
+    """
+    CALLS.append(("add", a, b))
+    return f"{a} + {b} = {a + b}"
+
+
+def shout(text: str) -> str:
+    """
+    Upper-cases a text.
+
+    Parameters:
+    text (str): The text.
+
+    Returns:
+    str: The text in upper case.
+    """
+    CALLS.append(("shout", text))
+    return text.upper()
+
+
+CALLS = []
+
+
+def tool_call(call_id, name, arguments):
+    return SimpleNamespace(id=call_id, type="function", function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class NativeCompletions:
+    """
+    Stand-in for `client.chat.completions` in native mode: the first request
+    gets `tool_calls`, the next one a plain-text answer. Records every request.
+    """
+
+    def __init__(self, tool_calls):
+        self.tool_calls = tool_calls
+        self.requests = []
+
+    async def create(self, messages, tools=None, **params):
+        self.requests.append({"messages": [dict(m) for m in messages], "tools": tools})
+        if len(self.requests) == 1:
+            message = SimpleNamespace(content=None, tool_calls=self.tool_calls)
+        else:
+            message = SimpleNamespace(content="all done", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def run_native(agents, tool_calls):
+    toolbox = agents.ToolBox()
+    toolbox.store([add, shout])
+    completions = NativeCompletions(tool_calls)
+    agent = agents.ReActAgent(
+        client=SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+        toolbox=toolbox, native_tools=True, tool_memo=None,
+    )
+    CALLS.clear()
+    result = asyncio.run(agent.execute("query"))
+    return result, completions
+
+
+def test_default_tool_schemas(agents):
+    schemas = {s["function"]["name"]: s["function"]["parameters"] for s in agents.get_default_toolbox().tool_schemas()}
+    calculator = schemas["basic_calculator"]["properties"]["input_str"]
+    assert [option["type"] for option in calculator["anyOf"]] == ["string", "object", "array"]
+    weather = schemas["get_weather"]
+    assert weather["properties"]["days"]["type"] == "integer"
+    assert weather["properties"]["full"]["type"] == "boolean"
+    assert weather["required"] == ["location"]
+    read = schemas["read_observation"]
+    assert read["properties"]["handle"]["type"] == "string"
+    assert read["properties"]["start"]["type"] == "integer"
+    assert read["required"] == ["handle"]
+
+
+def test_parallel_calls_are_answered_in_order_by_tool_call_id(agents):
+    result, completions = run_native(agents, [
+        tool_call("call_b", "shout", '{"text": "hi"}'),
+        tool_call("call_a", "add", '{"a": 2, "b": 3}'),
+    ])
+    assert result.answer == "all done" and result.status == "answered"
+    assert {name for name, *_ in CALLS} == {"shout", "add"}
+    assert [t["function"]["name"] for t in completions.requests[0]["tools"]][:2] == ["add", "shout"]
+
+    messages = completions.requests[1]["messages"]
+    assistant = messages[-3]
+    assert assistant["role"] == "assistant"
+    assert [c["id"] for c in assistant["tool_calls"]] == ["call_b", "call_a"]
+    assert json.loads(assistant["tool_calls"][1]["function"]["arguments"]) == {"a": 2, "b": 3}
+    # one tool message per call, right after the assistant message and in its order
+    assert [(m["role"], m["tool_call_id"], m["content"]) for m in messages[-2:]] == [
+        ("tool", "call_b", "HI"),
+        ("tool", "call_a", "2 + 3 = 5"),
+    ]
+
+
+@pytest.mark.parametrize("arguments, error", [
+    ('{"a": "two", "b": 3}', "argument 'a' should be integer, got str"),
+    ('{"a": 2}', "missing"),
+    ('{"a": 2, "b": 3, "c": 4}', "unexpected"),
+    ('{"a": true, "b": 3}', "argument 'a' should be integer"),
+    ('[2, 3]', "expected a JSON object"),
+    ('{"a": 2,', "Invalid tool arguments"),
+])
+def test_bad_arguments_are_rejected_before_the_tool_runs(agents, arguments, error):
+    result, completions = run_native(agents, [tool_call("call_1", "add", arguments)])
+    observation = completions.requests[1]["messages"][-1]
+    assert observation["tool_call_id"] == "call_1"
+    assert observation["content"].startswith("Invalid tool arguments")
+    assert error in observation["content"]
+    assert CALLS == []
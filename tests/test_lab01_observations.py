@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from fakes import make_weather_payload
+
+
+@pytest.fixture(scope="module")
+def observations(lab01):
+    return lab01("observations")
+
+
+@pytest.fixture
+def store(observations):
+    store = observations.ObservationStore(path=None, spill_chars=200, preview_chars=20, read_chars=100)
+    yield store
+    store.close()
+
+
+def test_short_observations_stay_inline(store):
+    assert store.spill("short") == "short"
+    assert store.stats()["entries"] == 0
+
+
+def test_read_by_range_continues_where_the_preview_stopped(store):
+    text = "".join(f"{i:04d}" for i in range(100))
+    preview = store.spill(text)
+    handle = store.handle_of(text)
+    assert preview.startswith(f"[stored as {handle}: 400 chars")
+    assert text[:20] in preview and text[20:40] not in preview
+
+    page = store.read(handle, start=20, length=1000)
+    header, body = page.split("\n", 1)
+    assert body == text[20:120]
+    assert header == f"[{handle}: chars 20-120 of 400, next start 120]"
+    last = store.read(handle, start=390)
+    assert last.endswith("\n" + text[390:]) and "next start" not in last
+
+
+def test_read_by_json_path(store):
+    payload = make_weather_payload()
+    text = json.dumps(payload)
+    store.spill(text)
+    page = store.read(store.handle_of(text), path="weather[0].date")
+    assert page.split("\n", 1)[1] == json.dumps(payload["weather"][0]["date"])
+    with pytest.raises(ValueError, match="has no 'missing'"):
+        store.read(store.handle_of(text), path="missing")
+
+
+def test_repeated_observations_are_stored_once(store):
+    text = "x" * 500
+    store.spill(text)
+    store.spill(text)
+    stats = store.stats()
+    assert (stats["entries"], stats["spilled"], stats["deduplicated"]) == (1, 2, 1)
+
+
+def test_read_tool_reports_unknown_handles(observations, monkeypatch, store):
+    monkeypatch.setattr(observations, "get_observation_store", lambda: store)
+    assert observations.read_observation("obs_0000000000000000").startswith("Unknown handle")
+    store.spill("plain text " * 50)
+    handle = store.handle_of("plain text " * 50)
+    assert "is not JSON" in observations.read_observation(handle, path="key")
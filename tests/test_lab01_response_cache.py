@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from fakes import FakeChatClient, ScriptedCompletions
+
+
+class TruncatedCompletions(ScriptedCompletions):
+    """Replies cut off mid-JSON, like a completion that hit max_tokens."""
+
+    def step_text(self, turn: int) -> str:
+        return super().step_text(turn)[:40]
+
+
+@pytest.fixture(scope="module")
+def agents(lab01):
+    return lab01("agents")
+
+
+@pytest.fixture(scope="module")
+def llm_cache(lab01):
+    return lab01("llm_cache")
+
+
+def make_agent(agents, llm_cache, completions, stream):
+    client = FakeChatClient()
+    client.chat.completions = completions
+    cache = llm_cache.ResponseCache(path=None)
+    return agents.ReActAgent(client=client, response_cache=cache, stream=stream, observation_store=None), cache
+
+
+def ask(agent):
+    messages = [agent.system_message, {"role": "user", "content": "query"}]
+    if agent.stream:
+        return agent._stream_openai_response(messages, [])
+    return agent._get_openai_response(messages)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_unparseable_replies_are_not_cached(agents, llm_cache, stream):
+    completions = TruncatedCompletions()
+    agent, cache = make_agent(agents, llm_cache, completions, stream)
+
+    async def main():
+        await ask(agent)
+        await ask(agent)
+
+    asyncio.run(main())
+    assert completions.calls == 2
+    assert cache.stats()["memory_entries"] == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_complete_steps_are_cached(agents, llm_cache, stream):
+    completions = ScriptedCompletions()
+    agent, cache = make_agent(agents, llm_cache, completions, stream)
+
+    async def main():
+        return await ask(agent), await ask(agent)
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert completions.calls == 1
+
+
+def test_is_complete_step(llm_cache):
+    assert llm_cache.is_complete_step('{"final_answer": "42"}')
+    assert llm_cache.is_complete_step('{"thought": "t", "action": []}')
+    assert not llm_cache.is_complete_step('{"thought": "t", "act')
+    assert not llm_cache.is_complete_step('"final_answer"')
+    assert not llm_cache.is_complete_step("")
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from fakes import spin
+
+
+@pytest.fixture(scope="module")
+def sandbox(lab01):
+    return lab01("sandbox")
+
+
+def run_twice(sandbox_module, **options):
+    """Runs a runaway call, then a short one on the same one-worker sandbox."""
+
+    async def main():
+        box = sandbox_module.ProcessSandbox(workers=1, memory_mb=0, **options)
+        try:
+            with pytest.raises(sandbox_module.SandboxError) as failure:
+                await box.run(spin)
+            # the replacement worker serves the next call
+            count = await box.run(spin, 0.01)
+            return failure.value, count, box.stats()
+        finally:
+            await box.aclose()
+
+    return asyncio.run(main())
+
+
+def test_wall_clock_timeout_replaces_the_worker(sandbox):
+    error, count, stats = run_twice(sandbox, cpu_seconds=0, timeout=0.5)
+    assert error.kind == sandbox.TIMEOUT
+    assert count > 0
+    assert stats["timeouts"] == 1
+    assert stats["replaced"] == 1
+    assert stats["workers"] == 1
+
+
+def test_cpu_limit_replaces_the_worker(sandbox):
+    if sandbox.resource is None:
+        pytest.skip("RLIMIT_CPU needs the resource module")
+    error, count, stats = run_twice(sandbox, cpu_seconds=1, timeout=10)
+    assert error.kind == sandbox.CPU_LIMIT
+    assert count > 0
+    assert stats["cpu_limits"] == 1
+    assert stats["replaced"] == 1
+    assert stats["workers"] == 1
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from fakes import FakeChatClient, ScriptedCompletions
+
+
+@pytest.fixture(scope="module")
+def streaming(lab01):
+    return lab01("streaming")
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_first_action_completes_before_the_stream_ends(streaming):
+    step = {
+        "thought": "look both up",
+        "action": [
+            {"tool_choice": "get_weather", "tool_input": "Paris"},
+            {"tool_choice": "get_weather", "tool_input": "Rome"},
+        ],
+        "pause": "compare them",
+    }
+    parser = streaming.StepStreamParser()
+    emitted = []
+    for index, chunk in enumerate(chunks(json.dumps(step), 8)):
+        emitted.extend((index, action) for action in parser.feed(chunk))
+    first_index, first = emitted[0]
+    assert first == step["action"][0]
+    # the first call could start while the second action was still being generated
+    assert json.dumps(step["action"][1]) not in parser.text[:(first_index + 1) * 8]
+    assert [action for _, action in emitted] == step["action"]
+
+
+def test_single_action_object(streaming):
+    step = '{"thought": "t", "action": {"tool_choice": "basic_calculator", "tool_input": {"num1": 1, "num2": [2, 3]}}}'
+    parser = streaming.StepStreamParser()
+    emitted = [action for chunk in chunks(step, 5) for action in parser.feed(chunk)]
+    assert emitted == [json.loads(step)["action"]]
+
+
+def test_braces_and_brackets_inside_strings_are_ignored(streaming):
+    step = {"thought": "a { tricky [ one", "action": [{"tool_choice": "echo", "tool_input": "}]\"{"}]}
+    parser = streaming.StepStreamParser()
+    emitted = [action for chunk in chunks(json.dumps(step), 3) for action in parser.feed(chunk)]
+    assert emitted == step["action"]
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_final_answer_decodes_escapes_and_unicode(streaming, ensure_ascii):
+    answer = 'Line 1\nTab\there "quoted" \\ back, café — ☃ 🌧 done'
+    text = json.dumps({"thought": "done", "final_answer": answer}, ensure_ascii=ensure_ascii)
+    parser = streaming.StepStreamParser()
+    streamed = ""
+    # one character at a time splits every escape sequence somewhere
+    for chunk in chunks(text, 1):
+        assert parser.feed(chunk) == []
+        streamed += parser.answer_delta()
+    assert streamed == answer
+
+
+class DuplicateActionCompletions(ScriptedCompletions):
+    """
+    Streams a step with two "action" keys: the parser starts the first list's
+    call, but json.loads keeps only the last list.
+    """
+
+    def step_text(self, turn):
+        return (
+            '{"thought": "t", "action": [{"tool_choice": "echo", "tool_input": "early"}], '
+            '"action": [{"tool_choice": "echo", "tool_input": "final"}]}'
+        )
+
+
+def test_mismatched_final_step_cancels_the_started_calls(lab01):
+    agents = lab01("agents")
+    client = FakeChatClient()
+    client.chat.completions = DuplicateActionCompletions(chunk_size=8)
+    agent = agents.ReActAgent(client=client, stream=True, response_cache=None)
+
+    async def execute_action(act):
+        await asyncio.sleep(0.2)
+        return f"observed {act['tool_input']}"
+
+    agent._execute_action = execute_action
+
+    async def main():
+        dispatched = []
+        text = await agent._stream_openai_response([agent.system_message], dispatched)
+        early = list(dispatched)
+        results = await agent._gather_actions(json.loads(text)["action"], dispatched)
+        return early, results
+
+    early, results = asyncio.run(main())
+    assert [act["tool_input"] for act, _ in early] == ["early", "final"]
+    assert results == ["observed final"]
+    # every call started while streaming was cancelled, and the step's action ran anew
+    assert all(task.cancelled() for _, task in early)
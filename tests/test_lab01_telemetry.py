@@ -0,0 +1,36 @@
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def telemetry(lab01):
+    return lab01("telemetry")
+
+
+def test_opentelemetry_is_not_imported_with_the_module(telemetry):
+    assert not hasattr(telemetry, "otel_trace")
+
+
+def test_otel_sink_with_a_tracer(telemetry):
+    class Tracer:
+        def __init__(self):
+            self.spans = []
+
+        def start_span(self, name, start_time, attributes):
+            self.spans.append((name, attributes))
+            return self
+
+        def end(self, end_time):
+            pass
+
+    tracer = Tracer()
+    sink = telemetry.OpenTelemetrySink(tracer)
+    sink.emit({"event": "llm_call", "time": 1.0, "duration_ms": 5.0, "step": 2, "nested": {}})
+    assert tracer.spans == [("llm_call", {"react.duration_ms": 5.0, "react.step": 2})]
+
+
+def test_otel_sink_without_the_package(telemetry, monkeypatch):
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)
+    with pytest.raises(RuntimeError, match="opentelemetry-api"):
+        telemetry.OpenTelemetrySink()
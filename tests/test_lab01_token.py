@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from fakes import FakeCredential
+
+
+@pytest.fixture(scope="module")
+def llm(lab01):
+    return lab01("llm")
+
+
+def lookups(manager, seconds):
+    """Looks the token up every 10 ms for `seconds`, then stops the manager."""
+
+    async def main():
+        tokens = set()
+        stop = time.monotonic() + seconds
+        while time.monotonic() < stop:
+            tokens.add(await manager.get_token())
+            await asyncio.sleep(0.01)
+        await manager.aclose()
+        return tokens
+
+    return asyncio.run(main())
+
+
+def test_refreshes_in_the_background_just_before_the_margin(llm):
+    # the refresh point is 0.2 s after each fetch, well under a second
+    credential = FakeCredential(lifetime=1.2, latency=0.02)
+    manager = llm.TokenManager(credential, refresh_margin=1.0, min_validity=0.5)
+    tokens = lookups(manager, 1.5)
+    stats = manager.stats()
+    assert stats["waits"] == 1
+    assert stats["background_refreshes"] >= 3
+    assert len(tokens) == stats["refreshes"]
+
+
+def test_tokens_shorter_than_the_margin_are_refreshed_before_callers_wait(llm):
+    credential = FakeCredential(lifetime=0.6, latency=0.02)
+    manager = llm.TokenManager(credential, refresh_margin=1.0, min_validity=0.2)
+    lookups(manager, 1.5)
+    stats = manager.stats()
+    assert stats["waits"] == 1
+    assert stats["background_refreshes"] >= 2
+
+
+def test_concurrent_first_lookups_share_one_fetch(llm):
+    credential = FakeCredential(latency=0.05)
+    manager = llm.TokenManager(credential)
+
+    async def main():
+        tokens = await asyncio.gather(*(manager.get_token() for _ in range(8)))
+        await manager.aclose()
+        return tokens
+
+    assert set(asyncio.run(main())) == {"fake-token-1"}
+    assert credential.calls == 1
+    assert manager.stats()["coalesced"] >= 7
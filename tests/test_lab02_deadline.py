@@ -0,0 +1,101 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from fakes import FakeChatClient, FakeMCPPool, FakeMCPSession
+
+
+@pytest.fixture(scope="module")
+def client_module(lab02):
+    return lab02.script("react-mcp-client.py", "react_mcp_client")
+
+
+@pytest.fixture(scope="module")
+def mcp_pool(lab02):
+    return lab02("mcp_pool")
+
+
+class SaturatedPool(FakeMCPPool):
+    """A pool whose sessions are all taken: a lease never comes."""
+
+    @asynccontextmanager
+    async def lease(self):
+        await asyncio.Event().wait()
+        yield self.session
+
+
+def fake_pool_class(mcp_pool, spawn_delay=0.0, failures=0):
+    class FakeProcessPool(mcp_pool.MCPSessionPool):
+        """MCPSessionPool whose "processes" are fake sessions kept alive by a task."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, manifest_store=mcp_pool.ManifestStore(None), **kwargs)
+            self.failures = failures
+
+        async def _spawn(self):
+            await asyncio.sleep(spawn_delay)
+            if self.failures:
+                # the first `failures` starts fail, like a server that crashes on startup
+                self.failures -= 1
+                raise RuntimeError("server failed to start")
+            server = mcp_pool.PooledServer()
+            server.session = FakeMCPSession(16)
+            server.task = asyncio.ensure_future(server.stop.wait())
+            self._counters["spawned"] += 1
+            return server
+
+    return FakeProcessPool
+
+
+def test_saturated_pool_ends_the_run_at_the_deadline(client_module):
+    async def main():
+        agent = client_module.ReActAgent(client=FakeChatClient(steps=1), pool=SaturatedPool(16))
+        return await agent.execute("query", deadline=0.2)
+
+    result = asyncio.run(main())
+    assert result.status == client_module.DEADLINE
+    assert result.elapsed_s < 1.0
+
+
+def test_abandoned_acquire_leaves_the_pool_consistent(mcp_pool):
+    async def main():
+        pool = fake_pool_class(mcp_pool)("server.py", min_size=1, max_size=1, max_leases=1, url=None)
+        async with pool.lease():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(pool.lease().__aenter__(), 0.1)
+        assert pool.stats()["active_leases"] == 0
+        async with pool.lease():
+            assert pool.stats()["active_leases"] == 1
+
+    asyncio.run(main())
+
+
+def test_process_started_for_an_abandoned_acquire_joins_the_pool(mcp_pool):
+    async def main():
+        pool = fake_pool_class(mcp_pool, spawn_delay=0.2)("server.py", min_size=0, max_size=2, url=None)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.lease().__aenter__(), 0.05)
+        await asyncio.sleep(0.3)
+        assert pool.stats()["processes"] == 1
+
+    asyncio.run(main())
+
+
+def test_failed_start_wakes_a_caller_waiting_for_its_slot(mcp_pool):
+    async def main():
+        pool = fake_pool_class(mcp_pool, spawn_delay=0.1, failures=1)(
+            "server.py", min_size=0, max_size=1, url=None
+        )
+        first = asyncio.ensure_future(pool.lease().__aenter__())
+        await asyncio.sleep(0.01)
+        # the only slot is taken by the start in flight: this caller waits for it
+        second = asyncio.ensure_future(pool.lease().__aenter__())
+        with pytest.raises(RuntimeError):
+            await first
+        session = await asyncio.wait_for(second, 1.0)
+        return session, pool.stats()
+
+    session, stats = asyncio.run(main())
+    assert session is not None
+    assert stats["processes"] == 1 and stats["waits"] == 1
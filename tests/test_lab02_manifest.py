@@ -0,0 +1,36 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def tool_manifest(lab02):
+    return lab02("tool_manifest")
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "server.py").write_text("from helper import TTL\nimport json\n", encoding="utf-8")
+    (tmp_path / "helper.py").write_text('import os\nTTL = float(os.getenv("HELPER_TTL", "60"))\n', encoding="utf-8")
+    return tmp_path
+
+
+def test_hash_covers_local_imports(tool_manifest, server):
+    before = tool_manifest.content_hash(str(server / "server.py"))
+    (server / "helper.py").write_text('import os\nTTL = float(os.getenv("HELPER_TTL", "120"))\n', encoding="utf-8")
+    assert tool_manifest.content_hash(str(server / "server.py")) != before
+
+
+def test_hash_covers_the_environment_the_modules_read(tool_manifest, server, monkeypatch):
+    monkeypatch.delenv("HELPER_TTL", raising=False)
+    before = tool_manifest.content_hash(str(server / "server.py"))
+    monkeypatch.setenv("UNRELATED_SETTING", "1")
+    assert tool_manifest.content_hash(str(server / "server.py")) == before
+    monkeypatch.setenv("HELPER_TTL", "5")
+    after_env = tool_manifest.content_hash(str(server / "server.py"))
+    assert after_env != before
+    (server / ".env").write_text("HELPER_TTL=30\n", encoding="utf-8")
+    assert tool_manifest.content_hash(str(server / "server.py")) != after_env
+
+
+def test_no_script_no_hash(tool_manifest, tmp_path):
+    assert tool_manifest.content_hash(None) is None
+    assert tool_manifest.content_hash(str(tmp_path / "missing.py")) is None
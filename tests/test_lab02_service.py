@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+
+@pytest.fixture(scope="module")
+def service_module(lab02):
+    return lab02("agent_service")
+
+
+@pytest.fixture(scope="module")
+def deadline_module(lab02):
+    return lab02("deadline")
+
+
+class SlowAgent:
+    """Answers every query after `delay` seconds and records what it was asked."""
+
+    def __init__(self, deadline_module, delay: float) -> None:
+        self.deadline_module = deadline_module
+        self.delay = delay
+        self.calls = []
+
+    async def execute(self, query, deadline=None, max_steps=None):
+        self.calls.append((query, deadline, max_steps))
+        await asyncio.sleep(self.delay)
+        return self.deadline_module.AgentResult("answer", self.deadline_module.ANSWERED, 1, self.delay)
+
+    async def aclose(self):
+        pass
+
+
+def serve(service_module, deadline_module, delay=0.0, **options):
+    agents = []
+
+    def make_agent():
+        agents.append(SlowAgent(deadline_module, delay))
+        return agents[-1]
+
+    service = service_module.AgentService(make_agent, **options)
+    transport = httpx.ASGITransport(app=service_module.create_app(service))
+    return service, agents, httpx.AsyncClient(transport=transport, base_url="http://service")
+
+
+def test_full_queue_is_answered_with_429(service_module, deadline_module):
+    async def main():
+        service, _, client = serve(service_module, deadline_module, delay=0.3, workers=1, queue_size=1)
+        await service.start()
+        try:
+            running = asyncio.ensure_future(client.post("/query", json={"query": "running"}))
+            await asyncio.sleep(0.05)
+            # one query fits in the queue behind the running one, the next does not
+            responses = [running] + await asyncio.gather(
+                *(client.post("/query", json={"query": f"queued {i}"}) for i in range(2))
+            )
+            responses[0] = await running
+        finally:
+            await service.aclose()
+        return sorted(response.status_code for response in responses), responses
+
+    codes, responses = asyncio.run(main())
+    assert codes == [200, 200, 429]
+    assert all(r.headers.get("Retry-After") == "1" for r in responses if r.status_code == 429)
+
+
+def test_queue_wait_is_bounded_by_max_queue_wait(service_module, deadline_module):
+    async def main():
+        service, agents, client = serve(
+            service_module, deadline_module, delay=1.0, workers=1, queue_size=4, max_queue_wait=0.2
+        )
+        await service.start()
+        try:
+            running = asyncio.ensure_future(client.post("/query", json={"query": "first"}))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            queued = await client.post("/query", json={"query": "second"})
+            waited = time.monotonic() - started
+            await running
+            # the timed-out query is skipped, not run after its caller left
+            await asyncio.sleep(0.05)
+            asked = [call[0] for call in agents[0].calls]
+        finally:
+            await service.aclose()
+        return queued, waited, asked, service.stats()
+
+    queued, waited, asked, stats = asyncio.run(main())
+    assert queued.status_code == 503
+    assert waited < 0.6
+    assert asked == ["first"]
+    assert stats["counters"]["queue_timeouts"] == 1
+
+
+@pytest.mark.parametrize("body", [
+    {"query": "q", "deadline": 0},
+    {"query": "q", "deadline": -1},
+    {"query": "q", "deadline": True},
+    {"query": "q", "max_steps": 0},
+    {"query": "q", "max_steps": False},
+    {"query": "q", "max_steps": 2.5},
+])
+def test_invalid_limits_are_rejected(service_module, deadline_module, body):
+    async def main():
+        service, agents, client = serve(service_module, deadline_module, workers=1)
+        await service.start()
+        try:
+            return await client.post("/query", json=body), agents[0].calls
+        finally:
+            await service.aclose()
+
+    response, calls = asyncio.run(main())
+    assert response.status_code == 400
+    assert calls == []
+
+
+def test_limits_are_clamped_to_the_service(service_module, deadline_module):
+    async def main():
+        service, agents, client = serve(service_module, deadline_module, workers=1, deadline=30.0, max_steps=8)
+        await service.start()
+        try:
+            await client.post("/query", json={"query": "big", "deadline": 1e9, "max_steps": 1000})
+            await client.post("/query", json={"query": "small", "deadline": 5, "max_steps": 2})
+            await client.post("/query", json={"query": "default"})
+            return agents[0].calls
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(main()) == [("big", 30.0, 8), ("small", 5, 2), ("default", None, None)]
@@ -0,0 +1,53 @@
+import asyncio
+import gc
+
+import pytest
+from mcp import types
+
+from fakes import FakeChatClient, FakeMCPPool, FakeMCPSession
+
+
+@pytest.fixture(scope="module")
+def client_module(lab02):
+    return lab02.script("react-mcp-client.py", "react_mcp_client")
+
+
+@pytest.fixture(scope="module")
+def mcp_pool(lab02):
+    return lab02("mcp_pool")
+
+
+def test_run_session_is_reset_after_the_run(client_module):
+    async def main():
+        agent = client_module.ReActAgent(client=FakeChatClient(steps=2), pool=FakeMCPPool(16))
+        result = await agent.execute("query")
+        return result, client_module._run_session.get()
+
+    result, leftover = asyncio.run(main())
+    assert result.status == client_module.ANSWERED
+    assert leftover is None
+
+
+def test_manifest_reload_task_is_held_until_done(mcp_pool):
+    async def main():
+        pool = mcp_pool.MCPSessionPool("server.py", url=None, manifest_store=mcp_pool.ManifestStore(None))
+        reloaded = asyncio.Event()
+
+        async def load_manifest(session, server_info):
+            await asyncio.sleep(0.05)
+            gc.collect()
+            reloaded.set()
+
+        pool._load_manifest = load_manifest
+        server = mcp_pool.PooledServer()
+        server.session = FakeMCPSession(16)
+        notification = types.ServerNotification(
+            types.ToolListChangedNotification(method="notifications/tools/list_changed")
+        )
+        await pool._message_handler(server)(notification)
+        held = len(pool._reloading)
+        await asyncio.wait_for(reloaded.wait(), 1.0)
+        await asyncio.sleep(0)
+        return held, len(pool._reloading)
+
+    assert asyncio.run(main()) == (1, 0)
@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import make_weather_payload
+
+
+@pytest.fixture(scope="module")
+def weather(lab02):
+    return lab02("weather")
+
+
+class SlowHTTPClient:
+    """httpx.AsyncClient stand-in answering every GET after `delay` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.gets = 0
+
+    async def get(self, url):
+        self.gets += 1
+        await asyncio.sleep(self.delay)
+        payload = make_weather_payload()
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: payload)
+
+    async def aclose(self):
+        pass
+
+
+def test_first_waiter_cancelled_does_not_cancel_the_shared_fetch(weather):
+    async def main():
+        client = weather.WeatherClient(cache_path=None)
+        http = client._async_client = SlowHTTPClient(0.1)
+        first = asyncio.ensure_future(client.aget("Paris"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(client.aget("paris"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        data = await second
+        return first.cancelled(), data, http.gets, client.stats()
+
+    first_cancelled, data, gets, stats = asyncio.run(main())
+    assert first_cancelled
+    assert "current_condition" in data
+    assert gets == 1
+    assert stats["coalesced"] == 1 and stats["entries"] == 1